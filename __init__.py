@@ -14,8 +14,63 @@ def create_app(test_config=None):
     # Default production config
     app.config.from_mapping(
         SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key'),
-        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(app.instance_path, 'movie_web.db')}",
+        SQLALCHEMY_DATABASE_URI = os.environ.get(
+            'DATABASE_URL', f"sqlite:///{os.path.join(app.instance_path, 'movie_web.db')}"),
         SQLALCHEMY_TRACK_MODIFICATIONS = False,
+        # "production" enables WAL + tuned pragmas (see data_manager/sqlite_tuning.py)
+        DB_PROFILE = os.environ.get('DB_PROFILE', 'default'),
+        # Storage backend: 'auto' (from the URI), 'sqlite' or 'postgresql'
+        DATA_MANAGER = os.environ.get('DATA_MANAGER', 'auto'),
+        PAGE_SIZE = 24,
+        MAX_PAGE_SIZE = 100,
+        # OMDb response cache (TTLs in seconds); set OMDB_CACHE_PATH to None to disable
+        OMDB_CACHE_PATH = os.path.join(app.instance_path, 'omdb_cache.sqlite'),
+        OMDB_CACHE_TTL = 7 * 24 * 3600,
+        OMDB_CACHE_NEGATIVE_TTL = 24 * 3600,
+        OMDB_CACHE_MAX_ENTRIES = 50_000,
+        # OMDb HTTP client: timeouts (s), retries and circuit breaker
+        OMDB_CONNECT_TIMEOUT = 3.05,
+        OMDB_READ_TIMEOUT = 10.0,
+        OMDB_RETRIES = 2,
+        OMDB_POOL_SIZE = 10,
+        OMDB_BREAKER_THRESHOLD = 5,
+        OMDB_BREAKER_RESET = 30.0,
+        # Concurrent lookups for /api/v1/lookup (see omdb_async.py): per
+        # request, requests per process, and the request's deadline (s)
+        OMDB_ASYNC_CONCURRENCY = 8,
+        OMDB_ASYNC_MAX_REQUESTS = 16,
+        OMDB_LOOKUP_TIMEOUT = 5.0,
+        # Page/fragment cache for catalog, search and movie pages; set
+        # RESPONSE_CACHE_URL (redis://...) to share it between worker processes
+        RESPONSE_CACHE_ENABLED = True,
+        RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL'),
+        RESPONSE_CACHE_TTL = 300,
+        RESPONSE_CACHE_MAX_ENTRIES = 1000,
+        # Background OMDb lookups for add_movie (see jobs.py); the request
+        # waits up to ENRICH_INLINE_WAIT seconds before showing a placeholder
+        ENRICH_WORKERS = 4,
+        ENRICH_MAX_ATTEMPTS = 5,
+        ENRICH_INLINE_WAIT = 0.5,
+        # Local poster copies (see posters.py); set POSTER_CACHE_DIR to None to hot-link
+        POSTER_CACHE_DIR = os.path.join(app.instance_path, 'posters'),
+        POSTER_SIZES = {'thumb': 300, 'full': 800},
+        POSTER_TIMEOUT = 10.0,
+        # Letterboxd/IMDb CSV imports (see importer.py): uploads wait in
+        # IMPORT_DIR; rows attached per transaction; OMDb lookups per import
+        IMPORT_DIR = os.path.join(app.instance_path, 'imports'),
+        IMPORT_BATCH_SIZE = 500,
+        IMPORT_MAX_LOOKUPS = 200,
+        # In-memory title/director/user suggestions for /api/autocomplete;
+        # rebuilt in the background once older than AUTOCOMPLETE_MAX_AGE seconds
+        AUTOCOMPLETE_ENABLED = True,
+        AUTOCOMPLETE_MAX_AGE = 300,
+        AUTOCOMPLETE_LIMIT = 8,
+        # JSON API (/api/v1, see api.py): bodies from this size (bytes) are
+        # gzip/brotli-compressed when the client accepts it
+        API_COMPRESS_MIN_SIZE = 1024,
+        # Prometheus metrics at /metrics; optional Server-Timing response header
+        METRICS_ENABLED = True,
+        METRICS_SERVER_TIMING = False,
     )
 
     # Application‐wide error handlers:
@@ -25,7 +80,7 @@ def create_app(test_config=None):
 
     @app.errorhandler(500)
     def internal_error(e):
-        db.session.rollback()
+        app.data_manager.rollback()
         return render_template('500.html'), 500
 
     # Override with testing config if provided
@@ -38,19 +93,115 @@ def create_app(test_config=None):
     except OSError:
         pass
 
+    # SQLite tuning profile: pool sizing must be known before the engine exists
+    from .data_manager.sqlite_tuning import apply_pragmas, profile
+    db_profile = profile(app.config['DB_PROFILE'])
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite') and uri not in ('sqlite://', 'sqlite:///:memory:'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **db_profile['engine_options'],
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        }
+
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        apply_pragmas(db.engine, db_profile['pragmas'])
     migrate = Migrate(app, db)
 
     # Bind data manager after db is initialized
-    from .data_manager.sqlite_data_manager import SQLiteDataManager
+    from .data_manager import backend_class
+    manager_class = backend_class(app.config['DATA_MANAGER'], uri)
     global data_manager
-    data_manager = SQLiteDataManager(db)
+    data_manager = manager_class(db)
     # Also attach to app so blueprints can access
     app.data_manager = data_manager
 
+    # OMDb client and response cache, shared by routes and CLI commands
+    from . import omdb_api
+    from .omdb_cache import OMDbCache
+    app.omdb_client = omdb_api.OMDbClient(
+        connect_timeout=app.config['OMDB_CONNECT_TIMEOUT'],
+        read_timeout=app.config['OMDB_READ_TIMEOUT'],
+        retries=app.config['OMDB_RETRIES'],
+        pool_size=app.config['OMDB_POOL_SIZE'],
+        breaker=omdb_api.CircuitBreaker(
+            failure_threshold=app.config['OMDB_BREAKER_THRESHOLD'],
+            reset_timeout=app.config['OMDB_BREAKER_RESET'],
+        ),
+    )
+    omdb_api.configure_client(app.omdb_client)
+    from .omdb_async import AsyncOMDbClient
+    app.omdb_async = AsyncOMDbClient(
+        app.omdb_client,
+        concurrency=app.config['OMDB_ASYNC_CONCURRENCY'],
+        max_requests=app.config['OMDB_ASYNC_MAX_REQUESTS'],
+    )
+    if app.config['OMDB_CACHE_PATH']:
+        app.omdb_cache = OMDbCache(
+            app.config['OMDB_CACHE_PATH'],
+            ttl=app.config['OMDB_CACHE_TTL'],
+            negative_ttl=app.config['OMDB_CACHE_NEGATIVE_TTL'],
+            max_entries=app.config['OMDB_CACHE_MAX_ENTRIES'],
+        )
+    else:
+        app.omdb_cache = None
+    omdb_api.configure_cache(app.omdb_cache)
+
+    # Enrichment job queue; workers start on the first submitted job
+    from .jobs import JobQueue
+    app.job_queue = JobQueue(
+        app, fetch=omdb_api.fetch_movie_data,
+        workers=app.config['ENRICH_WORKERS'],
+        max_attempts=app.config['ENRICH_MAX_ATTEMPTS'],
+    )
+
+    # Watchlist CSV imports, on background threads
+    from .importer import ListImporter
+    app.list_importer = ListImporter(
+        app, app.config['IMPORT_DIR'],
+        batch_size=app.config['IMPORT_BATCH_SIZE'],
+        max_lookups=app.config['IMPORT_MAX_LOOKUPS'],
+    )
+
+    # Poster downloads and thumbnails
+    if app.config['POSTER_CACHE_DIR']:
+        from .posters import PosterStore
+        app.poster_store = PosterStore(
+            app.config['POSTER_CACHE_DIR'],
+            sizes=app.config['POSTER_SIZES'],
+            timeout=app.config['POSTER_TIMEOUT'],
+        )
+    else:
+        app.poster_store = None
+
+    # Tag-invalidated response cache (see response_cache.py)
+    if app.config['RESPONSE_CACHE_ENABLED']:
+        from .response_cache import LRUBackend, RedisBackend, ResponseCache
+        if app.config['RESPONSE_CACHE_URL']:
+            backend = RedisBackend.from_url(app.config['RESPONSE_CACHE_URL'])
+        else:
+            backend = LRUBackend(max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        app.response_cache = ResponseCache(backend, ttl=app.config['RESPONSE_CACHE_TTL'])
+    else:
+        app.response_cache = None
+
+    # Search-box suggestions (see autocomplete.py); built on first use
+    if app.config['AUTOCOMPLETE_ENABLED']:
+        from .autocomplete import Autocomplete
+        app.autocomplete = Autocomplete(app, max_age=app.config['AUTOCOMPLETE_MAX_AGE'])
+    else:
+        app.autocomplete = None
+
+    # Per-request latency / SQL / OMDb / render metrics
+    if app.config['METRICS_ENABLED']:
+        from .instrumentation import init_instrumentation
+        init_instrumentation(app)
+
     # Register blueprints
     from .routes import main
     app.register_blueprint(main)
+    from .api import api
+    app.register_blueprint(api)
 
     return app
\ No newline at end of file
@@ -0,0 +1,407 @@
+"""
+api.py
+
+Versioned JSON API (/api/v1) for the mobile client and internal tools,
+over the same DataManagerInterface as the HTML views.
+
+- Collections use the pages' keyset pagination (`page_size`, `after`,
+  `before`) and return `next`/`prev` cursors.
+- `fields=title,year` returns only those fields (and always `id`). Fields
+  that cost a query, like a movie's `histogram`, are only fetched when
+  asked for.
+- Rows become dicts through precompiled mappers: a (name, getter) tuple per
+  resource, narrowed once per request instead of inspecting every ORM
+  object. Bodies are encoded with orjson when it is installed, and with the
+  json module otherwise.
+- GET responses carry a strong ETag (a hash of the body); a matching
+  If-None-Match gets a 304 without a body. Bodies of the catalog, movie,
+  user and search endpoints are kept in the response cache under the same
+  tags as the HTML pages, so they are invalidated by the same writes.
+- Bodies of API_COMPRESS_MIN_SIZE bytes or more are compressed with brotli
+  (if the `brotli` package is installed) or gzip, as the client accepts.
+"""
+
+import gzip
+import hashlib
+import json
+from operator import attrgetter
+
+from flask import Blueprint, abort, current_app, request
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from werkzeug.local import LocalProxy
+
+from .omdb_api import OMDbUnavailable
+from .response_cache import page_key
+
+try:
+    import orjson
+except ImportError:  # the json module gives the same output, slower
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+data_manager = LocalProxy(lambda: current_app.data_manager)
+
+# Movies per PATCH /users/<id>/movies request
+MAX_BATCH = 1000
+# Largest id the database can store (a signed 64-bit integer)
+MAX_ID = 2 ** 63 - 1
+# Titles per /lookup request
+MAX_LOOKUP = 10
+
+
+# -- serialisation ---------------------------------------------------------------
+def _stat(name):
+    def get(movie):
+        return getattr(movie.stats, name) if movie.stats is not None else 0
+    return get
+
+
+def _isoformat(name):
+    get = attrgetter(name)
+    return lambda obj: get(obj).isoformat()
+
+
+MOVIE_FIELDS = {
+    'id': attrgetter('id'),
+    'title': attrgetter('title'),
+    'year': attrgetter('year'),
+    'director': attrgetter('director'),
+    'genre': attrgetter('genre'),
+    'plot': attrgetter('plot'),
+    'poster': attrgetter('poster'),
+    'imdb_rating': attrgetter('rating'),
+    'review_count': _stat('review_count'),
+    'avg_rating': _stat('avg_rating'),
+}
+MOVIE_DETAIL_FIELDS = {
+    **MOVIE_FIELDS,
+    # one more query; leave it out of `fields=` to skip it
+    'histogram': lambda movie: data_manager.get_rating_histogram(movie.id),
+}
+USER_FIELDS = {
+    'id': attrgetter('id'),
+    'name': attrgetter('name'),
+}
+REVIEW_FIELDS = {
+    'id': attrgetter('review_id'),
+    'movie_id': attrgetter('movie_id'),
+    'user_id': attrgetter('user_id'),
+    'text': attrgetter('review_text'),
+    'rating': attrgetter('rating'),
+    'created_at': _isoformat('created_at'),
+}
+
+
+def _mapper(fields, default=None):
+    """
+    The (name, getter) pairs for this request's `fields=` (or `default`,
+    else every field); 400 on unknown names.
+    """
+    wanted = request.args.get('fields')
+    names = wanted.split(',') if wanted else (default or list(fields))
+    names = list(dict.fromkeys(['id'] + [n.strip() for n in names if n.strip()]))
+    unknown = [n for n in names if n not in fields]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(fields)})")
+    return tuple((name, fields[name]) for name in names)
+
+
+def _rows(items, mapper):
+    return [{name: get(item) for name, get in mapper} for item in items]
+
+
+def _page(page, mapper):
+    return {
+        'items': _rows(page.items, mapper),
+        'total': page.total,
+        'page_size': page.page_size,
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+    }
+
+
+def _encode(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+# -- responses -------------------------------------------------------------------
+def _encoding(size):
+    """Content-Encoding to use for a body of `size` bytes, or None."""
+    if size < current_app.config['API_COMPRESS_MIN_SIZE']:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _respond(body: bytes, status=200):
+    """
+    JSON response for an encoded body: ETag/304 for GETs, compressed when
+    large enough. Each encoding gets its own ETag, as it is a different
+    representation.
+    """
+    response = current_app.response_class(status=status, mimetype='application/json')
+    encoding = _encoding(len(body))
+    if request.method in ('GET', 'HEAD') and status == 200:
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest() + (f'-{encoding}' if encoding else '')
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True   # always revalidate, usually a 304
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+    if encoding == 'br':
+        body = brotli.compress(body, quality=5)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        response.content_encoding = encoding
+    response.set_data(body)
+    return response
+
+
+def _json(compute, *tags, status=200):
+    """
+    Respond with compute()'s payload. With `tags`, the encoded body is kept
+    in the response cache, like cached_page does for HTML.
+    """
+    cache = current_app.response_cache
+    if cache is None or not tags or request.method != 'GET':
+        return _respond(_encode(compute()), status)
+    body = cache.fragment('api:' + page_key(), list(tags), lambda: _encode(compute()).decode())
+    return _respond(body.encode(), status)
+
+
+# Flask looks handlers up by status code before exception class, so the
+# app's HTML 404/500 pages would win over a class-only registration
+@api.errorhandler(404)
+@api.errorhandler(HTTPException)
+def http_error(error):
+    response = _respond(_encode({'error': error.description}), error.code)
+    if error.code == 405:
+        response.headers['Allow'] = ', '.join(error.valid_methods or ())
+    elif error.code == 503:
+        response.headers['Retry-After'] = '1'
+    return response
+
+
+@api.errorhandler(500)
+def internal_error(error):
+    data_manager.rollback()
+    return _respond(_encode({'error': 'Internal server error'}), 500)
+
+
+@api.errorhandler(SQLAlchemyError)
+def database_error(error):
+    current_app.logger.exception("DB error in API")
+    data_manager.rollback()
+    return _respond(_encode({'error': 'Database error'}), 500)
+
+
+def _page_args():
+    default = current_app.config['PAGE_SIZE']
+    size = request.args.get('page_size', default, type=int)
+    return {
+        'page_size': min(max(size, 1), current_app.config['MAX_PAGE_SIZE']),
+        'after': request.args.get('after') or None,
+        'before': request.args.get('before') or None,
+    }
+
+
+def _json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, 'Expected a JSON object')
+    return body
+
+
+# -- movies ----------------------------------------------------------------------
+@api.route('/movies')
+def movies():
+    """The catalog: `genre`, `sort` (title, rating, popular), cursors, `fields`."""
+    mapper = _mapper(MOVIE_FIELDS)
+    genre = request.args.get('genre') or None
+    sort = request.args.get('sort', 'title')
+    return _json(lambda: _page(data_manager.get_movies(genre=genre, sort=sort, **_page_args()), mapper),
+                 'movies', 'ratings')
+
+
+@api.route('/movies/<int:movie_id>')
+def movie(movie_id):
+    mapper = _mapper(MOVIE_DETAIL_FIELDS)
+
+    def compute():
+        found = data_manager.get_movie(movie_id) or abort(404, 'Movie not found')
+        return _rows([found], mapper)[0]
+    return _json(compute, f'movie:{movie_id}')
+
+
+@api.route('/movies/<int:movie_id>/reviews')
+def movie_reviews(movie_id):
+    mapper = _mapper(REVIEW_FIELDS)
+
+    def compute():
+        data_manager.get_movie(movie_id) or abort(404, 'Movie not found')
+        return _page(data_manager.get_movie_reviews_page(movie_id, **_page_args()), mapper)
+    return _json(compute, f'movie:{movie_id}')
+
+
+@api.route('/movies/<int:movie_id>/reviews', methods=['POST'])
+def add_review(movie_id):
+    """Post a review: {"text": ..., "rating": 0-10}."""
+    data_manager.get_movie(movie_id) or abort(404, 'Movie not found')
+    body = _json_body()
+    text, rating = body.get('text'), body.get('rating')
+    if not isinstance(text, str) or not text.strip():
+        abort(400, 'text is required')
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 0 <= rating <= 10:
+        abort(400, 'rating must be a number from 0 to 10')
+    review = data_manager.add_review(movie_id=movie_id, review_text=text.strip(), rating=float(rating))
+    return _respond(_encode(_rows([review], tuple(REVIEW_FIELDS.items()))[0]), 201)
+
+
+# -- users and lists -------------------------------------------------------------
+@api.route('/users')
+def users():
+    mapper = _mapper(USER_FIELDS)
+    return _json(lambda: _page(data_manager.get_users(**_page_args()), mapper), 'users')
+
+
+@api.route('/users/<int:user_id>')
+def user(user_id):
+    mapper = _mapper(USER_FIELDS)
+
+    def compute():
+        found = data_manager.get_user(user_id) or abort(404, 'User not found')
+        return _rows([found], mapper)[0]
+    return _json(compute, 'users')
+
+
+@api.route('/users/<int:user_id>/movies')
+def user_movies(user_id):
+    """A user's list, most recently added first (not cached: list edits aren't tagged)."""
+    mapper = _mapper(MOVIE_FIELDS)
+    data_manager.get_user(user_id) or abort(404, 'User not found')
+    return _json(lambda: _page(data_manager.get_user_movies_page(user_id, **_page_args()), mapper))
+
+
+@api.route('/users/<int:user_id>/movies', methods=['PATCH'])
+def edit_list(user_id):
+    """
+    Add/remove many movies in one transaction: {"add": [...], "remove": [...]}
+    with movie ids or exact titles. Reports each item's outcome, in order;
+    an item naming a movie already given for the same action is a 'duplicate'.
+    """
+    data_manager.get_user(user_id) or abort(404, 'User not found')
+    body = _json_body()
+    add, remove = body.get('add', []), body.get('remove', [])
+    if not isinstance(add, list) or not isinstance(remove, list):
+        abort(400, 'add and remove must be lists')
+    if len(add) + len(remove) > MAX_BATCH:
+        abort(400, f'At most {MAX_BATCH} movies per request')
+    items = [(action, item) for action, values in (('add', add), ('remove', remove)) for item in values]
+    if any(isinstance(item, bool) or not isinstance(item, (int, str))
+           or isinstance(item, int) and not 0 < item <= MAX_ID for _, item in items):
+        abort(400, 'Movies must be positive ids or titles')
+
+    by_title = data_manager.find_movie_ids_by_title(item for _, item in items if isinstance(item, str))
+
+    def resolve(item):
+        if isinstance(item, int):
+            return item, None
+        ids = by_title.get(item, [])
+        if len(ids) == 1:
+            return ids[0], None
+        return None, 'ambiguous title' if ids else 'no such movie'
+
+    resolved, seen = [], set()
+    for action, item in items:
+        movie_id, error = resolve(item)
+        if movie_id is not None and (action, movie_id) in seen:
+            error = 'duplicate'
+        seen.add((action, movie_id))
+        resolved.append((action, item, movie_id, error))
+    outcome = data_manager.edit_list(
+        user_id,
+        add=[movie_id for action, _, movie_id, error in resolved if action == 'add' and not error],
+        remove=[movie_id for action, _, movie_id, error in resolved
+                if action == 'remove' and not error],
+    )
+    results = [{'movie': item, 'id': movie_id, 'action': action,
+                'status': error or outcome[movie_id]}
+               for action, item, movie_id, error in resolved]
+    counts = {status: sum(r['status'] == status for r in results) for status in ('added', 'removed')}
+    return _respond(_encode({'results': results, **counts}))
+
+
+@api.route('/users/<int:user_id>/movies/<int:movie_id>', methods=['PUT', 'DELETE'])
+def list_entry(user_id, movie_id):
+    """PUT adds a movie to the list (201, or 200 if it was there); DELETE removes it."""
+    data_manager.get_user(user_id) or abort(404, 'User not found')
+    data_manager.get_movie(movie_id) or abort(404, 'Movie not found')
+    if request.method == 'PUT':
+        added = data_manager.add_to_list(user_id, movie_id)
+        return _respond(_encode({'user_id': user_id, 'movie_id': movie_id}), 201 if added else 200)
+    if not data_manager.remove_from_list(user_id, movie_id):
+        abort(404, 'Movie is not on the list')
+    return current_app.response_class(status=204)
+
+
+# -- search ----------------------------------------------------------------------
+@api.route('/search')
+def search():
+    """Movies (paginated) and users (first page) matching `q`."""
+    q = request.args.get('q', '').strip()
+    movie_mapper, user_mapper = _mapper(MOVIE_FIELDS), tuple(USER_FIELDS.items())
+
+    def compute():
+        users = data_manager.search_users(q, limit=current_app.config['PAGE_SIZE']) if q else []
+        return {
+            'query': q,
+            'movies': _page(data_manager.search_movies(q, **_page_args()), movie_mapper),
+            'users': _rows(users, user_mapper),
+        }
+    return _json(compute, 'movies', 'users')
+
+
+# -- OMDb preview ----------------------------------------------------------------
+@api.route('/lookup')
+async def lookup():
+    """
+    Look titles up on OMDb before adding them (?title=...&title=...), all
+    at once. Per title: found (with the movie), not_found, unavailable or
+    timeout. 503 while the process already runs its maximum of lookups.
+    """
+    titles = list(dict.fromkeys(t.strip() for t in request.args.getlist('title') if t.strip()))
+    if not titles:
+        abort(400, 'title is required')
+    if len(titles) > MAX_LOOKUP:
+        abort(400, f'At most {MAX_LOOKUP} titles per request')
+    client = current_app.omdb_async
+    with client.admit() as admitted:
+        if not admitted:
+            abort(503, 'Too many OMDb lookups in progress; try again shortly')
+        found = await client.fetch_many(titles, timeout=current_app.config['OMDB_LOOKUP_TIMEOUT'])
+
+    def result(title):
+        movie = found[title]
+        if isinstance(movie, TimeoutError):
+            return {'title': title, 'status': 'timeout', 'movie': None}
+        if isinstance(movie, OMDbUnavailable):
+            return {'title': title, 'status': 'unavailable', 'movie': None}
+        if isinstance(movie, Exception):
+            raise movie
+        return {'title': title, 'status': 'found' if movie else 'not_found', 'movie': movie}
+    return _respond(_encode({'results': [result(t) for t in titles]}))
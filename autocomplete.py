@@ -0,0 +1,484 @@
+"""
+autocomplete.py
+
+In-memory, typo-tolerant suggestions for the search boxes, served as JSON
+by /api/autocomplete.
+
+Every movie title, director and user name is an entry. Entries are split
+into normalised words (case- and accent-folded). Each distinct word keeps a
+posting list of the entries containing it, sorted by weight: how often a
+movie is listed or reviewed, how many movies a director has made, how long
+a user's list is. A sorted array of the vocabulary answers prefix lookups
+with bisect. That works like a trie but needs only one list slot per
+distinct word.
+
+The last word of a query matches as a prefix ("ali" -> "alien"); earlier
+words must match whole words. The smallest set of postings drives a lazy
+merge in weight order, so the best `limit` hits come out without scoring
+every match. If fewer than `limit` entries match, query words of three or
+more letters are also matched within one edit (a letter added, dropped,
+changed or swapped with its neighbour), or two edits for words of eight
+letters or more. Vocabulary words sharing enough trigrams with the query
+word are the candidates, and a bounded edit-distance check confirms each
+one. Words of three or four letters can lose every trigram to a single
+edit ("haet" and "heat" share none), so they are looked up instead in a
+deletion index of short word starts: two strings within one edit of each
+other are equal once at most one letter is dropped from each. Fuzzy hits
+rank after exact ones.
+
+The index is built on first use (or by warm()). It then follows writes:
+movies and users committed through the session are re-indexed in this
+process. Other worker processes, bulk imports and changed weights are
+picked up after `max_age` seconds, when the index is rebuilt in a
+background thread while the old one keeps answering.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+
+from . import db
+from .data_manager.models import Movie, MovieStats, User, user_movies
+
+# `value` is what goes into the search box: a movie's title without its year
+Suggestion = namedtuple('Suggestion', 'kind id label value weight words')
+
+_WORD = re.compile(r'\w+')
+# Query words shorter than this are only matched exactly (or as a prefix)
+MIN_FUZZY_LENGTH = 3
+# A one- or two-letter prefix can match much of the vocabulary; only the
+# words with the heaviest entries are walked then
+MAX_EXPANSIONS = 200
+# Longest word start in the deletion index: a query word short enough to
+# share no trigram with a one-edit typo, plus that edit
+MAX_SHORT_START = 5
+
+
+def words(text):
+    """Case- and accent-folded words of `text`."""
+    text = text or ''
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return _WORD.findall(text.casefold())
+
+
+def trigrams(word):
+    """Trigrams of `word`, anchored at the start so prefixes share them."""
+    padded = '^' + word
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(word):
+    """`word` with one letter dropped, every way."""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def edit_distance(a, b, bound, prefix=False):
+    """
+    Edit distance of `a` and `b` (with `prefix`, of `a` and the closest
+    start of `b`), counting a swap of neighbouring letters as one edit
+    ("alein" -> "alien"); bound + 1 once it exceeds `bound`.
+    """
+    if prefix:
+        b = b[:len(a) + bound]
+    elif abs(len(a) - len(b)) > bound:
+        return bound + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > bound:
+            return bound + 1
+        before, previous = previous, current
+    return min(min(previous) if prefix else previous[-1], bound + 1)
+
+
+def _short_starts(word):
+    """Starts of `word` a short query word can be one edit away from."""
+    return {word[:n] for n in range(MIN_FUZZY_LENGTH - 1, min(len(word), MAX_SHORT_START) + 1)}
+
+
+def _director_keys(director):
+    """{folded name: name} for each director in a movie's director column."""
+    names = [name.strip() for name in (director or '').split(',')]
+    return {' '.join(words(name)): name for name in names if words(name)}
+
+
+def movie_label(title, year):
+    return f'{title} ({year})' if year else title
+
+
+def _suggestion(kind, entry_id, label, weight, value=None):
+    return Suggestion(kind, entry_id, label, value or label, weight, frozenset(words(label)))
+
+
+class AutocompleteIndex:
+    """Word postings, prefix array and trigram index over suggestion entries."""
+
+    def __init__(self):
+        self._entries = {}     # (kind, id) -> Suggestion
+        self._postings = {}    # word -> sorted [(-weight, key)]
+        self._vocab = []       # sorted words
+        self._grams = {}       # trigram -> {word}
+        self._starts = Counter()   # short word start -> vocabulary words with it
+        self._deletes = {}     # short start, and it minus a letter -> {start}
+        self._short = {}       # capped expansions of short prefixes
+        self._movies = {}      # movie id -> director keys it counts towards
+        self._directors = {}   # director key -> [label, movie count]
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, movies, users):
+        """
+        Index everything at once: postings are sorted once rather than kept
+        sorted one insert at a time.
+
+        Args:
+            movies: (id, title, year, director, weight) rows.
+            users: (id, name, weight) rows.
+        """
+        index = cls()
+        entries = index._entries
+        for movie_id, title, year, director, weight in movies:
+            entries['movie', movie_id] = _suggestion('movie', movie_id, movie_label(title, year),
+                                                     weight, title)
+            keys = _director_keys(director)
+            for key, name in keys.items():
+                index._directors.setdefault(key, [name, 0])[1] += 1
+            if keys:
+                index._movies[movie_id] = tuple(keys)
+        for key, (label, count) in index._directors.items():
+            entries['director', key] = _suggestion('director', key, label, count)
+        for user_id, name, weight in users:
+            entries['user', user_id] = _suggestion('user', user_id, name, weight)
+        for key, entry in entries.items():
+            for word in entry.words:
+                index._postings.setdefault(word, []).append((-entry.weight, key))
+        for postings in index._postings.values():
+            postings.sort()
+        index._vocab = sorted(index._postings)
+        for word in index._vocab:
+            index._index_word(word)
+        return index
+
+    def _index_word(self, word):
+        for gram in trigrams(word):
+            self._grams.setdefault(gram, set()).add(word)
+        for start in _short_starts(word):
+            self._starts[start] += 1
+            if self._starts[start] == 1:
+                for key in {start} | deletions(start):
+                    self._deletes.setdefault(key, set()).add(start)
+
+    def _unindex_word(self, word):
+        for gram in trigrams(word):
+            self._grams[gram].discard(word)
+        for start in _short_starts(word):
+            self._starts[start] -= 1
+            if not self._starts[start]:
+                del self._starts[start]
+                for key in {start} | deletions(start):
+                    self._deletes[key].discard(start)
+
+    # -- entries ---------------------------------------------------------------
+    def _add(self, kind, entry_id, label, weight, value=None):
+        key = (kind, entry_id)
+        entry = _suggestion(kind, entry_id, label, weight, value)
+        self._entries[key] = entry
+        for word in entry.words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = []
+                bisect.insort(self._vocab, word)
+                self._short.clear()
+                self._index_word(word)
+            bisect.insort(postings, (-weight, key))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        for word in entry.words:
+            postings = self._postings[word]
+            del postings[bisect.bisect_left(postings, (-entry.weight, key))]
+            if not postings:
+                del self._postings[word]
+                del self._vocab[bisect.bisect_left(self._vocab, word)]
+                self._short.clear()
+                self._unindex_word(word)
+        return entry
+
+    def put_movie(self, movie_id, title, year=None, director=None, weight=None):
+        """Index (or re-index) a movie; `weight` None keeps the current one."""
+        old = self._remove(('movie', movie_id))
+        if weight is None:
+            weight = old.weight if old else 0
+        self._add('movie', movie_id, movie_label(title, year), weight, title)
+        keys = _director_keys(director)
+        previous = self._movies.pop(movie_id, ())
+        for key in set(previous) - set(keys):
+            self._count_director(key, None, -1)
+        for key, name in keys.items():
+            if key not in previous:
+                self._count_director(key, name, 1)
+        if keys:
+            self._movies[movie_id] = tuple(keys)
+
+    def drop_movie(self, movie_id):
+        self._remove(('movie', movie_id))
+        for key in self._movies.pop(movie_id, ()):
+            self._count_director(key, None, -1)
+
+    def _count_director(self, key, name, delta):
+        label, count = self._directors.get(key, (name, 0))
+        count += delta
+        self._remove(('director', key))
+        if count > 0:
+            self._directors[key] = [label, count]
+            self._add('director', key, label, count)
+        else:
+            self._directors.pop(key, None)
+
+    def put_user(self, user_id, name, weight=None):
+        old = self._remove(('user', user_id))
+        if weight is None:
+            weight = old.weight if old else 0
+        self._add('user', user_id, name, weight)
+
+    def drop_user(self, user_id):
+        self._remove(('user', user_id))
+
+    # -- lookups ---------------------------------------------------------------
+    def _expand(self, prefix):
+        """Vocabulary words starting with `prefix`."""
+        if prefix in self._short:
+            return self._short[prefix]
+        lo = bisect.bisect_left(self._vocab, prefix)
+        hi = bisect.bisect_left(self._vocab, prefix + '\U0010ffff', lo)
+        found = self._vocab[lo:hi]
+        if len(found) > MAX_EXPANSIONS:
+            found = heapq.nsmallest(MAX_EXPANSIONS, found, key=lambda w: self._postings[w][0])
+        found = set(found)
+        if len(prefix) <= 2:
+            self._short[prefix] = found
+        return found
+
+    def _close_words(self, term, prefix):
+        """Vocabulary words (or, for a prefix, word starts) within a few edits of `term`."""
+        bound = 1 if len(term) < 8 else 2
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        # q-gram lemma: each edit destroys at most three trigrams
+        needed = len(grams) - 3 * bound
+        if needed <= 0:
+            return self._close_short_words(term, prefix)
+        close = set()
+        for word, count in shared.items():
+            if count < needed:
+                continue
+            if edit_distance(term, word, bound, prefix) <= bound:
+                close.add(word)
+        return close
+
+    def _close_short_words(self, term, prefix):
+        """_close_words for a term too short for the trigram filter (one edit)."""
+        close = set()
+        for key in {term} | deletions(term):
+            for start in self._deletes.get(key, ()):
+                if edit_distance(term, start, 1) > 1:
+                    continue
+                if prefix:
+                    close |= self._expand(start)
+                elif start in self._postings:
+                    close.add(start)
+        return close
+
+    def _candidates(self, term, prefix, fuzzy):
+        found = self._expand(term) if prefix else ({term} if term in self._postings else set())
+        if fuzzy and len(term) >= MIN_FUZZY_LENGTH:
+            found = found | self._close_words(term, prefix)
+        return found
+
+    def search(self, query, limit=8, kinds=None):
+        """
+        Up to `limit` Suggestions for `query`, best first.
+
+        Args:
+            kinds: only these entry kinds ('movie', 'director', 'user').
+        """
+        terms = words(query)
+        if not terms or limit < 1:
+            return []
+        last = len(terms) - 1
+        results, seen = [], set()
+        for fuzzy in (False, True):
+            if fuzzy and (len(results) >= limit or max(map(len, terms)) < MIN_FUZZY_LENGTH):
+                break
+            candidates = [self._candidates(term, i == last, fuzzy) for i, term in enumerate(terms)]
+            if not all(candidates):
+                continue
+            # walk the rarest term's postings, check the others per entry
+            driver = min(range(len(candidates)),
+                         key=lambda i: sum(len(self._postings[w]) for w in candidates[i]))
+            checks = [(candidates[i], terms[i] if i == last else None)
+                      for i in range(len(terms)) if i != driver]
+            for _, key in heapq.merge(*(self._postings[w] for w in candidates[driver])):
+                if key in seen:
+                    continue
+                entry = self._entries[key]
+                if kinds and entry.kind not in kinds:
+                    continue
+                # a prefix is checked directly: its expansions may be capped
+                if all(not entry.words.isdisjoint(found)
+                       or (prefix and any(w.startswith(prefix) for w in entry.words))
+                       for found, prefix in checks):
+                    seen.add(key)
+                    results.append(entry)
+                    if len(results) >= limit:
+                        break
+        return results
+
+
+def load_index(session):
+    """Build an AutocompleteIndex from the database."""
+    listings = (select(user_movies.c.movie_id, func.count().label('n'))
+                .group_by(user_movies.c.movie_id).subquery())
+    movies = session.execute(
+        select(Movie.id, Movie.title, Movie.year, Movie.director,
+               func.coalesce(listings.c.n, 0) + func.coalesce(MovieStats.review_count, 0))
+        .outerjoin(listings, listings.c.movie_id == Movie.id)
+        .outerjoin(MovieStats, MovieStats.movie_id == Movie.id)
+    )
+    lists = (select(user_movies.c.user_id, func.count().label('n'))
+             .group_by(user_movies.c.user_id).subquery())
+    users = session.execute(select(User.id, User.name, func.coalesce(lists.c.n, 0))
+                            .outerjoin(lists, lists.c.user_id == User.id))
+    return AutocompleteIndex.build(movies, users.all())
+
+
+class Autocomplete:
+    """
+    The app's suggestion index: built lazily, kept current with committed
+    writes, rebuilt in the background once older than `max_age` seconds.
+    """
+
+    def __init__(self, app, max_age=300.0, clock=time.monotonic):
+        self.app = app
+        self.max_age = max_age
+        self.clock = clock
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilding = None    # changes seen while a rebuild runs
+        self._rebuild_thread = None
+
+    def warm(self):
+        """Build the index now (e.g. at startup) instead of on the first query."""
+        index = self._build()
+        with self._lock:
+            self._index, self._built_at = index, self.clock()
+        return len(index)
+
+    def _build(self):
+        with self.app.app_context():
+            try:
+                return load_index(db.session)
+            finally:
+                db.session.remove()
+
+    def _rebuild_in_background(self):
+        def rebuild():
+            try:
+                index = self._build()
+            except Exception:
+                self.app.logger.exception('Autocomplete rebuild failed')
+                index = None
+            with self._lock:
+                if index is not None:
+                    for change in self._rebuilding:
+                        _apply(index, change)
+                    self._index = index
+                # a failed rebuild is retried after another max_age
+                self._built_at = self.clock()
+                self._rebuilding = None
+
+        self._rebuilding = []
+        self._rebuild_thread = threading.Thread(target=rebuild, name='autocomplete-rebuild', daemon=True)
+        self._rebuild_thread.start()
+
+    def suggest(self, query, limit=8, kinds=None):
+        if self._index is None:
+            self.warm()
+        with self._lock:
+            if self._rebuilding is None and self.clock() - self._built_at > self.max_age:
+                self._rebuild_in_background()
+            return self._index.search(query, limit=limit, kinds=kinds)
+
+    def apply(self, changes):
+        """Re-index committed movie/user changes (see the session hooks below)."""
+        with self._lock:
+            if self._index is None:
+                return
+            for change in changes:
+                _apply(self._index, change)
+                if self._rebuilding is not None:
+                    self._rebuilding.append(change)
+
+
+def _apply(index, change):
+    kind, entry_id, values = change
+    if kind == 'movie':
+        if values is None:
+            index.drop_movie(entry_id)
+        else:
+            index.put_movie(entry_id, *values)
+    elif values is None:
+        index.drop_user(entry_id)
+    else:
+        index.put_user(entry_id, values)
+
+
+def _current_autocomplete():
+    return getattr(current_app, 'autocomplete', None) if has_app_context() else None
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_autocomplete_changes(session, flush_context):
+    """Remember which movies and users this transaction wrote."""
+    pending = session.info.setdefault('autocomplete', {})
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Movie):
+            pending['movie', obj.id] = (obj.title, obj.year, obj.director)
+        elif isinstance(obj, User):
+            pending['user', obj.id] = obj.name
+    for obj in session.deleted:
+        if isinstance(obj, (Movie, User)):
+            pending['movie' if isinstance(obj, Movie) else 'user', obj.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def apply_autocomplete_changes(session):
+    changes = session.info.pop('autocomplete', None)
+    autocomplete = _current_autocomplete()
+    if changes and autocomplete is not None:
+        autocomplete.apply([(kind, entry_id, values) for (kind, entry_id), values in changes.items()])
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_autocomplete_changes(session):
+    session.info.pop('autocomplete', None)
@@ -0,0 +1,343 @@
+"""
+backup.py
+
+Dump and restore the whole dataset, and snapshot a live SQLite database.
+These are the functions behind the `export`, `import` and `snapshot` CLI
+commands.
+
+Exports stream movies, users, list entries (with `added_at`) and reviews
+in primary-key order through a server-side cursor, one batch at a time, so
+memory use doesn't grow with the database. The output is either
+
+- NDJSON: one file, a header line, then one {"table": ..., "row": {...}}
+  object per line; or
+- CSV: a directory holding one file per table, with column names in the
+  header row.
+
+Either can be gzip- or zstd-compressed (zstd needs the `zstandard`
+package). Imports read the same formats back. Compression is detected from
+the file contents. Rows go in with batched executemany INSERTs inside one
+transaction, keeping their ids. Genres, review stats and the rating
+histogram are derived data: they are rebuilt from the imported rows rather
+than exported.
+
+Snapshots use SQLite's online backup API. In WAL mode the copy runs inside
+a single read transaction, which never blocks writers. In rollback-journal
+mode it copies a few pages at a time and lets writers in between steps.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, case, func, insert, select, text
+
+from .data_manager.models import (UNKNOWN_ADDED_AT, Genre, Movie, MovieStats, RatingBucket,
+                                  Review, User, movie_genres, split_genres, user_movies)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip always works
+    zstandard = None
+
+FORMAT_NAME = 'movie-web-export'
+FORMAT_VERSION = 1
+# Dump order: every table after the ones it references
+TABLES = {
+    'users': User.__table__,
+    'movies': Movie.__table__,
+    'user_movies': user_movies,
+    'reviews': Review.__table__,
+}
+COMPRESSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class BackupError(Exception):
+    """An export, import or snapshot could not be carried out."""
+
+
+# -- compressed text streams ---------------------------------------------------
+def _require_zstd():
+    if zstandard is None:
+        raise BackupError('zstd compression needs the zstandard package (pip install zstandard)')
+
+
+def _open_write(path, compression):
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    if compression == 'zstd':
+        _require_zstd()
+        raw = zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    if compression is not None:
+        raise BackupError(f'unknown compression {compression!r}; choose gzip or zstd')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _open_read(path):
+    """Open `path` as text, transparently decompressing gzip or zstd."""
+    with open(path, 'rb') as fh:
+        magic = fh.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    if magic == ZSTD_MAGIC:
+        _require_zstd()
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+# -- values --------------------------------------------------------------------
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _decoder(column):
+    """Text/JSON value -> Python value for `column` (None stays None)."""
+    if isinstance(column.type, DateTime):
+        convert = _datetime
+    elif isinstance(column.type, Integer):
+        convert = int
+    elif isinstance(column.type, Float):
+        convert = float
+    else:
+        convert = str
+
+    def decode(value):
+        # CSV gives strings only; JSON already has numbers
+        return convert(value) if isinstance(value, str) else value
+    return decode
+
+
+def _stream_rows(session, table, batch_size):
+    """Every row of `table` in primary-key order, fetched `batch_size` at a time."""
+    conn = session.connection().execution_options(yield_per=batch_size)
+    result = conn.execute(select(table).order_by(*table.primary_key.columns))
+    for partition in result.partitions():
+        yield from partition
+
+
+# -- export --------------------------------------------------------------------
+def export_dataset(session, target, fmt='ndjson', compression=None, batch_size=5000,
+                   echo=None):
+    """
+    Write every exported table to `target`: a file for NDJSON, a directory
+    (created if needed) for CSV.
+
+    Returns:
+        dict: rows written per table.
+    """
+    counts = {}
+    if fmt == 'ndjson':
+        with _open_write(target, compression) as out:
+            out.write(json.dumps({'format': FORMAT_NAME, 'version': FORMAT_VERSION,
+                                  'tables': list(TABLES)}) + '\n')
+            for name, table in TABLES.items():
+                counts[name] = 0
+                for row in _stream_rows(session, table, batch_size):
+                    record = {'table': name,
+                              'row': {k: _encode(v) for k, v in row._mapping.items()}}
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    counts[name] += 1
+                if echo:
+                    echo(f'{name}: {counts[name]} rows')
+    elif fmt == 'csv':
+        os.makedirs(target, exist_ok=True)
+        for name, table in TABLES.items():
+            path = os.path.join(target, f'{name}.csv{COMPRESSIONS.get(compression, "")}')
+            with _open_write(path, compression) as out:
+                writer = csv.writer(out)
+                writer.writerow([c.name for c in table.columns])
+                counts[name] = 0
+                for row in _stream_rows(session, table, batch_size):
+                    writer.writerow(['' if v is None else _encode(v) for v in row])
+                    counts[name] += 1
+            if echo:
+                echo(f'{name}: {counts[name]} rows -> {path}')
+    else:
+        raise BackupError(f'unknown export format {fmt!r}; choose ndjson or csv')
+    return counts
+
+
+# -- import --------------------------------------------------------------------
+def _read_ndjson(path):
+    with _open_read(path) as fh:
+        header = json.loads(fh.readline() or '{}')
+        if header.get('format') != FORMAT_NAME:
+            raise BackupError(f'{path} is not a {FORMAT_NAME} file')
+        if header.get('version', 0) > FORMAT_VERSION:
+            raise BackupError(f'{path} was written by a newer version (format {header["version"]})')
+        for line in fh:
+            if line.strip():
+                record = json.loads(line)
+                yield record['table'], record['row']
+
+
+def _read_csv_dir(path):
+    files = {entry.split('.', 1)[0]: os.path.join(path, entry) for entry in os.listdir(path)
+             if entry.split('.', 1)[0] in TABLES and '.csv' in entry}
+    if not files:
+        raise BackupError(f'{path} has no exported CSV files')
+    for name in TABLES:
+        if name in files:
+            # CSV can't tell NULL from '': empty means NULL where NULL is allowed
+            nullable = {c.name for c in TABLES[name].columns if c.nullable}
+            with _open_read(files[name]) as fh:
+                for row in csv.DictReader(fh):
+                    yield name, {k: None if v == '' and k in nullable else v
+                                 for k, v in row.items()}
+
+
+def read_dataset(path):
+    """(table name, raw row dict) for every row of an export, in dump order."""
+    return _read_csv_dir(path) if os.path.isdir(path) else _read_ndjson(path)
+
+
+def import_dataset(session, source, batch_size=5000, echo=None):
+    """
+    Load an export into an empty database, in one transaction.
+
+    Returns:
+        dict: rows inserted per table.
+    Raises:
+        BackupError: the database already has data or the input is malformed.
+    """
+    for name, table in TABLES.items():
+        if session.execute(select(table).limit(1)).first() is not None:
+            raise BackupError(f'the {name} table is not empty; import into a fresh database')
+
+    decoders = {name: {c.name: _decoder(c) for c in table.columns} for name, table in TABLES.items()}
+    counts = dict.fromkeys(TABLES, 0)
+    genre_ids = {}
+    batch, batch_table = [], None
+
+    def flush():
+        if not batch:
+            return
+        session.execute(insert(TABLES[batch_table]), batch)
+        if batch_table == 'movies':
+            _link_genres(session, batch, genre_ids)
+        counts[batch_table] += len(batch)
+        batch.clear()
+
+    try:
+        for name, raw in read_dataset(source):
+            columns = decoders.get(name)
+            if columns is None:
+                raise BackupError(f'unknown table {name!r} in {source}')
+            unknown = set(raw) - set(columns)
+            if unknown:
+                raise BackupError(f'unknown {name} columns: {sorted(unknown)}')
+            if name != batch_table or len(batch) >= batch_size:
+                flush()
+                if name != batch_table and batch_table is not None and echo:
+                    echo(f'{batch_table}: {counts[batch_table]} rows')
+                batch_table = name
+            row = {key: decode(raw.get(key)) for key, decode in columns.items()}
+            if name == 'user_movies' and row['added_at'] is None:
+                row['added_at'] = UNKNOWN_ADDED_AT   # exports of older databases
+            batch.append(row)
+        flush()
+        if batch_table is not None and echo:
+            echo(f'{batch_table}: {counts[batch_table]} rows')
+        _rebuild_review_stats(session)
+        _reset_sequences(session)
+        session.commit()
+    except (KeyError, ValueError, TypeError) as exc:
+        session.rollback()
+        raise BackupError(f'malformed export {source}: {exc}') from exc
+    except Exception:
+        session.rollback()
+        raise
+    return counts
+
+
+def _link_genres(session, movies, genre_ids):
+    """Fill genres/movie_genres for a batch of imported movie rows."""
+    links = []
+    for movie in movies:
+        for name in split_genres(movie['genre']):
+            if name not in genre_ids:
+                genre_ids[name] = session.execute(
+                    insert(Genre).values(name=name).returning(Genre.id)).scalar_one()
+            links.append({'movie_id': movie['id'], 'genre_id': genre_ids[name]})
+    if links:
+        session.execute(insert(movie_genres), links)
+
+
+def _bucket_expression(rating):
+    """SQL for models.rating_bucket: the nearest whole point, 0-10."""
+    return sum((case((rating >= b - 0.5, 1), else_=0) for b in range(1, 11)), start=0)
+
+
+def _rebuild_review_stats(session):
+    """Aggregate the imported reviews into movie_stats and the rating histogram."""
+    count = func.count(Review.review_id)
+    total = func.coalesce(func.sum(Review.rating), 0.0)
+    session.execute(insert(MovieStats).from_select(
+        ['movie_id', 'review_count', 'rating_sum', 'avg_rating'],
+        select(Movie.id, count, total, func.coalesce(func.avg(Review.rating), 0.0))
+        .select_from(Movie).outerjoin(Review, Review.movie_id == Movie.id)
+        .group_by(Movie.id),
+    ))
+    bucket = _bucket_expression(Review.rating).label('bucket')
+    session.execute(insert(RatingBucket).from_select(
+        ['movie_id', 'bucket', 'count'],
+        select(Review.movie_id, bucket, func.count()).group_by(Review.movie_id, bucket),
+    ))
+
+
+def _reset_sequences(session):
+    """PostgreSQL: move id sequences past the imported ids (SQLite needs nothing)."""
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in (('users', 'id'), ('movies', 'id'), ('reviews', 'review_id')):
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+            f"COALESCE((SELECT MAX({column}) FROM {table}), 0) + 1, false)"))
+
+
+# -- snapshot ------------------------------------------------------------------
+def snapshot_sqlite(engine, target, pages=1024, sleep=0.05, progress=None):
+    """
+    Copy a live SQLite database to `target` with the online backup API.
+
+    Args:
+        pages (int): pages per step in rollback-journal mode; writers get
+            the lock between steps (SQLite restarts the copy if one wrote).
+        sleep (float): seconds between steps.
+        progress (callable): progress(remaining, total) after each step.
+    Returns:
+        int: size of the snapshot in bytes.
+    """
+    if engine.dialect.name != 'sqlite':
+        raise BackupError('snapshots use SQLite\'s backup API; use pg_dump for PostgreSQL')
+    tmp = f'{target}.partial'
+    raw = engine.raw_connection()
+    try:
+        source = raw.driver_connection
+        journal_mode = source.execute('PRAGMA journal_mode').fetchone()[0].lower()
+        # WAL: one read transaction for the whole copy, writers carry on
+        step = -1 if journal_mode == 'wal' else pages
+        dest = sqlite3.connect(tmp)
+        try:
+            source.backup(dest, pages=step, sleep=sleep,
+                          progress=(lambda status, remaining, total: progress(remaining, total))
+                          if progress else None)
+        finally:
+            dest.close()
+    finally:
+        raw.close()
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
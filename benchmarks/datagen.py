@@ -0,0 +1,210 @@
+"""
+datagen.py
+
+Deterministic synthetic catalog for benchmarks: movies, users, list entries
+and reviews bulk-inserted straight into a fresh SQLite database.
+
+The same seed always produces the same rows. Popularity is skewed the way
+real catalogs are: a few movies collect most list entries and reviews. The
+derived tables the app keeps in sync on flush (genres, movie_stats, the
+rating histogram) are filled here too, and the full-text index through its
+triggers, so every page works as it would on real data.
+
+    python -m Movie_Web_App.benchmarks.datagen bench.db --scale large
+    python -m Movie_Web_App.benchmarks.datagen bench.db --movies 50000 --users 5000
+
+Scales: tiny (for tests), small (20k movies), medium (200k) and large
+(1M movies, 100k users, 10M list entries, 5M reviews; several GB and a
+while to build).
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from Movie_Web_App import create_app, db
+from Movie_Web_App.data_manager.models import rating_bucket
+
+SCALES = {
+    'tiny':   {'movies': 200,       'users': 20,      'list_entries': 1_000,      'reviews': 600},
+    'small':  {'movies': 20_000,    'users': 2_000,   'list_entries': 200_000,    'reviews': 100_000},
+    'medium': {'movies': 200_000,   'users': 20_000,  'list_entries': 2_000_000,  'reviews': 1_000_000},
+    'large':  {'movies': 1_000_000, 'users': 100_000, 'list_entries': 10_000_000, 'reviews': 5_000_000},
+}
+
+WORDS = ['alien', 'night', 'return', 'star', 'dark', 'love', 'city', 'blood', 'last', 'king',
+         'shadow', 'river', 'dream', 'war', 'ghost', 'summer', 'empire', 'storm', 'secret', 'road']
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance',
+          'Sci-Fi', 'Thriller', 'War', 'Western']
+EPOCH = datetime(2020, 1, 1)
+SPAN_SECONDS = 5 * 365 * 24 * 3600
+# SQLAlchemy's SQLite DateTime format; keyset cursors compare these strings
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _skewed(rng, n):
+    """An id in 1..n, low ids far more likely (popular movies)."""
+    return 1 + int(n * rng.random() ** 3)
+
+
+def _timestamp(rng):
+    return (EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS),
+                              microseconds=rng.randrange(1_000_000))).strftime(TIMESTAMP_FORMAT)
+
+
+def _movie_quality(movie_id):
+    """Stable per-movie mean rating between 3.0 and 8.9."""
+    return 3.0 + (movie_id * 7919 % 60) / 10
+
+
+def _insert(cursor, sql, rows, batch_size):
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        cursor.executemany(sql, batch)
+        count += len(batch)
+
+
+def generate(database_uri, movies, users, list_entries, reviews, seed=42,
+             batch_size=50_000, echo=print):
+    """
+    Create the schema at `database_uri` (an empty SQLite database) and fill it.
+
+    Returns:
+        dict: rows inserted per table.
+    """
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'METRICS_ENABLED': False,
+        'OMDB_CACHE_PATH': None,
+    })
+    rng = random.Random(seed)
+    counts = {}
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        if engine.dialect.name != 'sqlite':
+            raise ValueError('the benchmark generator writes SQLite databases only')
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            # A throwaway bulk load: trade durability for speed
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+            cursor.execute('PRAGMA cache_size = -200000')
+            if cursor.execute('SELECT 1 FROM movies LIMIT 1').fetchone():
+                raise ValueError(f'{database_uri} already has movies; generate into an empty database')
+
+            def step(table, sql, rows):
+                started = time.perf_counter()
+                counts[table] = _insert(cursor, sql, rows, batch_size)
+                conn.commit()
+                echo(f'{table:<24}{counts[table]:>12,} rows  {time.perf_counter() - started:7.1f}s')
+
+            step('genres', 'INSERT INTO genres (id, name) VALUES (?, ?)',
+                 iter(enumerate(GENRES, start=1)))
+
+            movie_genres = []
+
+            def movie_rows():
+                for movie_id in range(1, movies + 1):
+                    picked = rng.sample(range(len(GENRES)), rng.randint(1, 3))
+                    movie_genres.extend((movie_id, g + 1) for g in picked)
+                    title = f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {movie_id}'
+                    yield (movie_id, title, f'Director {rng.randrange(max(movies // 20, 1))}',
+                           1930 + rng.randrange(95), round(_movie_quality(movie_id) + rng.uniform(-1, 1), 1),
+                           None, ', '.join(GENRES[g] for g in picked),
+                           ' '.join(rng.choices(WORDS, k=rng.randint(8, 20))))
+
+            step('movies', 'INSERT INTO movies (id, title, director, year, rating, poster, genre, plot) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', movie_rows())
+            step('movie_genres', 'INSERT INTO movie_genres (movie_id, genre_id) VALUES (?, ?)',
+                 iter(movie_genres))
+            del movie_genres
+
+            step('users', 'INSERT INTO users (id, name) VALUES (?, ?)',
+                 ((user_id, f'user{user_id:07d}') for user_id in range(1, users + 1)))
+
+            def list_rows():
+                per_user, extra = divmod(list_entries, users) if users else (0, 0)
+                for user_id in range(1, users + 1):
+                    wanted = min(per_user + (user_id <= extra), movies)
+                    listed = set()
+                    while len(listed) < wanted:
+                        listed.add(_skewed(rng, movies))
+                    for movie_id in listed:
+                        yield user_id, movie_id, _timestamp(rng)
+
+            step('user_movies', 'INSERT INTO user_movies (user_id, movie_id, added_at) VALUES (?, ?, ?)',
+                 list_rows())
+
+            totals, buckets = {}, {}
+
+            def review_rows():
+                for _ in range(reviews):
+                    movie_id = _skewed(rng, movies)
+                    rating = round(min(max(rng.gauss(_movie_quality(movie_id), 1.5), 0.0), 10.0), 1)
+                    count, total = totals.get(movie_id, (0, 0.0))
+                    totals[movie_id] = (count + 1, total + rating)
+                    key = (movie_id, rating_bucket(rating))
+                    buckets[key] = buckets.get(key, 0) + 1
+                    yield (1 + rng.randrange(users) if users else None, movie_id,
+                           ' '.join(rng.choices(WORDS, k=rng.randint(5, 30))), rating, _timestamp(rng))
+
+            step('reviews', 'INSERT INTO reviews (user_id, movie_id, review_text, rating, created_at) '
+                            'VALUES (?, ?, ?, ?, ?)', review_rows())
+
+            # Aggregates computed the way repair_review_stats does, so it finds nothing to fix
+            def stats_rows():
+                for movie_id in range(1, movies + 1):
+                    count, total = totals.get(movie_id, (0, 0.0))
+                    yield movie_id, count, total, total / count if count else 0.0
+
+            step('movie_stats', 'INSERT INTO movie_stats (movie_id, review_count, rating_sum, avg_rating) '
+                                'VALUES (?, ?, ?, ?)', stats_rows())
+            step('movie_rating_histogram',
+                 'INSERT INTO movie_rating_histogram (movie_id, bucket, count) VALUES (?, ?, ?)',
+                 ((movie_id, bucket, count) for (movie_id, bucket), count in sorted(buckets.items())))
+
+            cursor.execute('ANALYZE')
+            conn.commit()
+        finally:
+            conn.close()
+            engine.dispose()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in ('movies', 'users', 'list-entries', 'reviews'):
+        parser.add_argument(f'--{name}', type=int, help='override the scale preset')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--overwrite', action='store_true', help='replace an existing file')
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    if os.path.exists(args.path):
+        if not args.overwrite:
+            parser.error(f'{args.path} exists (use --overwrite)')
+        os.remove(args.path)
+    started = time.perf_counter()
+    counts = generate(f'sqlite:///{os.path.abspath(args.path)}', seed=args.seed,
+                      batch_size=args.batch_size, **sizes)
+    print(f'Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s')
+    return counts
+
+
+if __name__ == '__main__':
+    main()
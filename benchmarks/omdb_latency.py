@@ -0,0 +1,133 @@
+"""
+omdb_latency.py
+
+Sync vs. async OMDb lookups against a local stub OMDb server with injected
+latency, so the numbers show waiting rather than the real API's mood.
+
+    python -m Movie_Web_App.benchmarks.omdb_latency --latency 0.2 --titles 8
+
+For each round, `--titles` titles are looked up three ways:
+- sync: OMDbClient.fetch one after another, as a sync view would;
+- async: AsyncOMDbClient.fetch_many (httpx when installed);
+- async-threads: fetch_many without httpx, the sync client on threads.
+The table gives the latency of a whole round (p50/p95/p99) and titles
+looked up per second.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Movie_Web_App import omdb_api, omdb_async
+from Movie_Web_App.omdb_api import CircuitBreaker, OMDbClient
+from Movie_Web_App.omdb_async import AsyncOMDbClient
+
+from .report import format_table, summarize
+
+
+class StubOMDb:
+    """OMDb stand-in answering every title after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                title = parse_qs(urlparse(self.path).query).get('t', [''])[0]
+                time.sleep(stub.latency)
+                payload = json.dumps({'Response': 'True', 'Title': title, 'Year': '2000',
+                                      'imdbRating': '7.0', 'Director': 'D', 'Genre': 'Drama',
+                                      'Poster': 'N/A', 'Plot': 'P'}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128   # every async connection at once
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run(latency=0.2, titles=8, rounds=5, concurrency=8, echo=print):
+    """Time every mode; {mode: summary} (per title throughput)."""
+    names = [f'Movie {i}' for i in range(titles)]
+    results = {}
+    saved_cache, omdb_api._cache = omdb_api._cache, None   # measure OMDb, not the cache
+    try:
+        with StubOMDb(latency) as stub:
+            client = OMDbClient(api_key='bench', base_url=stub.url, pool_size=concurrency,
+                                breaker=CircuitBreaker(failure_threshold=10 ** 6))
+            async_client = AsyncOMDbClient(client, concurrency=concurrency)
+
+            def sync_round():
+                return [client.fetch(name) for name in names]
+
+            def async_round():
+                return asyncio.run(async_client.fetch_many(names))
+
+            modes = {'sync': sync_round}
+            if omdb_async.httpx is not None:
+                modes['async'] = async_round
+            else:
+                echo('httpx is not installed (pip install httpx); skipping the async mode')
+            modes['async-threads'] = async_round
+            for mode, round_ in modes.items():
+                saved_httpx = omdb_async.httpx
+                if mode == 'async-threads':
+                    omdb_async.httpx = None
+                try:
+                    latencies = []
+                    for _ in range(rounds):
+                        started = time.perf_counter()
+                        round_()
+                        latencies.append(time.perf_counter() - started)
+                finally:
+                    omdb_async.httpx = saved_httpx
+                summary = summarize(latencies, sum(latencies))
+                summary['requests'] = titles * rounds
+                summary['rps'] = summary['requests'] / sum(latencies)
+                results[mode] = summary
+            client.close()
+    finally:
+        omdb_api._cache = saved_cache
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--latency', type=float, default=0.2, help='stub OMDb delay (s)')
+    parser.add_argument('--titles', type=int, default=8, help='lookups per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=8, help='async lookups in flight')
+    args = parser.parse_args(argv)
+    results = run(args.latency, args.titles, args.rounds, args.concurrency)
+    print(format_table(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
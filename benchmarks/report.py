@@ -0,0 +1,98 @@
+"""
+report.py
+
+Latency summaries and saved baselines shared by the benchmark scripts.
+
+A baseline is a JSON file under benchmarks/baselines/ mapping a scenario
+name to its summary (p50/p95/p99 in ms, requests per second). Comparing a
+run against one flags every scenario whose p95 grew by more than the
+tolerance.
+"""
+
+import json
+import os
+import platform
+import statistics
+import time
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of `values` (0 <= p <= 1); 0.0 when empty."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def summarize(latencies, seconds):
+    """Summary of one scenario: latencies in seconds, wall time in seconds."""
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def format_table(results):
+    """Plain-text table of {scenario: summary}."""
+    header = f"{'scenario':<16}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    lines = [header, '-' * len(header)]
+    for name, r in results.items():
+        lines.append(f"{name:<16}{r['requests']:>9}{r['rps']:>9.1f}"
+                     f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+    return '\n'.join(lines)
+
+
+def baseline_path(name):
+    return name if name.endswith('.json') else os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def save_baseline(name, results, meta=None):
+    """Write `results` (plus where they were measured) as baseline `name`; returns the path."""
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc = {
+        'meta': {'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'python': platform.python_version(), 'machine': platform.machine(),
+                 **(meta or {})},
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(doc, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+    return path
+
+
+def load_baseline(name):
+    with open(baseline_path(name), encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare a run with a loaded baseline.
+
+    Returns:
+        (lines, regressions): a printable line per shared scenario, and the
+        names of scenarios whose p95 exceeds the baseline by more than
+        `tolerance` (0.2 = 20%).
+    """
+    lines, regressions = [], []
+    for name, r in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            lines.append(f'{name:<16} (not in baseline)')
+            continue
+        change = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0.0
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        lines.append(f"{name:<16} p95 {old['p95_ms']:8.2f} -> {r['p95_ms']:8.2f} ms "
+                     f"({change:+.0%}), req/s {old['rps']:.1f} -> {r['rps']:.1f}{flag}")
+    return lines, regressions
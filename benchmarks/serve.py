@@ -0,0 +1,212 @@
+"""
+serve.py
+
+Throughput of the real servers over HTTP: the Flask development server
+(what app.py runs) against gunicorn with gunicorn.conf.py, both on the same
+generated catalog (see datagen.py) and the read-only scenarios of web.py.
+
+    python -m Movie_Web_App.benchmarks.datagen bench.db --scale small
+    python -m Movie_Web_App.benchmarks.serve bench.db --concurrency 16
+
+Each server is started as a subprocess and loaded by `--concurrency`
+client threads with keep-alive connections. The table shows p50/p95/p99
+latency and requests per second per server. The last lines give
+gunicorn's throughput relative to the dev server. gunicorn is skipped,
+with a note, when it isn't installed (`pip install gunicorn`).
+
+Both servers follow serving.check_workers for gunicorn's worker count: with
+several workers and no RESPONSE_CACHE_URL neither caches pages, so the
+comparison is of processes, not of cache hits.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from Movie_Web_App import create_app, db, serving
+
+from .report import format_table, summarize
+from .web import SCENARIOS, Catalog
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Scenarios that don't write, so every server sees the same database
+READ_SCENARIOS = ('index', 'search', 'autocomplete', 'user_movies', 'movie_detail')
+
+
+class HTTPClient:
+    """The part of Flask's test client the web.py scenarios use, over real HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def get(self, path, query_string=None):
+        return self.session.get(self.base_url + path, params=query_string, timeout=60)
+
+    def post(self, path, data=None):
+        return self.session.post(self.base_url + path, data=data, timeout=60)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(port, workers=None):
+    """{name: argv} of the servers to compare (gunicorn only when installed)."""
+    workers = workers or int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+    commands = {'dev': [sys.executable, '-m', 'Movie_Web_App.benchmarks.serve',
+                        '--serve-dev', str(port), '--workers', str(workers)]}
+    if shutil.which('gunicorn'):
+        commands['gunicorn'] = ['gunicorn', '-c', os.path.join(PACKAGE_DIR, 'gunicorn.conf.py'),
+                                '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    return commands
+
+
+def start_server(argv, port, database_uri, timeout=60.0):
+    """Start a server subprocess and wait until it answers; the Popen."""
+    env = dict(os.environ, DATABASE_URL=database_uri, DB_PROFILE='production',
+               PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(PACKAGE_DIR),
+                                                        os.environ.get('PYTHONPATH')])))
+    proc = subprocess.Popen(argv, env=env, cwd=os.path.dirname(PACKAGE_DIR),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{argv[0]} exited with status {proc.returncode}')
+        try:
+            requests.get(f'http://127.0.0.1:{port}/', timeout=5)
+            return proc
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f'{argv[0]} did not start within {timeout:.0f}s')
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def load(base_url, catalog, scenario, requests_, concurrency, warmup=5, seed=0):
+    """
+    `requests_` requests of one scenario from `concurrency` threads.
+    Throughput is taken over the wall time, warm-up excluded.
+    """
+    latencies, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        client = HTTPClient(base_url)
+        for _ in range(warmup):
+            scenario(client, rng, catalog)
+        barrier.wait()
+        local = []
+        for _ in range(count):
+            started = time.perf_counter()
+            resp = scenario(client, rng, catalog)
+            local.append(time.perf_counter() - started)
+            if resp.status_code >= 400:
+                errors.append(f'{resp.request.path_url}: HTTP {resp.status_code}')
+                break
+        with lock:
+            latencies.extend(local)
+
+    share, extra = divmod(requests_, concurrency)
+    pool = [threading.Thread(target=worker, args=(i, share + (i < extra))) for i in range(concurrency)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in pool:
+        t.join()
+    seconds = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(errors[0])
+    return summarize(latencies, seconds)
+
+
+def run(path, scenarios=READ_SCENARIOS, requests_=500, concurrency=16, workers=None, seed=0,
+        echo=print):
+    """Load every available server in turn; {server: {scenario: summary}}."""
+    database_uri = f'sqlite:///{os.path.abspath(path)}'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri, 'OMDB_CACHE_PATH': None,
+                      'POSTER_CACHE_DIR': None})
+    catalog = Catalog(app, seed=seed)
+    app.job_queue.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+
+    port = free_port()
+    commands = server_commands(port, workers)
+    if 'gunicorn' not in commands:
+        echo('gunicorn is not installed (pip install gunicorn); measuring the dev server only')
+    results = {}
+    for server, argv in commands.items():
+        proc = start_server(argv, port, database_uri)
+        try:
+            results[server] = {
+                name: load(f'http://127.0.0.1:{port}', catalog, SCENARIOS[name], requests_,
+                           concurrency, seed=seed)
+                for name in scenarios
+            }
+        finally:
+            stop_server(proc)
+    return results
+
+
+def serve_dev(port, workers=1):
+    """
+    What app.py does, minus the debugger and reloader (which only slow it
+    down), with the page cache gunicorn would get for `workers`.
+    """
+    app = create_app()
+    serving.check_workers(app, workers)
+    app.run(port=port, threaded=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('path', nargs='?', help='SQLite file made by datagen')
+    parser.add_argument('--scenarios', nargs='+', choices=READ_SCENARIOS, default=list(READ_SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='per scenario and server')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--serve-dev', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_dev:
+        return serve_dev(args.serve_dev, args.workers or 1)
+    if not args.path or not os.path.exists(args.path):
+        parser.error('give a SQLite file created with benchmarks.datagen')
+    results = run(args.path, scenarios=args.scenarios, requests_=args.requests,
+                  concurrency=args.concurrency, workers=args.workers, seed=args.seed)
+    for server, summary in results.items():
+        print(f'\n{server}\n{format_table(summary)}')
+    if 'gunicorn' in results:
+        print()
+        for name, dev in results['dev'].items():
+            gain = results['gunicorn'][name]['rps'] / dev['rps'] if dev['rps'] else 0.0
+            print(f'{name:<16}gunicorn {gain:.1f}x the dev server\'s req/s')
+    return results
+
+
+if __name__ == '__main__':
+    main()
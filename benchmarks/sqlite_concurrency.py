@@ -0,0 +1,158 @@
+"""
+sqlite_concurrency.py
+
+Read throughput under concurrent writes, for each DB_PROFILE.
+
+Readers page through the catalog and run full-text searches while writers
+post reviews as fast as they can; the same workload runs once per profile
+against a fresh database file. Each profile's readers first run alone, so
+the report shows what the writers cost them, and a last line compares
+every profile with the first.
+
+    python -m Movie_Web_App.benchmarks.sqlite_concurrency --readers 8 --writers 2 --seconds 10
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from Movie_Web_App import create_app, db
+from Movie_Web_App.data_manager.models import Movie
+from Movie_Web_App.data_manager.pagination import encode_cursor
+
+from .report import percentile
+
+WORDS = ["alien", "night", "return", "star", "dark", "love", "city", "blood", "last", "king"]
+
+
+def run_profile(name, movies, readers, writers, seconds):
+    tmp = tempfile.mkdtemp(prefix="movieweb-bench-")
+    try:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.db",
+            "DB_PROFILE": name,
+            "METRICS_ENABLED": False,
+            "OMDB_CACHE_PATH": None,
+        })
+        dm = app.data_manager
+        rng = random.Random(42)
+        with app.app_context():
+            db.create_all()
+            rows = [{"title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                     "year": 1950 + i % 70, "director": f"Director {i % 500}",
+                     "genre": "Drama", "plot": " ".join(rng.choices(WORDS, k=12))}
+                    for i in range(movies)]
+            db.session.execute(insert(Movie), rows)
+            db.session.commit()
+            cursors = [encode_cursor([r["title"], i + 1]) for i, r in enumerate(rows[::97])]
+
+        stop = threading.Event()
+        read_latencies, reads, writes, errors = [], [0], [0], [0]
+        lock = threading.Lock()
+
+        def reader(seed):
+            local = random.Random(seed)
+            with app.app_context():
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        if local.random() < 0.5:
+                            dm.get_movies(after=local.choice(cursors))
+                        else:
+                            dm.search_movies(local.choice(WORDS)[:3])
+                    except OperationalError:
+                        db.session.rollback()
+                        with lock:
+                            errors[0] += 1
+                        continue
+                    finally:
+                        db.session.remove()
+                    with lock:
+                        reads[0] += 1
+                        read_latencies.append(time.perf_counter() - started)
+
+        def writer(seed):
+            local = random.Random(seed)
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        dm.add_review(local.randint(1, movies), "Benchmark review", 7.0)
+                        with lock:
+                            writes[0] += 1
+                    except OperationalError:
+                        db.session.rollback()
+                        with lock:
+                            errors[0] += 1
+                    finally:
+                        db.session.remove()
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        with app.app_context():
+            db.engine.dispose()
+
+        return {
+            "profile": name,
+            "reads_per_s": reads[0] / seconds,
+            "writes_per_s": writes[0] / seconds,
+            "p50_ms": percentile(read_latencies, 0.50) * 1000,
+            "p95_ms": percentile(read_latencies, 0.95) * 1000,
+            "p99_ms": percentile(read_latencies, 0.99) * 1000,
+            "mean_ms": statistics.fmean(read_latencies) * 1000 if read_latencies else 0.0,
+            "lock_errors": errors[0],
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    args = parser.parse_args(argv)
+
+    results = []
+    for profile in args.profiles:
+        alone = run_profile(profile, args.movies, args.readers, 0, args.seconds)
+        result = (run_profile(profile, args.movies, args.readers, args.writers, args.seconds)
+                  if args.writers else dict(alone))
+        result["reads_alone_per_s"] = alone["reads_per_s"]
+        results.append(result)
+    header = (f"{'profile':<12}{'reads/s alone':>15}{'reads/s':>10}{'writes/s':>10}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'lock errs':>11}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['profile']:<12}{r['reads_alone_per_s']:>15.0f}{r['reads_per_s']:>10.0f}"
+              f"{r['writes_per_s']:>10.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['lock_errors']:>11}")
+    base = results[0]
+    for r in results[1:]:
+        print(f"{r['profile']} vs {base['profile']}: "
+              f"reads x{_ratio(r['reads_per_s'], base['reads_per_s'])}, "
+              f"writes x{_ratio(r['writes_per_s'], base['writes_per_s'])}")
+    return results
+
+
+def _ratio(value, base):
+    return f"{value / base:.2f}" if base else "-"
+
+
+if __name__ == "__main__":
+    main()
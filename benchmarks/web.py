@@ -0,0 +1,213 @@
+"""
+web.py
+
+Request latency of the main pages against a generated catalog (see
+datagen.py), through the Flask test client: no network or WSGI server in
+the numbers, just routing, queries and template rendering.
+
+Each scenario issues its requests back to back (optionally from several
+threads) after a short warm-up, and reports p50/p95/p99 latency and
+requests per second. Save a run as a baseline and compare later runs
+against it:
+
+    python -m Movie_Web_App.benchmarks.datagen bench.db --scale small
+    python -m Movie_Web_App.benchmarks.web bench.db --save-baseline small
+    python -m Movie_Web_App.benchmarks.web bench.db --compare small
+
+`--compare` exits with status 1 when a scenario's p95 regressed by more
+than `--tolerance`. The page cache is off unless `--cache` is given, so the
+numbers measure the rendering path rather than cache hits.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from Movie_Web_App import create_app, db
+from Movie_Web_App.data_manager.models import Movie, User
+from Movie_Web_App.data_manager.pagination import encode_cursor
+
+from .datagen import WORDS
+from .report import compare, format_table, load_baseline, save_baseline, summarize
+
+
+class Catalog:
+    """What the scenarios need to know about the database: id ranges and some cursors."""
+
+    def __init__(self, app, samples=500, seed=0):
+        rng = random.Random(seed)
+        with app.app_context():
+            self.max_movie = db.session.scalar(select(func.max(Movie.id))) or 0
+            self.max_user = db.session.scalar(select(func.max(User.id))) or 0
+            if not self.max_movie or not self.max_user:
+                raise ValueError('the database has no movies or users; run datagen first')
+            ids = [rng.randint(1, self.max_movie) for _ in range(samples)]
+            rows = db.session.execute(select(Movie.title, Movie.id).where(Movie.id.in_(ids))).all()
+        # mid-catalog positions for deep pagination
+        self.title_cursors = [encode_cursor([title, movie_id]) for title, movie_id in rows]
+
+
+def scenario_index(client, rng, catalog):
+    if rng.random() < 0.5:
+        return client.get('/', query_string={'after': rng.choice(catalog.title_cursors)})
+    return client.get('/', query_string={'sort': rng.choice(['title', 'rating', 'popular'])})
+
+
+def scenario_search(client, rng, catalog):
+    q = rng.choice(WORDS)
+    if rng.random() < 0.5:
+        q = q[:3]   # prefix match, like a half-typed query
+    return client.get('/search', query_string={'q': q})
+
+
+def scenario_autocomplete(client, rng, catalog):
+    word = rng.choice(WORDS)
+    q = word[:rng.randint(1, len(word))]   # every keystroke of a word
+    if rng.random() < 0.2 and len(q) > 3:
+        q = q[:1] + q[2] + q[1] + q[3:]      # a typo: two letters swapped
+    return client.get('/api/autocomplete', query_string={'q': q})
+
+
+def scenario_user_movies(client, rng, catalog):
+    return client.get(f'/users/{rng.randint(1, catalog.max_user)}')
+
+
+def scenario_movie_detail(client, rng, catalog):
+    # skewed towards the popular (many-review) movies, as real traffic is
+    movie_id = 1 + int(catalog.max_movie * rng.random() ** 3)
+    return client.get(f'/movies/{movie_id}')
+
+
+def scenario_post_review(client, rng, catalog):
+    movie_id = rng.randint(1, catalog.max_movie)
+    return client.post(f'/movies/{movie_id}', data={
+        'review_text': ' '.join(rng.choices(WORDS, k=12)),
+        'rating': f'{rng.uniform(1, 10):.1f}',
+    })
+
+
+SCENARIOS = {
+    'index': scenario_index,
+    'search': scenario_search,
+    'autocomplete': scenario_autocomplete,
+    'user_movies': scenario_user_movies,
+    'movie_detail': scenario_movie_detail,
+    'post_review': scenario_post_review,
+}
+
+
+def run_scenario(app, catalog, scenario, requests, warmup=10, threads=1, seed=0):
+    """
+    Issue `requests` requests of one scenario (split across `threads`).
+
+    Returns:
+        dict: summary as produced by report.summarize.
+    Raises:
+        RuntimeError: a request failed (status >= 400).
+    """
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        client = app.test_client()
+        local = []
+        for i in range(warmup + count):
+            started = time.perf_counter()
+            resp = scenario(client, rng, catalog)
+            elapsed = time.perf_counter() - started
+            if resp.status_code >= 400:
+                errors.append(f'{resp.request.path}: HTTP {resp.status_code}')
+                return
+            if i >= warmup:
+                local.append(elapsed)
+        with lock:
+            latencies.extend(local)
+
+    share, extra = divmod(requests, threads)
+    pool = [threading.Thread(target=worker, args=(i, share + (i < extra))) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    seconds = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(errors[0])
+    # warm-up time is in `seconds` too; only count it out for a single thread
+    if threads == 1 and latencies:
+        seconds = sum(latencies)
+    return summarize(latencies, seconds)
+
+
+def run(database_uri, scenarios=None, requests=200, warmup=10, threads=1, cache=False,
+        profile='production', seed=0):
+    """Run the named scenarios (all by default) against `database_uri`; {name: summary}."""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'DB_PROFILE': profile,
+        'METRICS_ENABLED': False,
+        'OMDB_CACHE_PATH': None,
+        'POSTER_CACHE_DIR': None,
+        'RESPONSE_CACHE_ENABLED': cache,
+        'SECRET_KEY': 'benchmark',
+    })
+    catalog = Catalog(app, seed=seed)
+    if app.autocomplete is not None:
+        app.autocomplete.warm()   # as a server would at startup, not in the first request
+    results = {}
+    try:
+        for name in scenarios or SCENARIOS:
+            results[name] = run_scenario(app, catalog, SCENARIOS[name], requests,
+                                         warmup=warmup, threads=threads, seed=seed)
+    finally:
+        app.job_queue.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('path', help='SQLite file made by datagen')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per thread')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--cache', action='store_true', help='enable the page cache')
+    parser.add_argument('--profile', default='production', help='DB_PROFILE to run with')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='NAME', help='store results in benchmarks/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='NAME', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        parser.error(f'{args.path} does not exist; create it with benchmarks.datagen')
+    results = run(f'sqlite:///{os.path.abspath(args.path)}', scenarios=args.scenarios,
+                  requests=args.requests, warmup=args.warmup, threads=args.threads,
+                  cache=args.cache, profile=args.profile, seed=args.seed)
+    print(format_table(results))
+
+    if args.save_baseline:
+        path = save_baseline(args.save_baseline, results, meta={
+            'database': os.path.basename(args.path), 'requests': args.requests,
+            'threads': args.threads, 'cache': args.cache, 'profile': args.profile,
+        })
+        print(f'Baseline written to {path}')
+    if args.compare:
+        lines, regressions = compare(results, load_baseline(args.compare), args.tolerance)
+        print('\n'.join(lines))
+        if regressions:
+            print(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Storage backends. Each implements DataManagerInterface; create_app picks
+one from the DATA_MANAGER setting ('auto' follows the database URI).
+"""
+
+from importlib import import_module
+
+from sqlalchemy.engine import make_url
+
+BACKENDS = {
+    'sqlite': ('.sqlite_data_manager', 'SQLiteDataManager'),
+    'postgresql': ('.postgres_data_manager', 'PostgresDataManager'),
+}
+
+
+def backend_class(name: str, database_uri: str):
+    """Resolve a DATA_MANAGER setting to a manager class (ValueError if unknown)."""
+    if name == 'auto':
+        name = make_url(database_uri).get_backend_name()
+    try:
+        module, cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown DATA_MANAGER {name!r}; choose from "
+                         f"{['auto', *sorted(BACKENDS)]}") from None
+    return getattr(import_module(module, __name__), cls)
@@ -2,27 +2,146 @@ from abc import ABC, abstractmethod
 
 
 class DataManagerInterface(ABC):
+    """
+    Everything the web layer needs from storage. Routes talk to this
+    interface only, so backends (SQLite, PostgreSQL, ...) are swappable.
 
+    List-returning methods that take `page_size`/`after`/`before` return a
+    pagination.Page and use keyset cursors.
+    """
+
+    # -- transactions ---------------------------------------------------------
+    @abstractmethod
+    def rollback(self):
+        pass
+
+    # -- users ------------------------------------------------------------------
     @abstractmethod
     def get_all_users(self):
         pass
 
     @abstractmethod
-    def get_user_movies(self, user_id):
+    def get_users(self, page_size, after=None, before=None):
+        pass
+
+    @abstractmethod
+    def get_user(self, user_id):
+        pass
+
+    @abstractmethod
+    def search_users(self, q, limit):
         pass
 
     @abstractmethod
-    def add_user(self, user):
+    def add_user(self, name):
         pass
 
     @abstractmethod
-    def add_movie(self, movie):
+    def delete_user(self, user_id):
         pass
 
+    # -- movies -----------------------------------------------------------------
     @abstractmethod
-    def update_movie(self, movie):
+    def get_movie(self, movie_id):
+        pass
+
+    @abstractmethod
+    def get_movies(self, genre=None, sort='title', page_size=None, after=None, before=None):
+        pass
+
+    @abstractmethod
+    def get_genres(self):
+        pass
+
+    @abstractmethod
+    def search_movies(self, q, genre=None, exclude_user_id=None,
+                      page_size=None, after=None, before=None):
+        pass
+
+    @abstractmethod
+    def add_movie(self, title, director=None, year=None, rating=None,
+                  poster=None, genre=None, plot=None):
+        pass
+
+    @abstractmethod
+    def update_movie(self, movie_id, **fields):
         pass
 
     @abstractmethod
     def delete_movie(self, movie_id):
         pass
+
+    # -- lists ------------------------------------------------------------------
+    @abstractmethod
+    def get_user_movies(self, user_id):
+        pass
+
+    @abstractmethod
+    def get_user_movies_page(self, user_id, page_size=None, after=None, before=None):
+        pass
+
+    @abstractmethod
+    def get_listed_movie_ids(self, user_id, movie_ids):
+        pass
+
+    @abstractmethod
+    def is_listed(self, user_id, movie_id):
+        pass
+
+    @abstractmethod
+    def add_to_list(self, user_id, movie_id):
+        pass
+
+    @abstractmethod
+    def remove_from_list(self, user_id, movie_id):
+        pass
+
+    @abstractmethod
+    def edit_list(self, user_id, add, remove):
+        pass
+
+    @abstractmethod
+    def find_movie_ids_by_title(self, titles):
+        pass
+
+    # -- recommendations ----------------------------------------------------------
+    @abstractmethod
+    def get_similar_movies(self, movie_id, limit):
+        pass
+
+    @abstractmethod
+    def get_recommendations(self, user_id, limit):
+        pass
+
+    @abstractmethod
+    def refresh_recommendations(self, user_id):
+        pass
+
+    # -- reviews ----------------------------------------------------------------
+    @abstractmethod
+    def add_review(self, movie_id, review_text, rating):
+        pass
+
+    @abstractmethod
+    def delete_review(self, review_id):
+        pass
+
+    @abstractmethod
+    def get_rating_histogram(self, movie_id):
+        pass
+
+    @abstractmethod
+    def repair_review_stats(self):
+        pass
+
+    @abstractmethod
+    def get_movie_reviews(self, movie_id):
+        pass
+
+    @abstractmethod
+    def get_movie_reviews_page(self, movie_id, page_size=None, after=None, before=None):
+        pass
+
+    @abstractmethod
+    def get_user_reviews(self, user_id):
+        pass
@@ -1,13 +1,32 @@
+import itertools
 from datetime import datetime
+from sqlalchemy import DDL, case, event
+from sqlalchemy.orm import attributes
 from Movie_Web_App import db
 
 
+# `added_at` of list entries saved before it was recorded (sorts oldest);
+# NOT NULL keeps keyset pages on it the same on every backend
+UNKNOWN_ADDED_AT = datetime(1970, 1, 1)
+
 # Association table for users↔movies
 user_movies = db.Table(
     'user_movies',
     db.Column('user_id',  db.Integer, db.ForeignKey('users.id'),   primary_key=True),
     db.Column('movie_id', db.Integer, db.ForeignKey('movies.id'),  primary_key=True),
-    db.Column('added_at', db.DateTime, default=datetime.utcnow)
+    db.Column('added_at', db.DateTime, nullable=False, default=datetime.utcnow),
+    # a user's list, newest first (the PK already serves user_id lookups)
+    db.Index('ix_user_movies_user_id_added_at', 'user_id', 'added_at', 'movie_id'),
+    # who has a movie listed (relationship loads, deletes)
+    db.Index('ix_user_movies_movie_id', 'movie_id', 'user_id'),
+)
+
+# Association table for movies↔genres (indexed both ways)
+movie_genres = db.Table(
+    'movie_genres',
+    db.Column('movie_id', db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_movie_genres_genre_id_movie_id', 'genre_id', 'movie_id'),
 )
 
 class User(db.Model):
@@ -30,15 +49,38 @@ class Movie(db.Model):
     poster   = db.Column(db.String(255))
     genre    = db.Column(db.String(120))   # new: genre list, comma‑separated
     plot     = db.Column(db.Text, nullable=True)
+    # When the OMDb fields were last fetched (NULL: unknown, refresh first);
+    # see refresh.py
+    last_fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     users = db.relationship('User', secondary=user_movies, back_populates='movies')
     reviews = db.relationship('Review', back_populates='movie', cascade="all, delete-orphan")
+    # Normalized view of `genre`; kept in sync on flush (see sync_movie_genres)
+    genres = db.relationship('Genre', secondary=movie_genres, back_populates='movies')
+    # Review aggregates; maintained on flush (see track_review_stats)
+    stats = db.relationship('MovieStats', uselist=False, back_populates='movie',
+                            cascade="all, delete-orphan")
+    rating_histogram = db.relationship('RatingBucket', back_populates='movie',
+                                       order_by='RatingBucket.bucket',
+                                       cascade="all, delete-orphan")
 
     __table_args__ = (
         db.UniqueConstraint('title', 'year', name='uq_movie_title_year'),
+        # catalog order (title, id)
+        db.Index('ix_movies_title_id', 'title', 'id'),
+        # refresh-metadata's staleness filter
+        db.Index('ix_movies_last_fetched_at', 'last_fetched_at'),
     )
 
 
+class Genre(db.Model):
+    __tablename__ = 'genres'
+    id   = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(40), unique=True, nullable=False)
+
+    movies = db.relationship('Movie', secondary=movie_genres, back_populates='genres')
+
+
 class Review(db.Model):
     __tablename__ = "reviews"
 
@@ -47,8 +89,385 @@ class Review(db.Model):
     movie_id    = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False)
     review_text = db.Column(db.Text, nullable=False)
     rating      = db.Column(db.Float, nullable=False)
-    created_at  = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+    # Python-side default keeps the stored format (with microseconds) uniform,
+    # which keyset cursors rely on when comparing timestamps
+    created_at  = db.Column(db.DateTime, default=datetime.utcnow,
+                            server_default=db.func.now(), nullable=False)
 
     # relationships
     user  = db.relationship('User', back_populates='reviews')
     movie = db.relationship('Movie', back_populates='reviews')
+
+    # a movie's / a user's reviews, newest first
+    __table_args__ = (
+        db.Index('ix_reviews_movie_id_created_at', 'movie_id', 'created_at', 'review_id'),
+        db.Index('ix_reviews_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+
+class MovieStats(db.Model):
+    """Per-movie review count and average, one row per movie."""
+    __tablename__ = 'movie_stats'
+    movie_id     = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+                             primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum   = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    avg_rating   = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
+    movie = db.relationship('Movie', back_populates='stats')
+
+    # Catalog sort orders seek along these
+    __table_args__ = (
+        db.Index('ix_movie_stats_avg_rating', 'avg_rating', 'movie_id'),
+        db.Index('ix_movie_stats_review_count', 'review_count', 'movie_id'),
+    )
+
+
+class RatingBucket(db.Model):
+    """Number of reviews of a movie whose rating rounds to `bucket` (0-10)."""
+    __tablename__ = 'movie_rating_histogram'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+                         primary_key=True)
+    bucket   = db.Column(db.SmallInteger, primary_key=True)
+    count    = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    movie = db.relationship('Movie', back_populates='rating_histogram')
+
+
+class MovieCooccurrence(db.Model):
+    """
+    How many users list both `movie_id` and `other_id`. Stored in both
+    directions, so a movie's neighbours are one index range (see
+    recommendations.py).
+    """
+    __tablename__ = 'movie_cooccurrence'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+                         primary_key=True)
+    other_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+                         primary_key=True)
+    count    = db.Column(db.Integer, nullable=False, default=0)
+
+    # "also listed": a movie's neighbours, strongest first
+    __table_args__ = (
+        db.Index('ix_movie_cooccurrence_movie_id_count', 'movie_id', 'count', 'other_id'),
+        # deleting a movie checks the reverse pairs' foreign key
+        db.Index('ix_movie_cooccurrence_other_id', 'other_id'),
+    )
+
+
+class UserRecommendation(db.Model):
+    """A user's precomputed "recommended for you" movies (top few only)."""
+    __tablename__ = 'user_recommendations'
+    user_id  = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+                         primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'),
+                         primary_key=True)
+    score    = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_user_recommendations_user_id_score', 'user_id', 'score', 'movie_id'),
+        # deleting a movie drops it from everyone's recommendations
+        db.Index('ix_user_recommendations_movie_id', 'movie_id'),
+    )
+
+
+class EnrichmentJob(db.Model):
+    """A title waiting to be looked up on OMDb and added (see jobs.py)."""
+    __tablename__ = 'enrichment_jobs'
+    id           = db.Column(db.Integer, primary_key=True)
+    title        = db.Column(db.String(200), nullable=False)
+    # release year to look up, when known (e.g. from an imported watchlist)
+    year         = db.Column(db.Integer, nullable=True)
+    # list to add the movie to once it exists
+    user_id      = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'),
+                             nullable=True)
+    status       = db.Column(db.String(16), nullable=False, default='pending')
+    attempts     = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error   = db.Column(db.Text)
+    movie_id     = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='SET NULL'),
+                             nullable=True)
+    run_after    = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Workers claim the oldest due pending job; user pages list their own
+    __table_args__ = (
+        db.Index('ix_enrichment_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_enrichment_jobs_user_id_status', 'user_id', 'status'),
+        # ON DELETE SET NULL when a movie is deleted
+        db.Index('ix_enrichment_jobs_movie_id', 'movie_id'),
+    )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'not_found', 'failed')
+
+
+
+class ListImport(db.Model):
+    """A watchlist CSV being imported into a user's list (see importer.py)."""
+    __tablename__ = 'list_imports'
+    id         = db.Column(db.Integer, primary_key=True)
+    user_id    = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'),
+                           nullable=True)
+    filename   = db.Column(db.String(255), nullable=False)
+    # pending -> running -> done | failed
+    status     = db.Column(db.String(16), nullable=False, default='pending')
+    # progress: rows read, found in the catalog, newly listed, queued for
+    # OMDb, and left out (duplicates or over the lookup limit)
+    rows       = db.Column(db.Integer, nullable=False, default=0)
+    matched    = db.Column(db.Integer, nullable=False, default=0)
+    added      = db.Column(db.Integer, nullable=False, default=0)
+    queued     = db.Column(db.Integer, nullable=False, default=0)
+    skipped    = db.Column(db.Integer, nullable=False, default=0)
+    error      = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # ON DELETE SET NULL when a user is deleted
+    __table_args__ = (
+        db.Index('ix_list_imports_user_id', 'user_id'),
+    )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+def rating_bucket(rating: float) -> int:
+    """Histogram bucket for a 0-10 rating: the nearest whole point."""
+    return min(max(int(rating + 0.5), 0), 10)
+
+
+def split_genres(genre: str | None) -> list[str]:
+    """Split OMDb's comma-separated genre string into unique, ordered names."""
+    names = []
+    for name in (genre or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+@event.listens_for(db.session, 'before_flush')
+def sync_movie_genres(session, flush_context, instances):
+    """Mirror Movie.genre into the genres/movie_genres tables before every flush."""
+    pending = [
+        obj for obj in (*session.new, *session.dirty)
+        if isinstance(obj, Movie)
+        and (obj in session.new or attributes.get_history(obj, 'genre').has_changes())
+    ]
+    if not pending:
+        return
+
+    wanted = {name for movie in pending for name in split_genres(movie.genre)}
+    with session.no_autoflush:
+        known = {
+            g.name: g for g in
+            session.query(Genre).filter(Genre.name.in_(wanted)).all()
+        } if wanted else {}
+    for name in wanted - known.keys():
+        known[name] = Genre(name=name)
+        session.add(known[name])
+
+    for movie in pending:
+        movie.genres = [known[name] for name in split_genres(movie.genre)]
+
+
+def _upsert(session, table):
+    """INSERT ... ON CONFLICT builder for the session's dialect."""
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def apply_review_deltas(session, movie_deltas, bucket_deltas):
+    """
+    Add `movie_deltas` {movie_id: (count, rating_sum)} and `bucket_deltas`
+    {(movie_id, bucket): count} to the aggregate tables in place, so
+    concurrent writers never overwrite each other's increments.
+    """
+    stats = MovieStats.__table__
+    for movie_id, (count, total) in movie_deltas.items():
+        stmt = _upsert(session, stats).values(
+            movie_id=movie_id, review_count=count, rating_sum=total,
+            avg_rating=total / count if count > 0 else 0.0,
+        )
+        new_count = stats.c.review_count + stmt.excluded.review_count
+        new_sum = stats.c.rating_sum + stmt.excluded.rating_sum
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[stats.c.movie_id],
+            set_={
+                'review_count': new_count,
+                'rating_sum': new_sum,
+                'avg_rating': case((new_count > 0, new_sum / new_count), else_=0.0),
+            },
+        ))
+    histogram = RatingBucket.__table__
+    for (movie_id, bucket), count in bucket_deltas.items():
+        stmt = _upsert(session, histogram).values(movie_id=movie_id, bucket=bucket, count=count)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[histogram.c.movie_id, histogram.c.bucket],
+            set_={'count': histogram.c.count + stmt.excluded.count},
+        ))
+
+
+def apply_cooccurrence_deltas(session, movie_id, others, sign):
+    """
+    Count one more (sign=1) or one fewer (sign=-1) user listing `movie_id`
+    together with each of `others`, in both directions.
+    """
+    if not others:
+        return
+    table = MovieCooccurrence.__table__
+    _add_pair_counts(session, [(movie_id, other, sign) for other in others])
+    if sign < 0:
+        session.execute(table.delete().where(
+            table.c.count <= 0,
+            db.or_(db.and_(table.c.movie_id == movie_id, table.c.other_id.in_(others)),
+                   db.and_(table.c.other_id == movie_id, table.c.movie_id.in_(others))),
+        ))
+
+
+def apply_list_edit(session, kept, added, removed):
+    """
+    Co-occurrence counts for one list edit at once: `removed` movies leave
+    a list that keeps `kept`, then `added` ones join it.
+    """
+    pairs = [(r, other, -1) for i, r in enumerate(removed)
+             for other in itertools.chain(kept, removed[i + 1:])]
+    pairs += [(a, other, 1) for i, a in enumerate(added)
+              for other in itertools.chain(kept, added[i + 1:])]
+    if not pairs:
+        return
+    _add_pair_counts(session, pairs)
+    if removed:
+        table = MovieCooccurrence.__table__
+        # every pair that lost a count has a removed movie on one side
+        session.execute(table.delete().where(
+            table.c.count <= 0, table.c.movie_id.in_([*kept, *removed])))
+
+
+def touch_movies(session, movie_ids):
+    """
+    Note movies whose "also listed" neighbours changed through Core
+    statements, which the ORM flush never sees; response_cache invalidates
+    their pages when the transaction commits.
+    """
+    session.info.setdefault('touched_movies', set()).update(movie_ids)
+
+
+def _add_pair_counts(session, pairs):
+    """Upsert (a, b, delta) into both directions in one executemany."""
+    table = MovieCooccurrence.__table__
+    touch_movies(session, {movie_id for a, b, _ in pairs for movie_id in (a, b)})
+    rows = [{'movie_id': x, 'other_id': y, 'count': delta}
+            for a, b, delta in pairs for x, y in ((a, b), (b, a))]
+    stmt = _upsert(session, table)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.movie_id, table.c.other_id],
+        set_={'count': table.c.count + stmt.excluded.count},
+    ), rows)
+
+
+@event.listens_for(db.session, 'before_flush')
+def create_movie_stats(session, flush_context, instances):
+    """Give every new movie its (empty) stats row."""
+    for obj in session.new:
+        if isinstance(obj, Movie) and obj.stats is None:
+            obj.stats = MovieStats(review_count=0, rating_sum=0.0, avg_rating=0.0)
+
+
+@event.listens_for(db.session, 'after_flush')
+def track_review_stats(session, flush_context):
+    """
+    Fold reviews inserted or deleted by this flush (including cascades from
+    a deleted user) into movie_stats and the rating histogram.
+    """
+    deleted_movies = {obj.id for obj in session.deleted if isinstance(obj, Movie)}
+    movie_deltas, bucket_deltas = {}, {}
+    for sign, objs in ((1, session.new), (-1, session.deleted)):
+        for rv in objs:
+            if not isinstance(rv, Review) or rv.movie_id in deleted_movies:
+                continue
+            count, total = movie_deltas.get(rv.movie_id, (0, 0.0))
+            movie_deltas[rv.movie_id] = (count + sign, total + sign * rv.rating)
+            key = (rv.movie_id, rating_bucket(rv.rating))
+            bucket_deltas[key] = bucket_deltas.get(key, 0) + sign
+    if movie_deltas:
+        apply_review_deltas(session, movie_deltas, bucket_deltas)
+
+
+# Full-text index over the catalog: an external-content FTS5 table that mirrors
+# movies.title/director/plot/genre and is kept in sync by triggers, so every
+# write path (routes, seed-movies, raw SQL) updates it without extra code.
+# Updates re-index only when an indexed column is written, so bumping e.g.
+# last_fetched_at leaves the index alone.
+movies_fts = db.table('movies_fts', db.column('rowid'), db.column('rank'))
+
+MOVIES_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title, director, plot, genre,
+        content='movies', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title, director, plot, genre)
+        VALUES (new.id, new.title, new.director, new.plot, new.genre);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+        VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_au
+    AFTER UPDATE OF title, director, plot, genre ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+        VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+        INSERT INTO movies_fts(rowid, title, director, plot, genre)
+        VALUES (new.id, new.title, new.director, new.plot, new.genre);
+    END
+    """,
+)
+
+for _stmt in MOVIES_FTS_DDL:
+    event.listen(Movie.__table__, 'after_create', DDL(_stmt).execute_if(dialect='sqlite'))
+event.listen(
+    Movie.__table__, 'before_drop',
+    DDL('DROP TABLE IF EXISTS movies_fts').execute_if(dialect='sqlite')
+)
+
+
+# PostgreSQL equivalent: a stored, generated tsvector column (weighted so
+# title hits outrank plot hits) with a GIN index, plus a pg_trgm index so
+# `name ILIKE '%q%'` user search doesn't scan the table. The column is not
+# mapped; PostgresDataManager refers to it by name.
+MOVIES_TSVECTOR_DDL = (
+    """
+    ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(director, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(genre, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(plot, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING gin (search_vector)",
+)
+USERS_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+)
+
+for _stmt in MOVIES_TSVECTOR_DDL:
+    event.listen(Movie.__table__, 'after_create', DDL(_stmt).execute_if(dialect='postgresql'))
+for _stmt in USERS_TRGM_DDL:
+    event.listen(User.__table__, 'after_create', DDL(_stmt).execute_if(dialect='postgresql'))
@@ -0,0 +1,155 @@
+"""
+pagination.py
+
+Keyset (seek) pagination for SQLAlchemy queries.
+
+Instead of OFFSET, each page remembers the sort key of its first and last row
+in an opaque cursor; the next query seeks past that key using the same index
+that provides the ordering, so page N costs the same as page 1.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import and_, or_
+
+
+@dataclass
+class Page:
+    """One page of results plus the cursors needed to move around it."""
+    items: list
+    total: int
+    page_size: int
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Pack a row's sort key into a URL-safe token."""
+    def tag(v):
+        return {'dt': v.isoformat()} if isinstance(v, datetime) else v
+    raw = json.dumps([tag(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None) -> list | None:
+    """Inverse of encode_cursor; returns None for missing or tampered cursors."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list):
+        return None
+    decoded = []
+    for v in values:
+        if isinstance(v, dict):
+            if set(v) != {'dt'}:
+                return None
+            try:
+                v = datetime.fromisoformat(v['dt'])
+            except (TypeError, ValueError):
+                return None
+        elif not isinstance(v, (str, int, float, type(None))):
+            return None
+        decoded.append(v)
+    return decoded
+
+
+def _fits(order, values) -> bool:
+    """Whether cursor `values` have the Python types of the `order` columns."""
+    if len(values) != len(order):
+        return False
+    for (col, _), value in zip(order, values):
+        if value is None:
+            continue
+        try:
+            expected = col.type.python_type
+        except NotImplementedError:   # untyped expressions, e.g. a search rank
+            continue
+        if expected is float:
+            expected = (int, float)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            return False
+        if isinstance(value, int) and not -2**63 <= value < 2**63:
+            return False
+    return True
+
+
+def _seek(order, values, forward):
+    """WHERE clause selecting rows strictly after (or before) `values`."""
+    clauses = []
+    for i, ((col, desc), value) in enumerate(zip(order, values)):
+        beyond = col < value if desc == forward else col > value
+        ties = [c == v for (c, _), v in zip(order[:i], values[:i])]
+        clauses.append(and_(*ties, beyond))
+    return or_(*clauses)
+
+
+def paginate(query, order, key: Callable[[Any], Sequence[Any]], page_size: int,
+             after: str | None = None, before: str | None = None) -> Page:
+    """
+    Fetch one page of `query` using keyset pagination.
+
+    Args:
+        query: an unordered ORM query.
+        order: [(column, descending), ...]; must end in a unique column so the
+            ordering is total and stable.
+        key: maps a result row to its values for the `order` columns.
+        page_size: maximum number of rows on the page.
+        after / before: cursors from a previous Page (`before` wins if both);
+            a missing or invalid cursor gives the first page.
+
+    Returns:
+        Page: rows in display order, the total row count, and next/prev cursors.
+    """
+    total = query.order_by(None).count()
+
+    forward = not before
+    values = decode_cursor(before or after)
+    if values is not None and not _fits(order, values):
+        values = None
+    if values is None:
+        forward = True   # a bad cursor in either direction means the first page
+    else:
+        query = query.filter(_seek(order, values, forward))
+
+    ordering = [col.desc() if desc == forward else col.asc() for col, desc in order]
+    rows = query.order_by(*ordering).limit(page_size + 1).all()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else values is not None
+    has_prev = values is not None if forward else more
+    return Page(
+        items=rows,
+        total=total,
+        page_size=page_size,
+        next_cursor=encode_cursor(key(rows[-1])) if rows and has_next else None,
+        prev_cursor=encode_cursor(key(rows[0])) if rows and has_prev else None,
+    )
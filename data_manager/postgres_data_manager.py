@@ -0,0 +1,36 @@
+import re
+from sqlalchemy import cast, func, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from Movie_Web_App.data_manager.models import Movie
+from Movie_Web_App.data_manager.sqlalchemy_data_manager import SQLAlchemyDataManager
+
+# Generated column created by models.MOVIES_TSVECTOR_DDL (not mapped on Movie)
+search_vector = literal_column('movies.search_vector')
+
+
+def tsquery_expression(q: str) -> str:
+    """Turn free text into a to_tsquery() string: every word must match as a prefix."""
+    words = re.findall(r'\w+', q or '')
+    return ' & '.join(f'{w}:*' for w in words)
+
+
+class PostgresDataManager(SQLAlchemyDataManager):
+    """
+    PostgreSQL backend: search runs on the GIN-indexed `search_vector`
+    column, and user name search is served by a pg_trgm index.
+    """
+
+    # ts_rank_cd: larger is better
+    RANK_DESCENDING = True
+
+    def _search_hits(self, q: str):
+        expression = tsquery_expression(q)
+        if not expression:
+            return None
+        query = func.to_tsquery(cast('simple', REGCONFIG), expression)
+        return (
+            self.db.select(Movie.id.label('movie_id'),
+                           func.ts_rank_cd(search_vector, query).label('rank'))
+            .where(search_vector.op('@@')(query))
+            .subquery()
+        )
@@ -0,0 +1,462 @@
+from Movie_Web_App.data_manager.data_manager_interface import DataManagerInterface
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from Movie_Web_App.data_manager.models import (
+    Movie, MovieStats, RatingBucket, User, Review, Genre, movie_genres, user_movies,
+    MovieCooccurrence, UserRecommendation, apply_cooccurrence_deltas, apply_list_edit,
+    rating_bucket, touch_movies,
+)
+from Movie_Web_App.data_manager.pagination import Page, paginate
+from abc import abstractmethod
+from typing import Dict, Iterable, List, Optional, Set
+import math
+
+DEFAULT_PAGE_SIZE = 24
+# "Recommended for you" rows kept per user
+RECOMMENDATIONS_PER_USER = 12
+
+MOVIE_FIELDS = ('title', 'director', 'year', 'rating', 'poster', 'genre', 'plot')
+
+# Catalog orders besides title; descending, seeking along the
+# (column, movie_id) indexes on movie_stats
+STATS_SORTS = {
+    'rating': MovieStats.avg_rating,
+    'popular': MovieStats.review_count,
+}
+
+
+class SQLAlchemyDataManager(DataManagerInterface):
+    """
+    Dialect-neutral implementation of the interface on Flask-SQLAlchemy.
+
+    Abstract: backends subclass this and supply full-text search through
+    `_search_hits`; everything else is plain SQLAlchemy.
+    """
+
+    # Whether a larger search rank means a better match
+    RANK_DESCENDING = False
+
+    def __init__(self, db):
+        """Initialize with the db object from the Flask app"""
+        self.db = db
+
+    def _commit(self):
+        """Commit, rolling back before re-raising so the session stays usable"""
+        try:
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+    def rollback(self):
+        """Discard pending changes (e.g. after an error mid-request)"""
+        self.db.session.rollback()
+
+    def get_all_users(self):
+        """Fetch all users from the database"""
+        return User.query.all()  # Return all users using SQLAlchemy ORM
+
+    def get_user_movies(self, user_id):
+        """Fetch movies for a specific user"""
+        user = User.query.options(selectinload(User.movies)).filter_by(id=user_id).first()
+        return user.movies if user else []
+
+    def get_user(self, user_id: int):
+        """Fetch a single user (no collections loaded)"""
+        return self.db.session.get(User, user_id)
+
+    def get_movie(self, movie_id: int):
+        """Fetch a single movie with its review stats (no collections loaded)"""
+        return self.db.session.get(Movie, movie_id, options=[joinedload(Movie.stats)])
+
+    def is_listed(self, user_id: int, movie_id: int) -> bool:
+        """Whether the movie is on the user's list, via a primary-key lookup"""
+        stmt = self.db.select(user_movies.c.movie_id).where(
+            user_movies.c.user_id == user_id, user_movies.c.movie_id == movie_id
+        )
+        return self.db.session.scalar(stmt.exists().select()) or False
+
+    def add_to_list(self, user_id: int, movie_id: int) -> bool:
+        """Attach a movie to a user's list without loading the collection"""
+        if self.is_listed(user_id, movie_id):
+            return False
+        others = self._listed_ids(user_id)
+        self.db.session.execute(user_movies.insert().values(user_id=user_id, movie_id=movie_id))
+        apply_cooccurrence_deltas(self.db.session, movie_id, others, 1)
+        self._store_recommendations(user_id)
+        self._commit()
+        return True
+
+    def remove_from_list(self, user_id: int, movie_id: int) -> bool:
+        """Detach a movie from a user's list; False if it wasn't there"""
+        result = self.db.session.execute(user_movies.delete().where(
+            user_movies.c.user_id == user_id, user_movies.c.movie_id == movie_id
+        ))
+        if result.rowcount:
+            apply_cooccurrence_deltas(self.db.session, movie_id, self._listed_ids(user_id), -1)
+            self._store_recommendations(user_id)
+        self._commit()
+        return result.rowcount > 0
+
+    def edit_list(self, user_id: int, add: Iterable[int] = (),
+                  remove: Iterable[int] = ()) -> Dict[int, str]:
+        """
+        Add and remove many movies in one transaction. Returns each movie's
+        outcome: 'added', 'removed', 'already listed', 'not listed',
+        'no such movie' or 'conflict' (both added and removed).
+        """
+        add, remove = list(dict.fromkeys(add)), list(dict.fromkeys(remove))
+        conflicts = set(add) & set(remove)
+        listed = set(self._listed_ids(user_id))
+        known = set(self.db.session.scalars(
+            self.db.select(Movie.id).where(Movie.id.in_(add)))) if add else set()
+        results = {}
+        for movie_id in add:
+            results[movie_id] = ('conflict' if movie_id in conflicts
+                                 else 'no such movie' if movie_id not in known
+                                 else 'already listed' if movie_id in listed
+                                 else 'added')
+        for movie_id in remove:
+            if movie_id not in conflicts:
+                results[movie_id] = 'removed' if movie_id in listed else 'not listed'
+        added = [m for m, status in results.items() if status == 'added']
+        removed = [m for m, status in results.items() if status == 'removed']
+        if not added and not removed:
+            return results
+
+        if removed:
+            self.db.session.execute(user_movies.delete().where(
+                user_movies.c.user_id == user_id, user_movies.c.movie_id.in_(removed)))
+        if added:
+            self.db.session.execute(user_movies.insert(),
+                                    [{'user_id': user_id, 'movie_id': m} for m in added])
+        kept = sorted(listed.difference(removed))
+        apply_list_edit(self.db.session, kept, added, removed)
+        self._store_recommendations(user_id)
+        self._commit()
+        return results
+
+    def find_movie_ids_by_title(self, titles: Iterable[str]) -> Dict[str, List[int]]:
+        """Ids of the movies with each exact title (several when remade)"""
+        titles = list(set(titles))
+        found = {}
+        if titles:
+            stmt = self.db.select(Movie.title, Movie.id).where(Movie.title.in_(titles))
+            for title, movie_id in self.db.session.execute(stmt):
+                found.setdefault(title, []).append(movie_id)
+        return found
+
+    def _listed_ids(self, user_id: int) -> List[int]:
+        return list(self.db.session.scalars(
+            self.db.select(user_movies.c.movie_id).where(user_movies.c.user_id == user_id)))
+
+    def get_similar_movies(self, movie_id: int, limit: int = 6) -> List[Movie]:
+        """Movies most often listed together with this one ("also listed")"""
+        stmt = (self.db.select(Movie)
+                .join(MovieCooccurrence, MovieCooccurrence.other_id == Movie.id)
+                .where(MovieCooccurrence.movie_id == movie_id)
+                .order_by(MovieCooccurrence.count.desc(), MovieCooccurrence.other_id.desc())
+                .limit(limit))
+        return list(self.db.session.scalars(stmt))
+
+    def get_recommendations(self, user_id: int, limit: int = 6) -> List[Movie]:
+        """The user's precomputed "recommended for you" movies, best first"""
+        stmt = (self.db.select(Movie)
+                .join(UserRecommendation, UserRecommendation.movie_id == Movie.id)
+                .where(UserRecommendation.user_id == user_id)
+                .order_by(UserRecommendation.score.desc(), UserRecommendation.movie_id.desc())
+                .limit(limit))
+        return list(self.db.session.scalars(stmt))
+
+    def refresh_recommendations(self, user_id: int) -> int:
+        """Recompute one user's recommendations; how many were stored"""
+        count = self._store_recommendations(user_id)
+        self._commit()
+        return count
+
+    def _store_recommendations(self, user_id: int) -> int:
+        """
+        Score every unlisted movie by how often it co-occurs with the user's
+        list and keep the top RECOMMENDATIONS_PER_USER (uncommitted).
+        """
+        listed = self.db.select(user_movies.c.movie_id).where(user_movies.c.user_id == user_id)
+        score = self.db.func.sum(MovieCooccurrence.count)
+        stmt = (self.db.select(MovieCooccurrence.other_id, score)
+                .where(MovieCooccurrence.movie_id.in_(listed),
+                       MovieCooccurrence.other_id.not_in(listed))
+                .group_by(MovieCooccurrence.other_id)
+                .order_by(score.desc(), MovieCooccurrence.other_id.desc())
+                .limit(RECOMMENDATIONS_PER_USER))
+        rows = [{'user_id': user_id, 'movie_id': movie_id, 'score': int(total)}
+                for movie_id, total in self.db.session.execute(stmt)]
+        self.db.session.execute(self.db.delete(UserRecommendation)
+                                .where(UserRecommendation.user_id == user_id))
+        if rows:
+            self.db.session.execute(self.db.insert(UserRecommendation), rows)
+        return len(rows)
+
+    def get_users(self, page_size: int = DEFAULT_PAGE_SIZE, after: str = None,
+                  before: str = None) -> Page:
+        """Fetch one page of users by name"""
+        return paginate(
+            User.query, [(User.name, False), (User.id, False)],
+            key=lambda u: (u.name, u.id),
+            page_size=page_size, after=after, before=before,
+        )
+
+    def search_users(self, q: str, limit: int = DEFAULT_PAGE_SIZE) -> List[User]:
+        """Users whose name contains `q` (case-insensitive), by name"""
+        return (User.query.filter(User.name.ilike(f"%{q}%"))
+                .order_by(User.name).limit(limit).all())
+
+    def get_user_movies_page(self, user_id: int, page_size: int = DEFAULT_PAGE_SIZE,
+                             after: str = None, before: str = None) -> Page:
+        """Fetch one page of a user's list, most recently added first"""
+        query = (
+            self.db.session.query(Movie, user_movies.c.added_at)
+            .join(user_movies, user_movies.c.movie_id == Movie.id)
+            .outerjoin(Movie.stats).options(contains_eager(Movie.stats))
+            .filter(user_movies.c.user_id == user_id)
+        )
+        # order on the association's columns: ix_user_movies_user_id_added_at
+        # then delivers the rows presorted
+        page = paginate(
+            query, [(user_movies.c.added_at, True), (user_movies.c.movie_id, True)],
+            key=lambda row: (row.added_at, row.Movie.id),
+            page_size=page_size, after=after, before=before,
+        )
+        page.items = [row.Movie for row in page.items]
+        return page
+
+    def get_listed_movie_ids(self, user_id: int, movie_ids: Iterable[int]) -> Set[int]:
+        """Which of `movie_ids` are already on the user's list (one indexed lookup)"""
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return set()
+        stmt = self.db.select(user_movies.c.movie_id).where(
+            user_movies.c.user_id == user_id,
+            user_movies.c.movie_id.in_(movie_ids),
+        )
+        return set(self.db.session.scalars(stmt))
+
+    def add_user(self, name: str) -> User:
+        """Add a new user; IntegrityError if the name is taken"""
+        new_user = User(name=name)
+        self.db.session.add(new_user)
+        self._commit()
+        return new_user
+
+    def delete_user(self, user_id: int) -> Optional[str]:
+        """Delete a user with their list entries and reviews; their name, or None"""
+        user = self.get_user(user_id)
+        if user is None:
+            return None
+        name = user.name
+        # take the user's list out of the co-occurrence counts
+        listed = self._listed_ids(user_id)
+        for i, movie_id in enumerate(listed):
+            apply_cooccurrence_deltas(self.db.session, movie_id, listed[i + 1:], -1)
+        self.db.session.execute(self.db.delete(UserRecommendation)
+                                .where(UserRecommendation.user_id == user_id))
+        self.db.session.delete(user)
+        self._commit()
+        return name
+
+    def add_movie(self, title, director=None, year=None, rating=None,
+                  poster=None, genre=None, plot=None) -> Movie:
+        """Add a movie to the global catalog"""
+        new_movie = Movie(title=title, director=director, year=year, rating=rating,
+                          poster=poster, genre=genre, plot=plot)
+        self.db.session.add(new_movie)
+        self._commit()
+        return new_movie
+
+    def update_movie(self, movie_id, **fields) -> Optional[Movie]:
+        """Update the given movie columns; None if the movie doesn't exist"""
+        unknown = set(fields) - set(MOVIE_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown movie fields: {sorted(unknown)}")
+        movie = self.get_movie(movie_id)
+        if movie:
+            for name, value in fields.items():
+                setattr(movie, name, value)
+            self._commit()
+        return movie
+
+    def delete_movie(self, movie_id):
+        """Delete a movie"""
+        movie = self.get_movie(movie_id)
+        if movie:
+            # pairs are stored both ways: the movie's neighbours lead to the reverse rows
+            neighbours = list(self.db.session.scalars(self.db.select(MovieCooccurrence.other_id)
+                                                      .where(MovieCooccurrence.movie_id == movie_id)))
+            touch_movies(self.db.session, neighbours)
+            self.db.session.execute(self.db.delete(MovieCooccurrence).where(
+                MovieCooccurrence.movie_id.in_(neighbours), MovieCooccurrence.other_id == movie_id))
+            self.db.session.execute(self.db.delete(MovieCooccurrence)
+                                    .where(MovieCooccurrence.movie_id == movie_id))
+            self.db.session.execute(self.db.delete(UserRecommendation)
+                                    .where(UserRecommendation.movie_id == movie_id))
+            self.db.session.delete(movie)
+            self._commit()
+
+    def get_movies(self, genre: str = None, sort: str = 'title',
+                   page_size: int = DEFAULT_PAGE_SIZE, after: str = None,
+                   before: str = None) -> Page:
+        """
+        Fetch one page of the catalog, optionally restricted to one genre.
+        `sort` is 'title', 'rating' (best average first) or 'popular'
+        (most reviewed first); unknown values fall back to 'title'.
+        """
+        column = STATS_SORTS.get(sort)
+        if column is None:
+            # outer join: a movie missing its stats row still shows up here
+            query = Movie.query.outerjoin(Movie.stats).options(contains_eager(Movie.stats))
+            order, key = [(Movie.title, False), (Movie.id, False)], lambda m: (m.title, m.id)
+        else:
+            query = Movie.query.join(Movie.stats).options(contains_eager(Movie.stats))
+            order = [(column, True), (MovieStats.movie_id, True)]
+            key = lambda m: (getattr(m.stats, column.key), m.id)
+        return paginate(
+            self._filter_genre(query, genre), order, key=key,
+            page_size=page_size, after=after, before=before,
+        )
+
+    def get_genres(self) -> List[str]:
+        """Names of all genres that have at least one movie, alphabetically"""
+        in_use = self.db.select(movie_genres.c.genre_id).where(movie_genres.c.genre_id == Genre.id)
+        stmt = self.db.select(Genre.name).where(in_use.exists()).order_by(Genre.name)
+        return list(self.db.session.scalars(stmt))
+
+    @staticmethod
+    def _filter_genre(query, genre):
+        """Restrict a Movie query to an exact genre via the indexed association"""
+        if not genre:
+            return query
+        return (query.join(movie_genres, movie_genres.c.movie_id == Movie.id)
+                     .join(Genre, Genre.id == movie_genres.c.genre_id)
+                     .filter(Genre.name == genre))
+
+    def add_review(self, movie_id: int, review_text: str, rating: float):
+        """Ad a movie review"""
+        rv = Review(
+            movie_id    = movie_id,
+            review_text = review_text,
+            rating      = rating
+            # user_id is nullable, so you can leave it out for anonymous
+        )
+        self.db.session.add(rv)
+        self._commit()
+        return rv
+
+    def delete_review(self, review_id: int) -> Optional[int]:
+        """Delete a review; the movie id it belonged to, or None if there was none"""
+        review = self.db.session.get(Review, review_id)
+        if review is None:
+            return None
+        movie_id = review.movie_id
+        self.db.session.delete(review)
+        self._commit()
+        return movie_id
+
+    def get_rating_histogram(self, movie_id: int) -> List[int]:
+        """Review counts per rounded rating, index 0-10"""
+        counts = [0] * 11
+        stmt = self.db.select(RatingBucket.bucket, RatingBucket.count).where(
+            RatingBucket.movie_id == movie_id)
+        for bucket, count in self.db.session.execute(stmt):
+            counts[bucket] = count
+        return counts
+
+    def repair_review_stats(self) -> dict:
+        """
+        Recompute movie_stats and the rating histogram from the reviews table
+        and fix every row that drifted. Returns how many rows were changed.
+        """
+        movies, buckets = {}, {}
+        stmt = self.db.select(Review.movie_id, Review.rating)
+        for movie_id, rating in self.db.session.execute(stmt):
+            count, total = movies.get(movie_id, (0, 0.0))
+            movies[movie_id] = (count + 1, total + rating)
+            key = (movie_id, rating_bucket(rating))
+            buckets[key] = buckets.get(key, 0) + 1
+
+        fixed = {'movie_stats': 0, 'histogram': 0}
+        existing = {s.movie_id: s for s in MovieStats.query}
+        for movie_id in self.db.session.scalars(self.db.select(Movie.id)):
+            count, total = movies.get(movie_id, (0, 0.0))
+            avg = total / count if count else 0.0
+            row = existing.pop(movie_id, None)
+            if row is None:
+                self.db.session.add(MovieStats(movie_id=movie_id, review_count=count,
+                                               rating_sum=total, avg_rating=avg))
+            # sums taken in another order (e.g. by SQL) differ in the last bits only
+            elif (row.review_count != count or not math.isclose(row.rating_sum, total)
+                  or not math.isclose(row.avg_rating, avg)):
+                row.review_count, row.rating_sum, row.avg_rating = count, total, avg
+            else:
+                continue
+            fixed['movie_stats'] += 1
+        for orphan in existing.values():
+            self.db.session.delete(orphan)
+            fixed['movie_stats'] += 1
+
+        for row in RatingBucket.query:
+            count = buckets.pop((row.movie_id, row.bucket), 0)
+            if row.count != count:
+                row.count = count
+                fixed['histogram'] += 1
+        for (movie_id, bucket), count in buckets.items():
+            self.db.session.add(RatingBucket(movie_id=movie_id, bucket=bucket, count=count))
+            fixed['histogram'] += 1
+        self._commit()
+        return fixed
+
+    def get_movie_reviews(self, movie_id: int) -> List[Review]:
+        return (Review.query.options(joinedload(Review.user))
+                .filter_by(movie_id=movie_id).order_by(Review.created_at.desc()).all())
+
+    def get_movie_reviews_page(self, movie_id: int, page_size: int = DEFAULT_PAGE_SIZE,
+                               after: str = None, before: str = None) -> Page:
+        """Fetch one page of a movie's reviews, newest first"""
+        return paginate(
+            Review.query.options(joinedload(Review.user)).filter_by(movie_id=movie_id),
+            [(Review.created_at, True), (Review.review_id, True)],
+            key=lambda r: (r.created_at, r.review_id),
+            page_size=page_size, after=after, before=before,
+        )
+
+    def get_user_reviews(self, user_id: int) -> List[Review]:
+        return (Review.query.options(joinedload(Review.movie))
+                .filter_by(user_id=user_id).order_by(Review.created_at.desc()).all())
+
+    @abstractmethod
+    def _search_hits(self, q: str):
+        """
+        Subquery of full-text matches with columns `movie_id` and `rank`,
+        or None when `q` has nothing searchable. Backends implement this.
+        """
+
+    def search_movies(self, q: str, genre: str = None, exclude_user_id: int = None,
+                      page_size: int = DEFAULT_PAGE_SIZE, after: str = None,
+                      before: str = None) -> Page:
+        """Full-text search over title/director/plot/genre, best matches first"""
+        hits = self._search_hits(q)
+        if hits is None:
+            return Page(items=[], total=0, page_size=page_size)
+        query = (self.db.session.query(Movie, hits.c.rank)
+                 .join(hits, hits.c.movie_id == Movie.id)
+                 .outerjoin(Movie.stats).options(contains_eager(Movie.stats)))
+        query = self._filter_genre(query, genre)
+        if exclude_user_id is not None:
+            listed = self.db.select(user_movies.c.movie_id).where(
+                user_movies.c.user_id == exclude_user_id,
+                user_movies.c.movie_id == Movie.id,
+            )
+            query = query.filter(~listed.exists())
+        page = paginate(
+            query, [(hits.c.rank, self.RANK_DESCENDING), (Movie.id, False)],
+            key=lambda row: (row.rank, row.Movie.id),
+            page_size=page_size, after=after, before=before,
+        )
+        page.items = [row.Movie for row in page.items]
+        return page
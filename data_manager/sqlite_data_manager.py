@@ -1,65 +1,27 @@
-from Movie_Web_App.data_manager.data_manager_interface import DataManagerInterface
-from Movie_Web_App.data_manager.models import Movie, User, Review
-from typing import List
+import re
+from sqlalchemy import literal_column
+from Movie_Web_App.data_manager.models import movies_fts
+from Movie_Web_App.data_manager.sqlalchemy_data_manager import SQLAlchemyDataManager
 
-class SQLiteDataManager(DataManagerInterface):
-    def __init__(self, db):
-        """Initialize with the db object from the Flask app"""
-        self.db = db
 
-    def get_all_users(self):
-        """Fetch all users from the database"""
-        return User.query.all()  # Return all users using SQLAlchemy ORM
+def fts_match_expression(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', q or '')
+    return ' '.join(f'"{w}"*' for w in words)
 
-    def get_user_movies(self, user_id):
-        """Fetch movies for a specific user"""
-        user = User.query.get(user_id)
-        return user.movies if user else []
 
-    def add_user(self, name):
-        """Add a new user to the database"""
-        new_user = User(name=name)
-        self.db.session.add(new_user)
-        self.db.session.commit()
+class SQLiteDataManager(SQLAlchemyDataManager):
+    """SQLite backend: search runs on the FTS5 `movies_fts` index."""
 
-    def add_movie(self, name, director, year, rating, user_id):
-        """Add a new movie for a user"""
-        new_movie = Movie(name=name, director=director, year=year, rating=rating, user_id=user_id)
-        self.db.session.add(new_movie)
-        self.db.session.commit()
+    # FTS5 bm25 rank: more negative is better
+    RANK_DESCENDING = False
 
-    def update_movie(self, movie_id, name, director, year, rating):
-        """Update movie details"""
-        movie = Movie.query.get(movie_id)
-        if movie:
-            movie.name = name
-            movie.director = director
-            movie.year = year
-            movie.rating = rating
-            self.db.session.commit()
-
-    def delete_movie(self, movie_id):
-        """Delete a movie"""
-        movie = Movie.query.get(movie_id)
-        if movie:
-            self.db.session.delete(movie)
-            self.db.session.commit()
-
-    def add_review(self, movie_id: int, review_text: str, rating: float):
-        """Ad a movie review"""
-        rv = Review(
-            movie_id    = movie_id,
-            review_text = review_text,
-            rating      = rating
-            # user_id is nullable, so you can leave it out for anonymous
+    def _search_hits(self, q: str):
+        match = fts_match_expression(q)
+        if not match:
+            return None
+        return (
+            self.db.select(movies_fts.c.rowid.label('movie_id'), movies_fts.c.rank)
+            .where(literal_column(movies_fts.name).op('MATCH')(match))
+            .subquery()
         )
-        self.db.session.add(rv)
-        self.db.session.commit()
-        return rv
-
-    def get_movie_reviews(self, movie_id: int) -> List[Review]:
-        return Review.query.filter_by(movie_id=movie_id).order_by(Review.created_at.desc()).all()
-
-    def get_user_reviews(self, user_id: int) -> List[Review]:
-        return Review.query.filter_by(user_id=user_id).order_by(Review.created_at.desc()).all()
-
@@ -0,0 +1,59 @@
+"""
+gunicorn.conf.py
+
+Production server settings. From the directory above the package:
+
+    gunicorn -c Movie_Web_App/gunicorn.conf.py
+
+The app is preloaded (created and warmed once, see serving.py) and forked
+into WEB_CONCURRENCY worker processes (default: 2 per CPU + 1), each with
+GUNICORN_THREADS threads, so requests waiting on OMDb or on the SQLite
+write lock don't hold a whole process. Every setting can also be given on
+the command line, e.g. `--bind 0.0.0.0:8000`.
+
+With more than one worker, pages are only cached when RESPONSE_CACHE_URL
+points at a Redis shared by all of them (see serving.check_workers), and
+each worker serves its own /metrics.
+"""
+
+import multiprocessing
+import os
+
+# Several processes share the SQLite file: WAL lets readers and the writer
+# work concurrently (see data_manager/sqlite_tuning.py)
+os.environ.setdefault('DB_PROFILE', 'production')
+
+wsgi_app = 'Movie_Web_App.wsgi:app'
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 30
+graceful_timeout = 20
+keepalive = 5
+# recycle workers now and then, staggered, so slow leaks can't pile up
+max_requests = 5000
+max_requests_jitter = 500
+# worker heartbeats on tmpfs rather than a possibly slow disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('ACCESS_LOG')   # e.g. '-' for stdout
+errorlog = '-'
+
+
+def on_starting(server):
+    from Movie_Web_App import serving, wsgi
+    serving.check_workers(wsgi.app, server.cfg.workers)
+
+
+def post_fork(server, worker):
+    from Movie_Web_App import serving, wsgi
+    serving.after_fork(wsgi.app)
+
+
+def worker_exit(server, worker):
+    from Movie_Web_App import wsgi
+    wsgi.app.job_queue.shutdown()
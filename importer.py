@@ -0,0 +1,272 @@
+"""
+importer.py
+
+Watchlist import from a Letterboxd or IMDb CSV export.
+
+The upload is saved under IMPORT_DIR and processed on a background thread;
+progress lives in the `list_imports` row, which the import's page polls.
+Rows are streamed with the csv module and matched against a (title, year)
+index of the catalog built in one pass over `movies`: exact (title, year)
+first, as in uq_movie_title_year, then case- and accent-insensitive
+titles, where a year off by one still counts (release vs. festival year).
+
+Matches are attached in batches of IMPORT_BATCH_SIZE through
+DataManagerInterface.edit_list, one transaction per batch. Titles the
+catalog lacks go to the enrichment queue, whose worker pool bounds the
+concurrent OMDb lookups; at most IMPORT_MAX_LOOKUPS per import. Each
+lookup carries the row's year, so "Dune, 1984" isn't listed as the 2021 film.
+
+An import whose progress hasn't moved for `stale_after` seconds was
+orphaned by a crashed or restarted process: it is marked failed (the user
+uploads the file again) rather than left 'running' forever.
+"""
+
+import csv
+import itertools
+import logging
+import os
+import shutil
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from . import db
+from .autocomplete import words
+from .data_manager.models import ListImport, Movie
+
+logger = logging.getLogger(__name__)
+
+# Title/year columns per export: Letterboxd (watchlist.csv, watched.csv),
+# then IMDb (lists and ratings)
+COLUMNS = (('Name', 'Year'), ('Title', 'Year'))
+
+
+class ImportFormatError(ValueError):
+    """The file isn't a CSV export we know."""
+
+
+def _columns(header):
+    for title, year in COLUMNS:
+        if title in header:
+            return title, year if year in header else None
+    raise ImportFormatError('Not a Letterboxd or IMDb export: expected a "Name" or "Title" column.')
+
+
+def _year(value):
+    value = (value or '').strip()[:4]
+    return int(value) if value.isdigit() else None
+
+
+def read_rows(f):
+    """Yield (title, year | None) per row of an open export file."""
+    reader = csv.DictReader(f)
+    title_col, year_col = _columns(reader.fieldnames or ())
+    for row in reader:
+        title = (row.get(title_col) or '').strip()
+        if title:
+            yield title, _year(row.get(year_col)) if year_col else None
+
+
+def _fold(title):
+    return ' '.join(words(title))
+
+
+class TitleIndex:
+    """In-memory (title, year) -> movie id lookup over the whole catalog."""
+
+    def __init__(self):
+        self.exact = {}                    # (title, year) -> id
+        self.folded = defaultdict(list)    # folded title -> [(year, id)]
+
+    @classmethod
+    def load(cls, session, batch_size=10_000):
+        """Build the index in one streamed pass over `movies`."""
+        index = cls()
+        conn = session.connection().execution_options(yield_per=batch_size)
+        result = conn.execute(db.select(Movie.id, Movie.title, Movie.year))
+        for partition in result.partitions():
+            for movie_id, title, year in partition:
+                index.add(movie_id, title, year)
+        return index
+
+    def add(self, movie_id, title, year):
+        self.exact[title, year] = movie_id
+        self.folded[_fold(title)].append((year, movie_id))
+
+    def resolve(self, title, year=None):
+        """The matching movie's id, or None when missing or ambiguous."""
+        movie_id = self.exact.get((title, year))
+        if movie_id is not None:
+            return movie_id
+        candidates = self.folded.get(_fold(title), ())
+        if year is not None:
+            for tolerance in (0, 1):
+                near = [m for y, m in candidates if y is not None and abs(y - year) <= tolerance]
+                if near:
+                    return near[0] if len(near) == 1 else None
+            return None
+        return candidates[0][1] if len(candidates) == 1 else None
+
+
+class ListImporter:
+    """
+    Runs CSV imports on background threads.
+
+    Args:
+        app: Flask app the imports run in.
+        directory (str): where uploads wait to be processed.
+        batch_size (int): rows attached per transaction.
+        max_lookups (int): unmatched titles queued for OMDb per import.
+        stale_after (float): seconds without progress after which an
+            unfinished import is presumed orphaned and failed.
+    """
+
+    INTERRUPTED = 'The import was interrupted; please upload the file again.'
+
+    def __init__(self, app, directory, batch_size=500, max_lookups=200, stale_after=600.0):
+        self.app = app
+        self.directory = directory
+        self.batch_size = batch_size
+        self.max_lookups = max_lookups
+        self.stale_after = stale_after
+        self._threads = {}
+
+    def start(self, user_id, stream, filename) -> int:
+        """
+        Save an upload and start importing it into the user's list; the
+        import's id. Raises ImportFormatError for files we can't read.
+        """
+        self._fail_stale()
+        imp = ListImport(user_id=user_id, filename=os.path.basename(filename)[:255] or 'upload.csv')
+        db.session.add(imp)
+        db.session.commit()
+        path = self._path(imp.id)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(stream, out, 64 * 1024)
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                _columns(next(csv.reader(f), ()))
+        except (ImportFormatError, UnicodeDecodeError) as exc:
+            os.remove(path)
+            self._fail(imp, exc if isinstance(exc, ImportFormatError) else 'File is not UTF-8 text.')
+            raise ImportFormatError(imp.error) from exc
+        thread = threading.Thread(target=self._run_in_app, args=(imp.id,),
+                                  name=f'import-{imp.id}', daemon=True)
+        self._threads[imp.id] = thread
+        thread.start()
+        return imp.id
+
+    def get(self, import_id):
+        """Current state of an import (fresh from the database), or None."""
+        imp = db.session.get(ListImport, import_id, populate_existing=True)
+        if (imp is not None and not imp.finished and imp.updated_at < self._cutoff()
+                and not self._running_here(import_id)):
+            self._fail(imp, self.INTERRUPTED)
+            self._discard(import_id)
+        return imp
+
+    def wait(self, import_id, timeout=None) -> bool:
+        """Block until a running import finishes; False on timeout."""
+        thread = self._threads.get(import_id)
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+            self._threads.pop(import_id, None)
+        return True
+
+    def _path(self, import_id):
+        return os.path.join(self.directory, f'{import_id}.csv')
+
+    def _running_here(self, import_id):
+        thread = self._threads.get(import_id)
+        return thread is not None and thread.is_alive()
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+    def _fail_stale(self):
+        """Fail every import orphaned by a crashed process, and drop its upload."""
+        stale = db.session.scalars(db.select(ListImport.id).where(
+            ListImport.status.in_(('pending', 'running')),
+            ListImport.updated_at < self._cutoff())).all()
+        stale = [import_id for import_id in stale if not self._running_here(import_id)]
+        if not stale:
+            return
+        db.session.execute(db.update(ListImport).where(
+            ListImport.id.in_(stale), ListImport.status.in_(('pending', 'running')),
+        ).values(status='failed', error=self.INTERRUPTED, updated_at=datetime.utcnow()))
+        db.session.commit()
+        for import_id in stale:
+            self._discard(import_id)
+
+    def _discard(self, import_id):
+        path = self._path(import_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _run_in_app(self, import_id):
+        with self.app.app_context():
+            try:
+                self.run(import_id)
+            finally:
+                db.session.remove()
+
+    def run(self, import_id):
+        """Process a saved upload (in an app context)."""
+        imp = db.session.get(ListImport, import_id)
+        imp.status, imp.updated_at = 'running', datetime.utcnow()
+        db.session.commit()
+        path = self._path(import_id)
+        try:
+            index = TitleIndex.load(db.session)
+            seen = set()
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows = read_rows(f)
+                while batch := list(itertools.islice(rows, self.batch_size)):
+                    self._apply(imp, index, batch, seen)
+        except Exception as exc:
+            logger.exception('Import %s failed', import_id)
+            db.session.rollback()
+            self._fail(db.session.get(ListImport, import_id), exc)
+            return
+        finally:
+            self._discard(import_id)
+        imp.status, imp.updated_at = 'done', datetime.utcnow()
+        db.session.commit()
+
+    def _apply(self, imp, index, batch, seen):
+        """Attach one batch's matches, queue its misses and record progress."""
+        dm = self.app.data_manager
+        if imp.user_id is None or dm.get_user(imp.user_id) is None:
+            raise LookupError('The user was deleted.')
+        matched, misses, skipped = [], [], 0
+        for title, year in batch:
+            movie_id = index.resolve(title, year)
+            if movie_id is not None:
+                matched.append(movie_id)
+                continue
+            key = (_fold(title), year)
+            if key in seen or imp.queued + len(misses) >= self.max_lookups:
+                skipped += 1
+            else:
+                misses.append((title, year))
+            seen.add(key)
+        outcome = dm.edit_list(imp.user_id, add=matched)
+        imp.rows += len(batch)
+        imp.matched += len(matched)
+        imp.added += sum(status == 'added' for status in outcome.values())
+        imp.queued += len(misses)
+        imp.skipped += skipped
+        imp.updated_at = datetime.utcnow()
+        if misses:
+            self.app.job_queue.submit_many(misses, user_id=imp.user_id)
+        else:
+            db.session.commit()
+
+    @staticmethod
+    def _fail(imp, exc):
+        imp.status, imp.error = 'failed', str(exc) or exc.__class__.__name__
+        imp.updated_at = datetime.utcnow()
+        db.session.commit()
@@ -0,0 +1,266 @@
+"""
+instrumentation.py
+
+Per-request cost accounting, exported in Prometheus text format at /metrics.
+
+init_instrumentation(app) hooks:
+  - Flask request signals      -> latency histogram per endpoint/method/status
+  - SQLAlchemy cursor events   -> SQL statement count and time (per request too)
+  - Jinja render signals       -> template render time
+  - OMDbClient.on_request      -> OMDb call time
+
+With METRICS_SERVER_TIMING enabled, each response also carries a
+`Server-Timing` header (db, omdb, render, app) for the browser devtools.
+
+Metrics live in process memory; under a multi-process server every worker
+reports its own numbers, and `process_id` tells which one answered.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request, request_started, request_finished
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for key, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(key)} {value:g}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self.series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if idx < len(self.buckets):
+                row[idx] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for key, row in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(key + (("le", f"{bound:g}"),))} {cumulative}'
+            yield f'{self.name}_bucket{_labels(key + (("le", "+Inf"),))} {row[-1]}'
+            yield f'{self.name}_sum{_labels(key)} {row[-2]:g}'
+            yield f'{self.name}_count{_labels(key)} {row[-1]}'
+
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    def __init__(self, name, help_text, callback):
+        self.name, self.help, self.callback = name, help_text, callback
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} gauge'
+        values = self.callback()
+        if isinstance(values, dict):
+            for label, value in sorted(values.items()):
+                yield f'{self.name}{_labels(label)} {value:g}'
+        else:
+            yield f'{self.name} {values:g}'
+
+
+class Metrics:
+    """Registry of the app's metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, callback):
+        return self._add(Gauge(name, help_text, callback))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _request_costs():
+    """Per-request accumulator stored on flask.g (None outside requests)."""
+    if not has_request_context():
+        return None
+    costs = g.get('_costs')
+    if costs is None:
+        costs = g._costs = {'db': 0.0, 'db_count': 0, 'omdb': 0.0, 'render': 0.0, 'renders': []}
+    return costs
+
+
+def init_instrumentation(app):
+    """Register metrics hooks and the /metrics endpoint on `app`."""
+    from . import db
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+
+    http_latency = metrics.histogram(
+        'http_request_duration_seconds', 'Request latency by endpoint.')
+    http_sql_count = metrics.histogram(
+        'http_request_sql_statements', 'SQL statements issued per request.',
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+    sql_time = metrics.histogram(
+        'sql_statement_duration_seconds', 'Time spent executing SQL statements.')
+    sql_total = metrics.counter('sql_statements_total', 'SQL statements executed.')
+    render_time = metrics.histogram(
+        'template_render_duration_seconds', 'Jinja render time by template.')
+    omdb_time = metrics.histogram(
+        'omdb_request_duration_seconds', 'OMDb HTTP round-trip time.')
+
+    if getattr(app, 'omdb_cache', None) is not None:
+        cache = app.omdb_cache
+        metrics.gauge('omdb_cache_events', 'OMDb cache hits/misses/evictions since start.',
+                      lambda: {(('event', k),): v for k, v in cache.stats().items() if k != 'size'})
+        metrics.gauge('omdb_cache_entries', 'Entries in the OMDb cache.',
+                      lambda: cache.stats()['size'])
+
+    if getattr(app, 'response_cache', None) is not None:
+        # read at scrape time: serving.check_workers may turn the cache off
+        metrics.gauge('response_cache_events', 'Page cache hits/misses/304s/evictions since start.',
+                      lambda: {(('event', k),): v for k, v in app.response_cache.stats().items()
+                               if k != 'size'} if app.response_cache is not None else {})
+    metrics.gauge('process_id', 'PID of the process answering; each worker has its own metrics.',
+                  os.getpid)
+
+    # -- SQL --------------------------------------------------------------
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _sql_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _sql_end(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        sql_time.observe(elapsed)
+        sql_total.inc()
+        costs = _request_costs()
+        if costs is not None:
+            costs['db'] += elapsed
+            costs['db_count'] += 1
+
+    @event.listens_for(engine, 'handle_error')
+    def _sql_failed(context):
+        # a statement that raised never reaches after_cursor_execute; drop
+        # its start time so the next one on this pooled connection pairs up
+        starts = context.connection.info.get('query_start') if context.connection else None
+        if context.execution_context is not None and starts:
+            starts.pop()
+
+    # -- OMDb -------------------------------------------------------------
+    def _omdb_observed(elapsed, ok):
+        omdb_time.observe(elapsed, outcome='ok' if ok else 'error')
+        costs = _request_costs()
+        if costs is not None:
+            costs['omdb'] += elapsed
+
+    if getattr(app, 'omdb_client', None) is not None:
+        app.omdb_client.on_request = _omdb_observed
+
+    # -- Templates --------------------------------------------------------
+    def _render_start(sender, template, context, **extra):
+        costs = _request_costs()
+        if costs is not None:
+            costs['renders'].append(time.perf_counter())
+
+    def _render_end(sender, template, context, **extra):
+        costs = _request_costs()
+        if costs is not None and costs['renders']:
+            elapsed = time.perf_counter() - costs['renders'].pop()
+            costs['render'] += elapsed
+            render_time.observe(elapsed, template=template.name or '<string>')
+
+    before_render_template.connect(_render_start, app, weak=False)
+    template_rendered.connect(_render_end, app, weak=False)
+
+    # -- Requests ---------------------------------------------------------
+    def _request_start(sender, **extra):
+        g._request_start = time.perf_counter()
+        _request_costs()
+
+    def _request_end(sender, response, **extra):
+        start = g.get('_request_start')
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint == 'metrics':
+            return
+        costs = _request_costs()
+        http_latency.observe(elapsed, endpoint=endpoint, method=request.method,
+                             status=response.status_code)
+        http_sql_count.observe(costs['db_count'], endpoint=endpoint)
+        if app.config['METRICS_SERVER_TIMING']:
+            app_time = max(elapsed - costs['db'] - costs['omdb'] - costs['render'], 0.0)
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={costs["db"] * 1000:.2f};desc="{costs["db_count"]} queries"',
+                f'omdb;dur={costs["omdb"] * 1000:.2f}',
+                f'render;dur={costs["render"] * 1000:.2f}',
+                f'app;dur={app_time * 1000:.2f}',
+                f'total;dur={elapsed * 1000:.2f}',
+            ])
+
+    request_started.connect(_request_start, app, weak=False)
+    request_finished.connect(_request_end, app, weak=False)
+
+    # -- Exposition -------------------------------------------------------
+    def metrics_view():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    return metrics
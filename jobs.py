@@ -0,0 +1,294 @@
+"""
+jobs.py
+
+Background OMDb enrichment: "look up this title and add it" runs on a small
+in-process worker pool instead of inside the web request.
+
+Jobs live in the `enrichment_jobs` table, so they survive restarts and
+several processes can share the queue: a worker claims a job with a
+conditional UPDATE (only one claimant wins), runs it inside an app context
+and records the outcome. OMDb outages are retried with exponential backoff;
+anything else fails the job at once.
+
+Job states: pending -> running -> done | not_found | failed
+(running -> pending again when a retry is scheduled).
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .data_manager.models import EnrichmentJob, Movie
+from .omdb_api import OMDbUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    SQLite/Postgres-backed job queue with an in-process worker pool.
+
+    Args:
+        app: Flask app the workers run in.
+        fetch (callable): title -> movie dict | None (omdb_api.fetch_movie_data);
+            also passed `year=` for jobs that have one.
+        workers (int): jobs processed concurrently.
+        max_attempts (int): tries before a job fails for good.
+        backoff (float): base retry delay in seconds, doubled per attempt.
+        max_backoff (float): retry delay cap in seconds.
+        poll_interval (float): how often idle workers look for due retries.
+        stale_after (float): seconds after which a 'running' job is presumed
+            orphaned by a crashed process and re-queued.
+    """
+
+    def __init__(self, app, fetch, workers=4, max_attempts=5, backoff=2.0,
+                 max_backoff=300.0, poll_interval=1.0, stale_after=600.0):
+        self.app = app
+        self.fetch = fetch
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._fetch_overrides = {}   # job id -> fetch callable given to submit()
+        self._events = {}            # job id -> Event set after each attempt, while wait()ing
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    # -- producer side --------------------------------------------------------
+    def submit(self, title, user_id=None, fetch=None, year=None) -> int:
+        """
+        Queue `title` (of `year`, if given) for lookup; returns the job id.
+        `fetch` overrides the queue's lookup function for this job while
+        this process runs it.
+        """
+        job = EnrichmentJob(title=title, year=year, user_id=user_id,
+                            max_attempts=self.max_attempts)
+        db.session.add(job)
+        db.session.flush()
+        job_id = job.id
+        if fetch is not None:
+            # before the commit: no worker can claim the job until then
+            with self._lock:
+                self._fetch_overrides[job_id] = fetch
+        try:
+            db.session.commit()
+        except Exception:
+            with self._lock:
+                self._fetch_overrides.pop(job_id, None)
+            raise
+        self.start()
+        self._wake()
+        return job_id
+
+    def submit_many(self, movies, user_id=None) -> list:
+        """Queue several (title, year | None) in one transaction; their job ids."""
+        jobs = [EnrichmentJob(title=title, year=year, user_id=user_id,
+                              max_attempts=self.max_attempts)
+                for title, year in movies]
+        db.session.add_all(jobs)
+        db.session.commit()
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return [job.id for job in jobs]
+
+    def get(self, job_id):
+        """Current state of a job (fresh from the database), or None."""
+        return db.session.get(EnrichmentJob, job_id, populate_existing=True)
+
+    def wait(self, job_id, timeout) -> bool:
+        """
+        Block until the job's first attempt has finished (success, failure or
+        a scheduled retry) or `timeout` seconds pass; whether it has. Workers
+        of this process wake the waiter at once; attempts made by other
+        processes are seen by re-reading the job every `poll_interval`.
+        Read the outcome with get().
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            # registered before the first read, so no attempt can slip between
+            event = self._events.setdefault(job_id, threading.Event())
+        try:
+            while True:
+                job = self.get(job_id)
+                if job is None or job.finished:
+                    with self._lock:
+                        self._fetch_overrides.pop(job_id, None)
+                    return job is not None
+                if job.status == 'pending' and job.attempts:   # a retry is scheduled
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if event.wait(min(remaining, self.poll_interval)):
+                    return True
+        finally:
+            with self._lock:
+                if self._events.get(job_id) is event:
+                    del self._events[job_id]
+
+    def pending_for_user(self, user_id):
+        """Jobs of a user's that haven't finished, oldest first."""
+        return (EnrichmentJob.query
+                .filter(EnrichmentJob.user_id == user_id,
+                        EnrichmentJob.status.in_(('pending', 'running')))
+                .order_by(EnrichmentJob.id).all())
+
+    # -- worker side ----------------------------------------------------------
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        with self._lock:
+            if self._threads or self._stopped:
+                return
+            with self.app.app_context():
+                self._requeue_stale()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'enrich-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the workers after their current job."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _requeue_stale(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        db.session.execute(
+            db.update(EnrichmentJob)
+            .where(EnrichmentJob.status == 'running', EnrichmentJob.updated_at < cutoff)
+            .values(status='pending', updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+    def _worker(self):
+        while not self._stopped:
+            with self.app.app_context():
+                try:
+                    job_id = self._claim()
+                    if job_id is not None:
+                        self._run(job_id)
+                except Exception:
+                    logger.exception('Enrichment worker error')
+                    db.session.rollback()
+                    job_id = None
+            if job_id is None:
+                with self._wakeup:
+                    if not self._stopped:
+                        self._wakeup.wait(self.poll_interval)
+
+    def _claim(self):
+        """Atomically take the oldest due pending job; its id, or None."""
+        now = datetime.utcnow()
+        candidates = db.session.scalars(
+            db.select(EnrichmentJob.id)
+            .where(EnrichmentJob.status == 'pending', EnrichmentJob.run_after <= now)
+            .order_by(EnrichmentJob.run_after, EnrichmentJob.id).limit(self.workers)
+        ).all()
+        for job_id in candidates:
+            claimed = db.session.execute(
+                db.update(EnrichmentJob)
+                .where(EnrichmentJob.id == job_id, EnrichmentJob.status == 'pending')
+                .values(status='running', attempts=EnrichmentJob.attempts + 1, updated_at=now)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def _run(self, job_id):
+        job = db.session.get(EnrichmentJob, job_id)
+        with self._lock:
+            fetch = self._fetch_overrides.get(job_id, self.fetch)
+        try:
+            data = fetch(job.title) if job.year is None else fetch(job.title, year=job.year)
+        except OMDbUnavailable as exc:
+            self._retry_or_fail(job, exc)
+        except Exception as exc:
+            logger.exception('Enrichment of %r failed', job.title)
+            self._finish(job, 'failed', error=str(exc) or exc.__class__.__name__)
+        else:
+            if data is None:
+                self._finish(job, 'not_found')
+                return
+            if job.year is not None and data.get('year') is not None \
+                    and abs(data['year'] - job.year) > 1:
+                # never list another film of the same title in place of the one asked for
+                self._finish(job, 'not_found', error=f"OMDb's {data['title']!r} is from {data['year']}")
+                return
+            try:
+                self._store(job, data)
+            except Exception as exc:
+                logger.exception('Saving %r failed', job.title)
+                db.session.rollback()
+                self._finish(db.session.get(EnrichmentJob, job_id), 'failed',
+                             error=f'could not save movie: {exc}')
+
+    def _store(self, job, data):
+        """Add the movie (or find the existing copy) and attach it to the user's list."""
+        dm = self.app.data_manager
+        try:
+            movie = dm.add_movie(**data)
+        except IntegrityError:
+            movie = Movie.query.filter_by(title=data['title'], year=data.get('year')).first()
+            if movie is None:
+                raise
+        if job.user_id is not None and dm.get_user(job.user_id) is not None:
+            dm.add_to_list(job.user_id, movie.id)
+        poster_store = getattr(self.app, 'poster_store', None)
+        if poster_store is not None:
+            poster_store.prefetch(movie.poster)
+        job = db.session.get(EnrichmentJob, job.id)
+        self._finish(job, 'done', movie_id=movie.id)
+
+    def _retry_or_fail(self, job, exc):
+        if job.attempts >= job.max_attempts:
+            self._finish(job, 'failed', error=str(exc))
+            return
+        delay = min(self.backoff * 2 ** (job.attempts - 1), self.max_backoff)
+        delay *= random.uniform(0.8, 1.2)
+        job.status = 'pending'
+        job.last_error = str(exc)
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        self._notify(job.id, final=False)
+        if delay < self.poll_interval:
+            # wake a worker when it's due instead of at the next poll
+            timer = threading.Timer(delay + 0.01, self._wake)
+            timer.daemon = True
+            timer.start()
+
+    def _wake(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _finish(self, job, status, error=None, movie_id=None):
+        job.status = status
+        job.last_error = error
+        job.movie_id = movie_id
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        self._notify(job.id, final=True)
+
+    def _notify(self, job_id, final):
+        with self._lock:
+            event = self._events.get(job_id)
+            if final:
+                self._events.pop(job_id, None)
+                self._fetch_overrides.pop(job_id, None)
+        if event is not None:
+            event.set()
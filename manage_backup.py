@@ -2,56 +2,186 @@
 from Movie_Web_App.app import create_app, db
 from flask_migrate import Migrate
 import click
+import time
+from datetime import timedelta
+from functools import partial
 from Movie_Web_App.data_manager.models import Movie
-from Movie_Web_App.omdb_api import fetch_movie_data
+from Movie_Web_App.omdb_api import OMDbClient, fetch_movie_data
+from Movie_Web_App import seeding
+from Movie_Web_App import posters
+from Movie_Web_App import backup
+from Movie_Web_App import refresh
+from Movie_Web_App import recommendations
 
 app = create_app()
 migrate = Migrate(app, db)
 
 @app.cli.command("seed-movies")
 @click.argument("titles_file", type=click.Path(exists=True))
-def seed_movies(titles_file):
+@click.option("--workers", default=8, show_default=True, help="Concurrent OMDb lookups.")
+@click.option("--rate", default=10.0, show_default=True, help="Max OMDb requests per second (0 = unlimited).")
+@click.option("--retries", default=3, show_default=True, help="Retries per title on network errors.")
+@click.option("--batch-size", default=200, show_default=True, help="Movies inserted per transaction.")
+@click.option("--resume/--restart", default=True, show_default=True,
+              help="Continue from the last checkpoint, or start from the top of the file.")
+def seed_movies(titles_file, workers, rate, retries, batch_size, resume):
     """Seed the movies table from a newline-separated file of titles."""
     with app.app_context():
-        count = 0
-        for line in open(titles_file, encoding="utf-8"):
-            title = line.strip()
-            if not title or Movie.query.filter_by(title=title).first():
-                click.echo(f"Skipping: {title}")
-                continue
-            data = fetch_movie_data(title)
-            if not data:
-                click.echo(f"Not found in OMDb: {title}")
-                continue
-
-            movie = Movie(
-                title    = data["title"],
-                director = data["director"],
-                year     = data.get("year"),
-                rating   = data.get("rating"),
-                poster   = data.get("poster"),
-                genre    = data.get("genre", ""),
-                plot     = data.get("plot", "")
+        # A dedicated client whose connection pool matches the worker count
+        client = OMDbClient(
+            connect_timeout=app.config['OMDB_CONNECT_TIMEOUT'],
+            read_timeout=app.config['OMDB_READ_TIMEOUT'],
+            retries=retries, pool_size=workers,
+            breaker=app.omdb_client.breaker,
+        )
+        try:
+            stats = seeding.seed_movies(
+                # the pipeline consults the cache itself, before rate limiting
+                titles_file, db.session,
+                partial(fetch_movie_data, use_cache=False, client=client),
+                cache=app.omdb_cache, workers=workers, rate=rate,
+                batch_size=batch_size, resume=resume, echo=click.echo,
             )
-            db.session.add(movie)
-            count += 1
-            click.echo(f"Added: {movie.title} ({movie.year})")
-
-        db.session.commit()
-        click.echo(f"Done—{count} new movies added.")
+        finally:
+            client.close()
+        click.echo(f"OMDb latency: {client.stats()}")
+        if stats.aborted:
+            click.echo("Aborted; re-run the same command to resume from the checkpoint.")
+        if stats.failed:
+            click.echo(f"Failed titles (re-run with --restart to retry): {', '.join(stats.failed)}")
+        if app.omdb_cache is not None:
+            click.echo(f"OMDb cache: {app.omdb_cache.stats()}")
+        click.echo(f"Done—{stats.added} new movies added. {stats.summary()}")
 
 @app.cli.command("remove-movie")
 @click.argument("movie_id", type=int)
 def remove_movie_cli(movie_id):
     """Remove a movie from the catalog by its ID."""
     with app.app_context():
-        m = Movie.query.get(movie_id)
+        m = app.data_manager.get_movie(movie_id)
         if not m:
             click.echo(f"No movie with ID {movie_id}")
             return
-        db.session.delete(m)
-        db.session.commit()
-        click.echo(f"Deleted movie {m.title} (ID {movie_id})")
+        title = m.title
+        # also drops its co-occurrence and recommendation rows and cached pages
+        app.data_manager.delete_movie(movie_id)
+        click.echo(f"Deleted movie {title} (ID {movie_id})")
+
+@app.cli.command("repair-stats")
+def repair_stats():
+    """Recompute review counts, averages and histograms from the reviews table."""
+    with app.app_context():
+        fixed = app.data_manager.repair_review_stats()
+        click.echo(f"Repaired {fixed['movie_stats']} movie_stats rows and "
+                   f"{fixed['histogram']} histogram buckets.")
+
+@app.cli.command("refresh-metadata")
+@click.option("--max-age", default=30.0, show_default=True, help="Refresh movies fetched more than this many days ago.")
+@click.option("--limit", default=1000, show_default=True, help="Movies refreshed per run, most-listed first.")
+@click.option("--batch-size", default=100, show_default=True, help="Movies committed per transaction.")
+@click.option("--workers", default=4, show_default=True, help="Concurrent OMDb lookups.")
+@click.option("--rate", default=5.0, show_default=True, help="Max OMDb requests per second (0 = unlimited).")
+@click.option("--every", default=0.0, show_default=True,
+              help="Keep running, starting a new pass every N minutes (0 = run once).")
+def refresh_metadata(max_age, limit, batch_size, workers, rate, every):
+    """Re-fetch stale OMDb data (ratings, posters, plots) and store what changed."""
+    with app.app_context():
+        client = OMDbClient(
+            connect_timeout=app.config['OMDB_CONNECT_TIMEOUT'],
+            read_timeout=app.config['OMDB_READ_TIMEOUT'],
+            retries=app.config['OMDB_RETRIES'], pool_size=workers,
+            breaker=app.omdb_client.breaker,
+        )
+        try:
+            while True:
+                stats = refresh.refresh_metadata(
+                    # bypass the cache for fresh answers (they still refresh it)
+                    db.session, partial(fetch_movie_data, use_cache=False, client=client),
+                    max_age=timedelta(days=max_age), limit=limit, batch_size=batch_size,
+                    workers=workers, rate=rate, poster_store=app.poster_store, echo=click.echo,
+                )
+                click.echo(f"Done—{stats.summary()}")
+                if stats.failed:
+                    click.echo(f"Failed titles (retried next run): {', '.join(stats.failed)}")
+                if not every:
+                    break
+                time.sleep(every * 60)
+        finally:
+            client.close()
+
+@app.cli.command("rebuild-recommendations")
+@click.option("--top-k", default=0, show_default=True,
+              help="Neighbours kept per movie (0 = all; smaller tables, approximate scores).")
+@click.option("--min-count", default=1, show_default=True, help="Ignore pairs shared by fewer lists.")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows fetched/inserted per round trip.")
+def rebuild_recommendations(top_k, min_count, batch_size):
+    """Recompute "also listed" counts and every user's recommendations from the lists."""
+    with app.app_context():
+        counts = recommendations.rebuild(db.session, app.data_manager, top_k=top_k or None,
+                                         min_count=min_count, batch_size=batch_size, echo=click.echo)
+        if app.response_cache is not None:
+            # bulk writes bypass the session hooks that normally invalidate pages
+            app.response_cache.invalidate("movies", "users")
+        click.echo(f"Done—{counts['pairs']} neighbour rows, {counts['users']} users.")
+
+@app.cli.command("backfill-posters")
+@click.option("--workers", default=8, show_default=True, help="Concurrent poster downloads.")
+def backfill_posters(workers):
+    """Download and resize posters for every movie that doesn't have a local copy."""
+    with app.app_context():
+        if app.poster_store is None:
+            click.echo("POSTER_CACHE_DIR is not set; nothing to do.")
+            return
+        urls = db.session.scalars(db.select(Movie.poster).where(Movie.poster.isnot(None)))
+        counts = posters.backfill(app.poster_store, urls, workers=workers, echo=click.echo)
+        click.echo(f"Posters: {counts['stored']} stored, {counts['skipped']} already cached, "
+                   f"{counts['failed']} failed.")
+
+@app.cli.command("export")
+@click.argument("target", type=click.Path())
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "csv"]), default="ndjson", show_default=True,
+              help="One NDJSON file, or a directory of per-table CSV files.")
+@click.option("--compress", type=click.Choice(["none", "gzip", "zstd"]), default="none", show_default=True)
+@click.option("--batch-size", default=5000, show_default=True, help="Rows fetched per round trip.")
+def export_data(target, fmt, compress, batch_size):
+    """Stream movies, users, lists and reviews to TARGET."""
+    with app.app_context():
+        try:
+            counts = backup.export_dataset(db.session, target, fmt=fmt,
+                                           compression=None if compress == "none" else compress,
+                                           batch_size=batch_size, echo=click.echo)
+        except backup.BackupError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"Exported {sum(counts.values())} rows to {target}.")
+
+@app.cli.command("import")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--batch-size", default=5000, show_default=True, help="Rows inserted per executemany.")
+def import_data(source, batch_size):
+    """Load an export (NDJSON file or CSV directory) into an empty database."""
+    with app.app_context():
+        try:
+            counts = backup.import_dataset(db.session, source, batch_size=batch_size, echo=click.echo)
+        except backup.BackupError as exc:
+            raise click.ClickException(str(exc))
+        if app.response_cache is not None:
+            # bulk inserts bypass the session hooks that normally invalidate pages
+            app.response_cache.invalidate("movies", "users", "ratings")
+        click.echo(f"Imported {sum(counts.values())} rows from {source}.")
+        click.echo("Run `rebuild-recommendations` to recompute recommendations for the imported lists.")
+
+@app.cli.command("snapshot")
+@click.argument("target", type=click.Path())
+@click.option("--pages", default=1024, show_default=True,
+              help="Pages copied per step when the database isn't in WAL mode.")
+def snapshot(target, pages):
+    """Copy the live SQLite database to TARGET without stopping the app."""
+    with app.app_context():
+        try:
+            size = backup.snapshot_sqlite(db.engine, target, pages=pages)
+        except backup.BackupError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"Snapshot written to {target} ({size / 1024 ** 2:.1f} MiB).")
 
 if __name__ == "__main__":
     app.run(debug=True, port=5030)
@@ -0,0 +1,61 @@
+"""Add normalized genres and movie_genres tables
+
+Revision ID: 5e2f8a1c9d40
+Revises: b4c1e9d27a53
+Create Date: 2025-06-04 18:02:11.730945
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2f8a1c9d40'
+down_revision = 'b4c1e9d27a53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=40), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('movie_genres',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id', 'genre_id')
+    )
+    op.create_index('ix_movie_genres_genre_id_movie_id', 'movie_genres',
+                    ['genre_id', 'movie_id'], unique=False)
+
+    # Backfill from the comma-separated movies.genre column
+    conn = op.get_bind()
+    genre_ids = {}
+    links = []
+    for movie_id, raw in conn.execute(sa.text("SELECT id, genre FROM movies WHERE genre IS NOT NULL")):
+        names = []
+        for name in raw.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        for name in names:
+            genre_ids.setdefault(name, len(genre_ids) + 1)
+            links.append({'movie_id': movie_id, 'genre_id': genre_ids[name]})
+
+    genres_table = sa.table('genres', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    links_table = sa.table('movie_genres', sa.column('movie_id', sa.Integer), sa.column('genre_id', sa.Integer))
+    if genre_ids:
+        op.bulk_insert(genres_table, [{'id': i, 'name': n} for n, i in genre_ids.items()])
+    if links:
+        op.bulk_insert(links_table, links)
+
+
+def downgrade():
+    op.drop_index('ix_movie_genres_genre_id_movie_id', table_name='movie_genres')
+    op.drop_table('movie_genres')
+    op.drop_table('genres')
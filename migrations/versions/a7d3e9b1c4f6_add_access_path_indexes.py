@@ -0,0 +1,37 @@
+"""Add secondary indexes for the catalog, list and review access paths
+
+Revision ID: a7d3e9b1c4f6
+Revises: f4b8c2d6e913
+Create Date: 2025-06-21 09:12:37.508164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9b1c4f6'
+down_revision = 'f4b8c2d6e913'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (name, table, columns)
+    ('ix_movies_title_id', 'movies', ['title', 'id']),
+    ('ix_user_movies_user_id_added_at', 'user_movies', ['user_id', 'added_at', 'movie_id']),
+    ('ix_user_movies_movie_id', 'user_movies', ['movie_id', 'user_id']),
+    ('ix_reviews_movie_id_created_at', 'reviews', ['movie_id', 'created_at', 'review_id']),
+    ('ix_reviews_user_id_created_at', 'reviews', ['user_id', 'created_at']),
+    ('ix_enrichment_jobs_user_id_status', 'enrichment_jobs', ['user_id', 'status']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
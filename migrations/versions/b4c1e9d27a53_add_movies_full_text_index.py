@@ -0,0 +1,59 @@
+"""Add FTS5 full-text index over movies
+
+Revision ID: b4c1e9d27a53
+Revises: 7de0806500f8
+Create Date: 2025-06-02 09:14:31.402118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c1e9d27a53'
+down_revision = '7de0806500f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; PostgreSQL gets its search index in c8d2f5a7e1b3
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+            title, director, plot, genre,
+            content='movies', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts(rowid, title, director, plot, genre)
+            VALUES (new.id, new.title, new.director, new.plot, new.genre);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+            VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+            VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+            INSERT INTO movies_fts(rowid, title, director, plot, genre)
+            VALUES (new.id, new.title, new.director, new.plot, new.genre);
+        END
+    """)
+    # Backfill from the existing catalog
+    op.execute("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS movies_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS movies_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS movies_fts_ai")
+    op.execute("DROP TABLE IF EXISTS movies_fts")
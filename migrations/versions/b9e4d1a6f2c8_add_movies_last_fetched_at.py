@@ -0,0 +1,58 @@
+"""Add movies.last_fetched_at for incremental OMDb refreshes
+
+Revision ID: b9e4d1a6f2c8
+Revises: a7d3e9b1c4f6
+Create Date: 2025-06-24 16:40:03.117925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4d1a6f2c8'
+down_revision = 'a7d3e9b1c4f6'
+branch_labels = None
+depends_on = None
+
+
+def _create_fts_triggers(update_columns):
+    op.execute("DROP TRIGGER IF EXISTS movies_fts_au")
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts(rowid, title, director, plot, genre)
+            VALUES (new.id, new.title, new.director, new.plot, new.genre);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+            VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER movies_fts_au AFTER UPDATE {update_columns}ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, director, plot, genre)
+            VALUES ('delete', old.id, old.title, old.director, old.plot, old.genre);
+            INSERT INTO movies_fts(rowid, title, director, plot, genre)
+            VALUES (new.id, new.title, new.director, new.plot, new.genre);
+        END
+    """)
+
+
+def upgrade():
+    # NULL for existing rows: fetched at an unknown time, so refreshed first
+    op.add_column('movies', sa.Column('last_fetched_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_movies_last_fetched_at', 'movies', ['last_fetched_at'], unique=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        # only re-index when an indexed column changes
+        _create_fts_triggers('OF title, director, plot, genre ')
+
+
+def downgrade():
+    op.drop_index('ix_movies_last_fetched_at', table_name='movies')
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.drop_column('last_fetched_at')
+    if op.get_bind().dialect.name == 'sqlite':
+        # the batch rebuild of `movies` dropped its triggers
+        _create_fts_triggers('')
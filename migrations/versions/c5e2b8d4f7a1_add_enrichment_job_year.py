@@ -0,0 +1,26 @@
+"""Add enrichment_jobs.year
+
+Revision ID: c5e2b8d4f7a1
+Revises: a7c3e9f1b5d2
+Create Date: 2025-07-28 10:04:17.932415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2b8d4f7a1'
+down_revision = 'a7c3e9f1b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('enrichment_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('year', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('enrichment_jobs', schema=None) as batch_op:
+        batch_op.drop_column('year')
@@ -0,0 +1,41 @@
+"""Add PostgreSQL search indexes (tsvector + pg_trgm)
+
+Revision ID: c8d2f5a7e1b3
+Revises: 5e2f8a1c9d40
+Create Date: 2025-06-09 11:26:48.215304
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2f5a7e1b3'
+down_revision = '5e2f8a1c9d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite searches through movies_fts (b4c1e9d27a53); nothing to do there
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("""
+        ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(director, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(genre, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(plot, '')), 'D')
+        ) STORED
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING gin (search_vector)")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_users_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_movies_search_vector")
+    op.execute("ALTER TABLE movies DROP COLUMN IF EXISTS search_vector")
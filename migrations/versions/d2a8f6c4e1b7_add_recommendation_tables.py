@@ -0,0 +1,59 @@
+"""Add movie_cooccurrence and user_recommendations
+
+Revision ID: d2a8f6c4e1b7
+Revises: b9e4d1a6f2c8
+Create Date: 2025-07-08 09:41:17.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f6c4e1b7'
+down_revision = 'b9e4d1a6f2c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('movie_cooccurrence',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('other_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['other_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id', 'other_id')
+    )
+    op.create_index('ix_movie_cooccurrence_movie_id_count', 'movie_cooccurrence',
+                    ['movie_id', 'count', 'other_id'], unique=False)
+    op.create_table('user_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'movie_id')
+    )
+    op.create_index('ix_user_recommendations_user_id_score', 'user_recommendations',
+                    ['user_id', 'score', 'movie_id'], unique=False)
+    op.create_index('ix_user_recommendations_movie_id', 'user_recommendations',
+                    ['movie_id'], unique=False)
+
+    # Count the existing lists; per-user recommendations are filled in by
+    # `flask rebuild-recommendations` (or as users edit their lists)
+    op.execute("""
+        INSERT INTO movie_cooccurrence (movie_id, other_id, count)
+        SELECT a.movie_id, b.movie_id, COUNT(*)
+        FROM user_movies AS a
+        JOIN user_movies AS b ON b.user_id = a.user_id AND b.movie_id <> a.movie_id
+        GROUP BY a.movie_id, b.movie_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_user_recommendations_movie_id', table_name='user_recommendations')
+    op.drop_index('ix_user_recommendations_user_id_score', table_name='user_recommendations')
+    op.drop_table('user_recommendations')
+    op.drop_index('ix_movie_cooccurrence_movie_id_count', table_name='movie_cooccurrence')
+    op.drop_table('movie_cooccurrence')
@@ -0,0 +1,64 @@
+"""Add movie_stats and movie_rating_histogram review aggregates
+
+Revision ID: e1f7a3c5b902
+Revises: c8d2f5a7e1b3
+Create Date: 2025-06-11 16:40:07.518326
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f7a3c5b902'
+down_revision = 'c8d2f5a7e1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    stats = op.create_table('movie_stats',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('avg_rating', sa.Float(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id')
+    )
+    op.create_index('ix_movie_stats_avg_rating', 'movie_stats', ['avg_rating', 'movie_id'], unique=False)
+    op.create_index('ix_movie_stats_review_count', 'movie_stats', ['review_count', 'movie_id'], unique=False)
+    histogram = op.create_table('movie_rating_histogram',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.SmallInteger(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id', 'bucket')
+    )
+
+    # Backfill from existing reviews (buckets: rating rounded to a whole point)
+    conn = op.get_bind()
+    movies, buckets = {}, {}
+    for movie_id, rating in conn.execute(sa.text("SELECT movie_id, rating FROM reviews")):
+        count, total = movies.get(movie_id, (0, 0.0))
+        movies[movie_id] = (count + 1, total + rating)
+        key = (movie_id, min(max(int(rating + 0.5), 0), 10))
+        buckets[key] = buckets.get(key, 0) + 1
+    rows = []
+    for (movie_id,) in conn.execute(sa.text("SELECT id FROM movies")):
+        count, total = movies.get(movie_id, (0, 0.0))
+        rows.append({'movie_id': movie_id, 'review_count': count, 'rating_sum': total,
+                     'avg_rating': total / count if count else 0.0})
+    if rows:
+        op.bulk_insert(stats, rows)
+    known = {row['movie_id'] for row in rows}
+    buckets = [{'movie_id': m, 'bucket': b, 'count': c}
+               for (m, b), c in buckets.items() if m in known]
+    if buckets:
+        op.bulk_insert(histogram, buckets)
+
+
+def downgrade():
+    op.drop_table('movie_rating_histogram')
+    op.drop_index('ix_movie_stats_review_count', table_name='movie_stats')
+    op.drop_index('ix_movie_stats_avg_rating', table_name='movie_stats')
+    op.drop_table('movie_stats')
@@ -0,0 +1,35 @@
+"""Backfill user_movies.added_at and make it NOT NULL
+
+Revision ID: e8a4c1f6d3b9
+Revises: c5e2b8d4f7a1
+Create Date: 2025-07-29 14:37:52.106824
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c1f6d3b9'
+down_revision = 'c5e2b8d4f7a1'
+branch_labels = None
+depends_on = None
+
+# models.UNKNOWN_ADDED_AT: NULLs sorted oldest on SQLite, and still do
+UNKNOWN_ADDED_AT = datetime(1970, 1, 1)
+
+
+def upgrade():
+    user_movies = sa.table('user_movies', sa.column('added_at', sa.DateTime()))
+    op.execute(user_movies.update()
+               .where(user_movies.c.added_at.is_(None))
+               .values(added_at=UNKNOWN_ADDED_AT))
+    with op.batch_alter_table('user_movies', schema=None) as batch_op:
+        batch_op.alter_column('added_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_movies', schema=None) as batch_op:
+        batch_op.alter_column('added_at', existing_type=sa.DateTime(), nullable=True)
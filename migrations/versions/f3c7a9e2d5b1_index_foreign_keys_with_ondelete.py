@@ -0,0 +1,28 @@
+"""Index the foreign keys that ON DELETE rules look up
+
+Revision ID: f3c7a9e2d5b1
+Revises: e8a4c1f6d3b9
+Create Date: 2025-07-30 10:05:17.332914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c7a9e2d5b1'
+down_revision = 'e8a4c1f6d3b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_movie_cooccurrence_other_id', 'movie_cooccurrence', ['other_id'], unique=False)
+    op.create_index('ix_enrichment_jobs_movie_id', 'enrichment_jobs', ['movie_id'], unique=False)
+    op.create_index('ix_list_imports_user_id', 'list_imports', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_list_imports_user_id', table_name='list_imports')
+    op.drop_index('ix_enrichment_jobs_movie_id', table_name='enrichment_jobs')
+    op.drop_index('ix_movie_cooccurrence_other_id', table_name='movie_cooccurrence')
@@ -2,24 +2,278 @@
 omdb_api.py
 
 Module for interacting with the OMDb API to fetch movie metadata.
+
+All traffic goes through an OMDbClient: a pooled keep-alive HTTP session
+with connect/read timeouts, retries with exponential backoff and jitter,
+a circuit breaker that fails fast while OMDb is down, and latency stats.
 """
 
+import logging
 import os
+import random
+import threading
+import time
+from collections import deque
+
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 
 # Load environment variables from .env
 load_dotenv()
 
 API_KEY = os.getenv("OMDB_API_KEY")
-URL = "http://www.omdbapi.com/"
+URL = os.getenv("OMDB_API_URL", "http://www.omdbapi.com/")
+
+logger = logging.getLogger(__name__)
+
+# Optional response cache (see omdb_cache.OMDbCache); set via configure_cache()
+_cache = None
+# Shared client used by fetch_movie_data; set via configure_client()
+_client = None
+_client_lock = threading.Lock()
+
+
+class OMDbUnavailable(Exception):
+    """OMDb could not answer: timeouts, connection errors or 5xx responses."""
+
+
+class CircuitOpen(OMDbUnavailable):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker: after `failure_threshold` consecutive
+    failures the circuit opens and calls fail fast for `reset_timeout`
+    seconds, then a single trial call decides whether to close it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the trial slot when half-open)."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+    def release_trial(self):
+        """Free the half-open trial slot of a call that ended without an answer."""
+        with self._lock:
+            self._trial_running = False
+
+
+class LatencyStats:
+    """Thread-safe call counters plus a window of recent latencies."""
+
+    def __init__(self, window: int = 1000):
+        self.calls = self.errors = 0
+        self.total_seconds = self.max_seconds = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True):
+        with self._lock:
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            def pct(p):
+                return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000 if recent else 0.0
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+                "max_ms": self.max_seconds * 1000,
+                "p50_ms": pct(0.50),
+                "p95_ms": pct(0.95),
+            }
+
+
+class OMDbClient:
+    """
+    Thread-safe OMDb client built on a pooled requests.Session.
+
+    Args:
+        api_key (str): OMDb key; defaults to OMDB_API_KEY from the environment.
+        base_url (str): API endpoint; defaults to the module-level URL.
+        connect_timeout / read_timeout (float): per-request timeouts in seconds.
+        retries (int): extra attempts on timeouts, connection errors, 429 and 5xx.
+        backoff (float): base delay for exponential backoff (full jitter).
+        max_backoff (float): cap on a single backoff delay.
+        pool_size (int): keep-alive connections kept open to OMDb.
+        breaker (CircuitBreaker): shared breaker; a default one is created.
+        on_request (callable): optional hook called with (seconds, ok) per
+            HTTP attempt, e.g. for request-level metrics.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key=None, base_url=None, connect_timeout=3.05,
+                 read_timeout=10.0, retries=2, backoff=0.3, max_backoff=5.0,
+                 pool_size=10, breaker=None, on_request=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyStats()
+        self.on_request = on_request
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-def fetch_movie_data(title: str) -> dict | None:
+    def _get(self, title: str, year: int = None) -> requests.Response:
+        """One HTTP attempt, timed and reported to the breaker."""
+        if not self.breaker.allow():
+            raise CircuitOpen("OMDb circuit breaker is open")
+        params = {"apikey": self.api_key or API_KEY, "t": title}
+        if year is not None:
+            params["y"] = year
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.get(self.base_url or URL, params=params, timeout=self.timeout)
+            ok = 200 <= response.status_code < 300   # 401/403/404 are failures too
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            self.latency.record(elapsed, ok)
+            if self.on_request is not None:
+                self.on_request(elapsed, ok)
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _sleep_before_retry(self, attempt: int):
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def fetch(self, title: str, year: int = None) -> dict | None:
+        """
+        Look a title up on OMDb (released in `year`, when given).
+
+        Returns:
+            dict | None: parsed movie (see parse_movie), or None when OMDb
+            answers that there is no such movie.
+
+        Raises:
+            OMDbUnavailable: when every attempt failed, OMDb returned an error
+            other than "not found", or the circuit is open.
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._sleep_before_retry(attempt - 1)
+            try:
+                response = self._get(title, year)
+            except CircuitOpen:
+                raise
+            except requests.RequestException as exc:
+                last_error = exc
+                continue
+            if response.status_code in self.RETRY_STATUSES:
+                last_error = OMDbUnavailable(f"HTTP {response.status_code}")
+                continue
+            break
+        else:
+            raise OMDbUnavailable(f"OMDb lookup failed for {title!r}: {last_error}") from last_error
+
+        logger.debug("Fetched from OMDb: %s", response.url)
+        return movie_from_response(response)
+
+    def stats(self) -> dict:
+        """Latency metrics plus the breaker state."""
+        return {**self.latency.snapshot(), "circuit": self.breaker.state}
+
+    def close(self):
+        self.session.close()
+
+
+def configure_cache(cache) -> None:
+    """
+    Install (or, with None, remove) the cache consulted by fetch_movie_data.
+    """
+    global _cache
+    _cache = cache
+
+
+def configure_client(client) -> None:
+    """
+    Install the OMDbClient used by fetch_movie_data (None resets to default).
+    """
+    global _client
+    _client = client
+
+
+def get_client() -> OMDbClient:
+    """The shared OMDbClient, created with defaults on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OMDbClient()
+    return _client
+
+
+def fetch_movie_data(title: str, use_cache: bool = True, client: OMDbClient = None,
+                     year: int = None) -> dict | None:
     """
     Query the OMDb API for a given movie title.
 
+    Found movies and definitive "not found" answers are served from the
+    configured cache while fresh; transport and HTTP errors are never cached.
+
     Args:
         title (str): The movie title to search.
+        use_cache (bool): Set False to force a network round trip (the fresh
+            answer still replaces the cached one).
+        client (OMDbClient): client to use instead of the shared one.
+        year (int): only the movie released that year ("Dune" of 1984
+            rather than of 2021).
 
     Returns:
         dict: A dictionary containing:
@@ -30,21 +284,56 @@ def fetch_movie_data(title: str) -> dict | None:
             - director (str)
             - genre (str)
             - plot (str)
-        or None if the movie wasn't found or on error.
+        or None if the movie wasn't found.
+
+    Raises:
+        OMDbUnavailable: OMDb timed out, errored or the circuit is open.
+    """
+    key = title if year is None else f"{title} ({year})"
+    cache = _cache
+    if cache is not None and use_cache:
+        cached = cache.get(key, default=False)
+        if cached is not False:
+            return cached
+
+    movie = (client or get_client()).fetch(title, year)
+    if cache is not None:
+        cache.set(key, movie)
+    return movie
+
+
+def movie_from_response(response) -> dict | None:
     """
-    params = {"apikey": API_KEY, "t": title}
-    response = requests.get(URL, params=params)
-    print("Fetching from OMDb:", response.url)
+    The parsed movie in an OMDb HTTP response (requests or httpx), or None
+    for "not found".
 
+    Raises:
+        OMDbUnavailable: non-200 status, a body that isn't JSON (a proxy's
+        HTML error page) or any other OMDb error.
+    """
     if response.status_code != 200:
-        print(f"Error fetching data: HTTP {response.status_code}")
-        return None
+        raise OMDbUnavailable(f"Error fetching data: HTTP {response.status_code}")
 
-    data = response.json()
+    try:
+        data = response.json()
+    except ValueError as exc:   # requests' and httpx's decode errors both subclass it
+        raise OMDbUnavailable(f"OMDb sent a non-JSON response: {exc}") from exc
+    if not isinstance(data, dict):
+        raise OMDbUnavailable("OMDb sent an unexpected JSON response")
     if data.get("Response") != "True":
-        print("OMDb says not found:", data.get("Error"))
+        error = str(data.get("Error", ""))
+        if "not found" not in error.lower():
+            # e.g. "Invalid API key!" or "Request limit reached!"
+            raise OMDbUnavailable(f"OMDb error: {error}")
+        logger.info("OMDb says not found: %s", error)
         return None
+    return parse_movie(data)
+
 
+def parse_movie(data: dict) -> dict:
+    """
+    Convert a raw OMDb JSON payload into the dict shape used by Movie(**data).
+    """
     # Parse year (handles ranges like "1967–1987")
     raw_year = data.get("Year", "")
     year_str = str(raw_year)
@@ -0,0 +1,183 @@
+"""
+omdb_async.py
+
+asyncio counterpart of omdb_api.OMDbClient, for views that need several
+OMDb answers at once (the /api/v1/lookup preview): the lookups run
+concurrently, so a request costs about one OMDb round trip instead of one
+per title.
+
+The async client wraps the app's sync client and shares its settings
+(API key, URL, timeouts, retries), latency stats and circuit breaker, so
+both paths see the same outages; answers go through the same OMDb cache.
+HTTP goes through httpx when it is installed (`pip install httpx`); without
+it each lookup runs the sync client on a thread, which still overlaps the
+round trips but can't be cancelled mid-request.
+
+Two limits keep slow OMDb answers from tying up the server:
+- `concurrency`: lookups in flight per request;
+- `max_requests`: lookup requests per process. Past it, admit() refuses
+  at once (the view answers 503) instead of queueing more waiting threads.
+A lookup still running at the request's deadline is cancelled.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from . import omdb_api
+from .omdb_api import CircuitOpen, OMDbUnavailable, movie_from_response
+
+try:
+    import httpx
+except ImportError:  # lookups fall back to the sync client on threads
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOMDbClient:
+    """
+    Concurrent OMDb lookups on top of an omdb_api.OMDbClient.
+
+    Args:
+        client (OMDbClient): the sync client whose settings, stats and
+            breaker are shared.
+        concurrency (int): lookups in flight per fetch_many call.
+        max_requests (int): fetch_many calls admitted at once per process.
+    """
+
+    def __init__(self, client, concurrency=8, max_requests=16):
+        self.client = client
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(max_requests)
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold one of the process's lookup slots; yields False (without
+        waiting) when they are all taken.
+        """
+        admitted = self._slots.acquire(blocking=False)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self._slots.release()
+
+    async def fetch_many(self, titles, timeout=None, use_cache=True) -> dict:
+        """
+        Look `titles` up concurrently.
+
+        Returns:
+            dict: title -> parsed movie, None (not found), or the exception
+            that stopped it (OMDbUnavailable, or TimeoutError when it was
+            cancelled at `timeout` seconds).
+        """
+        results, pending = {}, []
+        cache = omdb_api._cache if use_cache else None
+        for title in titles:
+            cached = cache.get(title, default=False) if cache is not None else False
+            if cached is not False:
+                results[title] = cached
+            else:
+                pending.append(title)
+        if not pending:
+            return results
+
+        limit = asyncio.Semaphore(self.concurrency)
+        http = self._http()
+        try:
+            async def one(title):
+                async with limit:
+                    movie = await self.fetch(title, http)
+                if omdb_api._cache is not None:
+                    omdb_api._cache.set(title, movie)
+                return movie
+
+            tasks = {title: asyncio.ensure_future(one(title)) for title in pending}
+            done, running = await asyncio.wait(tasks.values(), timeout=timeout)
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.wait(running)
+        finally:
+            if http is not None:
+                await http.aclose()
+        for title, task in tasks.items():
+            if task.cancelled():
+                results[title] = TimeoutError(f'OMDb lookup of {title!r} timed out')
+            elif task.exception() is not None:
+                results[title] = task.exception()
+            else:
+                results[title] = task.result()
+        return results
+
+    def _http(self):
+        if httpx is None:
+            return None
+        connect, read = self.client.timeout
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=self.concurrency),
+        )
+
+    async def fetch(self, title, http=None) -> dict | None:
+        """
+        One lookup with the sync client's retries and breaker (no cache).
+
+        Raises:
+            OMDbUnavailable: as OMDbClient.fetch.
+        """
+        if http is None:
+            return await asyncio.to_thread(self.client.fetch, title)
+        client = self.client
+        last_error = None
+        for attempt in range(client.retries + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, min(client.max_backoff,
+                                                          client.backoff * 2 ** (attempt - 1))))
+            try:
+                response = await self._get(http, title)
+            except CircuitOpen:
+                raise
+            except httpx.HTTPError as exc:
+                last_error = exc
+                continue
+            if response.status_code in client.RETRY_STATUSES:
+                last_error = OMDbUnavailable(f"HTTP {response.status_code}")
+                continue
+            break
+        else:
+            raise OMDbUnavailable(f"OMDb lookup failed for {title!r}: {last_error}") from last_error
+        logger.debug("Fetched from OMDb: %s", response.url)
+        return movie_from_response(response)
+
+    async def _get(self, http, title):
+        """One HTTP attempt, timed and reported like OMDbClient._get."""
+        client = self.client
+        if not client.breaker.allow():
+            raise CircuitOpen("OMDb circuit breaker is open")
+        params = {"apikey": client.api_key or omdb_api.API_KEY, "t": title}
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await http.get(client.base_url or omdb_api.URL, params=params)
+            ok = 200 <= response.status_code < 300
+            return response
+        except asyncio.CancelledError:
+            ok = None   # our deadline, not OMDb's fault
+            client.breaker.release_trial()   # or a half-open breaker never closes
+            raise
+        finally:
+            if ok is not None:
+                elapsed = time.perf_counter() - started
+                client.latency.record(elapsed, ok)
+                if client.on_request is not None:
+                    client.on_request(elapsed, ok)
+                if ok:
+                    client.breaker.record_success()
+                else:
+                    client.breaker.record_failure()
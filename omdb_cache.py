@@ -0,0 +1,157 @@
+"""
+omdb_cache.py
+
+Persistent cache for OMDb lookups, stored in a small SQLite file.
+
+Entries are keyed by the normalized title that was looked up. Both hits
+(the parsed movie dict) and definitive "not found" answers are remembered,
+each with its own TTL, and the table is bounded by LRU eviction.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+
+def normalize_title(title: str) -> str:
+    """Cache key for a title: case-folded with whitespace collapsed."""
+    return ' '.join((title or '').casefold().split())
+
+
+class OMDbCache:
+    """
+    Thread-safe, size-bounded TTL cache for OMDb responses.
+
+    Args:
+        path (str): SQLite file to store entries in (':memory:' for tests).
+        ttl (float): seconds a found movie stays fresh.
+        negative_ttl (float): seconds a "not found" answer stays fresh.
+        max_entries (int): LRU eviction kicks in above this many rows.
+        clock (callable): time source, injectable for tests.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, negative_ttl=24 * 3600,
+                 max_entries=50_000, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = self.misses = self.negative_hits = self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size = 0
+
+    def _connect(self):
+        """Open (and create) the cache file on first use."""
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS omdb_cache (
+                    key        TEXT PRIMARY KEY,
+                    payload    TEXT,
+                    expires_at REAL NOT NULL,
+                    last_used  REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_omdb_cache_last_used ON omdb_cache (last_used)")
+            self._size = conn.execute("SELECT count(*) FROM omdb_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, title: str, default=_MISSING):
+        """
+        Look up a title.
+
+        Returns:
+            dict | None: the cached movie, or None for a cached "not found".
+            `default` (or a KeyError) when there is no fresh entry.
+        """
+        key = normalize_title(title)
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, expires_at FROM omdb_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                if default is _MISSING:
+                    raise KeyError(title)
+                return default
+            conn.execute("UPDATE omdb_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            if row[0] is None:
+                self.negative_hits += 1
+                return None
+            return json.loads(row[0])
+
+    def set(self, title: str, data: dict | None):
+        """Remember a lookup result; pass None to cache a "not found"."""
+        key = normalize_title(title)
+        now = self.clock()
+        ttl = self.ttl if data is not None else self.negative_ttl
+        payload = json.dumps(data) if data is not None else None
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "UPDATE omdb_cache SET payload = ?, expires_at = ?, last_used = ? WHERE key = ?",
+                (payload, now + ttl, now, key),
+            )
+            if cur.rowcount == 0:
+                conn.execute(
+                    "INSERT INTO omdb_cache (key, payload, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, payload, now + ttl, now),
+                )
+                self._size += 1
+            if self._size > self.max_entries:
+                # other processes sharing the file add and evict too: recount
+                self._size = conn.execute("SELECT count(*) FROM omdb_cache").fetchone()[0]
+                if self._size > self.max_entries:
+                    self._evict(conn, self._size - self.max_entries)
+
+    def _evict(self, conn, count):
+        """Drop the `count` least recently used entries."""
+        deleted = conn.execute(
+            "DELETE FROM omdb_cache WHERE key IN "
+            "(SELECT key FROM omdb_cache ORDER BY last_used LIMIT ?)", (count,)
+        ).rowcount
+        self._size -= deleted
+        self.evictions += deleted
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._connect().execute("DELETE FROM omdb_cache")
+            self._size = 0
+            self.hits = self.misses = self.negative_hits = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Counters for monitoring: hits, misses, negative hits, evictions, size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'evictions': self.evictions,
+            'size': self._size,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def after_fork(self):
+        """
+        In a forked worker: forget the parent's connection without closing
+        it (it still belongs to the parent) and start with a fresh lock.
+        """
+        self._lock = threading.Lock()
+        self._conn = None
@@ -0,0 +1,246 @@
+"""
+posters.py
+
+Local copies of movie posters, so pages don't hot-link full-size images from
+OMDb's CDN.
+
+Each poster is downloaded once and stored content-addressed: the SHA-256 of
+the original image names a directory holding one file per size variant
+(WebP thumbnails made with Pillow; without it, which is logged as a
+warning, every variant is a copy of the original bytes).
+Identical images are stored once, and the files never change, so they are
+served with a year-long `immutable` Cache-Control.
+
+Downloads happen lazily on first view of a poster, in the background after
+`add_movie`, or in bulk through the `backfill-posters` CLI command.
+"""
+
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: fall back to the original image
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+EXT_RE = re.compile(r'^[a-z0-9]{2,5}$')
+DEFAULT_SIZES = {'thumb': 300, 'full': 800}   # name -> max width in px
+MAX_BYTES = 5 * 1024 ** 2
+# Raster formats only: anything else (e.g. SVG) could carry script
+IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/gif'}
+
+
+class PosterError(Exception):
+    """A poster could not be downloaded or decoded."""
+
+
+def is_remote_poster(url) -> bool:
+    return bool(url) and url.startswith(('http://', 'https://'))
+
+
+class PosterStore:
+    """
+    On-disk, content-addressed poster cache.
+
+    Args:
+        root (str): cache directory.
+        sizes (dict): variant name -> max width in pixels.
+        timeout (float): per-download timeout in seconds.
+        workers (int): threads for background prefetches.
+        retry_after (float): seconds to wait before retrying a failed URL.
+    """
+
+    def __init__(self, root, sizes=None, timeout=10.0, workers=2, retry_after=600):
+        self.root = root
+        self.sizes = dict(sizes or DEFAULT_SIZES)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 8))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._digests = {}    # url -> (digest, ext)
+        self._failures = {}   # url -> monotonic time of the last failure
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._executor = None
+        if Image is None:
+            logger.warning('Pillow is not installed: posters are stored at full size '
+                           'under every POSTER_SIZES entry (pip install Pillow)')
+
+    # -- paths ----------------------------------------------------------------
+    def _url_index_path(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.root, 'by-url', key[:2], key)
+
+    def variant_path(self, digest, size, ext):
+        """Where a size variant lives; None for names that can't be ours."""
+        if not DIGEST_RE.match(digest) or size not in self.sizes or not EXT_RE.match(ext):
+            return None
+        return os.path.join(self.root, digest[:2], digest, f'{size}.{ext}')
+
+    # -- lookups --------------------------------------------------------------
+    def lookup(self, url):
+        """(digest, ext) of a stored poster URL, or None if not downloaded yet."""
+        with self._lock:
+            if url in self._digests:
+                return self._digests[url]
+        try:
+            with open(self._url_index_path(url), encoding='ascii') as fh:
+                digest, ext = fh.read().split()
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._digests[url] = (digest, ext)
+        return digest, ext
+
+    def recently_failed(self, url):
+        with self._lock:
+            failed_at = self._failures.get(url)
+        return failed_at is not None and time.monotonic() - failed_at < self.retry_after
+
+    # -- downloads ------------------------------------------------------------
+    def ensure(self, url):
+        """
+        Make sure every size variant of `url` is stored.
+
+        Returns:
+            (digest, ext) of the stored poster.
+        Raises:
+            PosterError: download failed, wasn't an image or was too large.
+        """
+        found = self.lookup(url)
+        if found is not None:
+            return found
+        try:
+            original, content_type = self._download(url)
+            variants, ext = self._render_variants(original, content_type)
+        except PosterError:
+            with self._lock:
+                self._failures[url] = time.monotonic()
+            raise
+        digest = hashlib.sha256(original).hexdigest()
+        for size, data in variants.items():
+            path = self.variant_path(digest, size, ext)
+            if not os.path.exists(path):
+                _atomic_write(path, data)
+        _atomic_write(self._url_index_path(url), f'{digest} {ext}'.encode('ascii'))
+        with self._lock:
+            self._digests[url] = (digest, ext)
+            self._failures.pop(url, None)
+        return digest, ext
+
+    def _download(self, url):
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as resp:
+                if resp.status_code != 200:
+                    raise PosterError(f'HTTP {resp.status_code} for {url}')
+                content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+                if content_type not in IMAGE_TYPES:
+                    raise PosterError(f'not a poster image ({content_type or "no content type"}): {url}')
+                body = io.BytesIO()
+                for chunk in resp.iter_content(64 * 1024):
+                    body.write(chunk)
+                    if body.tell() > MAX_BYTES:
+                        raise PosterError(f'poster larger than {MAX_BYTES} bytes: {url}')
+        except requests.RequestException as exc:
+            raise PosterError(f'{url}: {exc}') from exc
+        return body.getvalue(), content_type
+
+    def _render_variants(self, original, content_type):
+        """Size variants as {size: bytes}, plus their file extension."""
+        if Image is None:
+            ext = (mimetypes.guess_extension(content_type) or '.img').lstrip('.')
+            return {size: original for size in self.sizes}, ext
+        try:
+            image = Image.open(io.BytesIO(original))
+            image.load()
+        except Exception as exc:
+            raise PosterError(f'undecodable image: {exc}') from exc
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        variants = {}
+        for size, width in self.sizes.items():
+            copy = image.copy()
+            copy.thumbnail((width, width * 3))   # keep aspect ratio, never upscale
+            out = io.BytesIO()
+            copy.save(out, 'WEBP', quality=82, method=4)
+            variants[size] = out.getvalue()
+        return variants, 'webp'
+
+    def prefetch(self, url):
+        """Download `url` in the background; errors are only logged."""
+        if not is_remote_poster(url) or self.lookup(url) is not None:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix='poster')
+        future = self._executor.submit(self.ensure, url)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.warning('Poster prefetch failed: %s', exc)
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def backfill(store, urls, workers=8, echo=print):
+    """
+    Download every poster in `urls` that isn't stored yet, `workers` at a time.
+
+    Returns:
+        dict: counts of 'stored', 'skipped' (already present) and 'failed'.
+    """
+    counts = {'stored': 0, 'skipped': 0, 'failed': 0}
+    todo = []
+    for url in dict.fromkeys(urls):
+        if not is_remote_poster(url):
+            continue
+        if store.lookup(url) is not None:
+            counts['skipped'] += 1
+        else:
+            todo.append(url)
+
+    def fetch(url):
+        try:
+            store.ensure(url)
+            return None
+        except PosterError as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster-backfill') as pool:
+        for url, error in zip(todo, pool.map(fetch, todo)):
+            if error is None:
+                counts['stored'] += 1
+            else:
+                counts['failed'] += 1
+                echo(f'Failed: {error}')
+    return counts
@@ -0,0 +1,140 @@
+"""
+recommendations.py
+
+Offline rebuild of the item–item co-occurrence table behind "users who
+listed this also listed" and "recommended for you" (the
+`rebuild-recommendations` CLI command).
+
+`movie_cooccurrence` holds, for every pair of movies that appear together
+on at least one list, how many lists they share. The data manager keeps it
+current as movies are added to or removed from a list; this module
+recomputes it from scratch, e.g. after an import or a bulk edit.
+
+List entries are streamed user by user. With NumPy installed each list's
+pairs are encoded as int64 keys and merged with np.unique in chunks; without
+it a Counter over itertools.combinations does the same (slower) work. The
+optional `top_k` keeps only each movie's strongest neighbours. That keeps
+the table small for big catalogs but makes the user scores approximate:
+pairs below a movie's cut-off no longer contribute.
+"""
+
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, insert, select
+
+from .data_manager.models import MovieCooccurrence, User, user_movies
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds the rebuild up
+    np = None
+
+# Pairs collected before the NumPy path merges them
+CHUNK_PAIRS = 1_000_000
+
+
+def user_lists(session, batch_size=10_000):
+    """Yield each user's listed movie ids (sorted), streaming list entries."""
+    conn = session.connection().execution_options(yield_per=batch_size)
+    result = conn.execute(select(user_movies.c.user_id, user_movies.c.movie_id)
+                          .order_by(user_movies.c.user_id, user_movies.c.movie_id))
+    for _, rows in itertools.groupby(itertools.chain.from_iterable(result.partitions()),
+                                     key=lambda row: row[0]):
+        yield [movie_id for _, movie_id in rows]
+
+
+def count_pairs_python(lists):
+    """{(a, b): shared lists} for a < b."""
+    counts = Counter()
+    for movies in lists:
+        counts.update(itertools.combinations(movies, 2))
+    return counts
+
+
+def count_pairs_numpy(lists, chunk_pairs=CHUNK_PAIRS):
+    """Same as count_pairs_python, vectorised with NumPy."""
+    keys, counts, pending, size = None, None, [], 0
+
+    def merge():
+        nonlocal keys, counts
+        chunk_keys, chunk_counts = np.unique(np.concatenate(pending), return_counts=True)
+        if keys is not None:
+            chunk_keys = np.concatenate([keys, chunk_keys])
+            chunk_counts = np.concatenate([counts, chunk_counts])
+            chunk_keys, inverse = np.unique(chunk_keys, return_inverse=True)
+            chunk_counts = np.bincount(inverse, weights=chunk_counts).astype(np.int64)
+        keys, counts = chunk_keys, chunk_counts
+        pending.clear()
+
+    for movies in lists:
+        if len(movies) < 2:
+            continue
+        ids = np.asarray(movies, dtype=np.int64)
+        a, b = np.triu_indices(len(ids), k=1)
+        pending.append((ids[a] << 32) | ids[b])
+        size += len(a)
+        if size >= chunk_pairs:
+            merge()
+            size = 0
+    if pending:
+        merge()
+    if keys is None:
+        return Counter()
+    return Counter({(int(k >> 32), int(k & 0xFFFFFFFF)): int(c)
+                    for k, c in zip(keys.tolist(), counts.tolist())})
+
+
+def neighbour_rows(pairs, top_k=None, min_count=1):
+    """
+    Both directions of every pair as movie_cooccurrence rows; with `top_k`,
+    only each movie's `top_k` strongest neighbours.
+    """
+    rows = [(a, b, n) for (a, b), n in pairs.items() if n >= min_count]
+    rows += [(b, a, n) for a, b, n in rows]
+    if top_k is not None:
+        by_movie = defaultdict(list)
+        for a, b, n in rows:
+            by_movie[a].append((n, b))
+        rows = [(a, b, n) for a, neighbours in by_movie.items()
+                for n, b in heapq.nlargest(top_k, neighbours)]
+    return [{'movie_id': a, 'other_id': b, 'count': n} for a, b, n in rows]
+
+
+def rebuild(session, data_manager, top_k=None, min_count=1, batch_size=10_000,
+            use_numpy=None, echo=print):
+    """
+    Recompute movie_cooccurrence from the lists (one transaction), then
+    every user's recommendations.
+
+    Args:
+        session: SQLAlchemy session.
+        data_manager: stores the per-user recommendations.
+        top_k: neighbours kept per movie (None = all; approximate otherwise).
+        min_count: drop pairs shared by fewer lists.
+        batch_size: rows fetched/inserted per round trip.
+        use_numpy: force the NumPy (True) or pure-Python (False) path;
+            None picks NumPy when installed.
+    Returns:
+        dict: pairs stored and users scored.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy and np is None:
+        raise RuntimeError('use_numpy=True needs NumPy (pip install numpy)')
+    count = count_pairs_numpy if use_numpy else count_pairs_python
+    pairs = count(user_lists(session, batch_size))
+    rows = neighbour_rows(pairs, top_k=top_k, min_count=min_count)
+    echo(f'{len(pairs)} movie pairs counted, storing {len(rows)} neighbour rows')
+
+    session.execute(delete(MovieCooccurrence))
+    for start in range(0, len(rows), batch_size):
+        session.execute(insert(MovieCooccurrence), rows[start:start + batch_size])
+    session.commit()
+    users = 0
+    for user_id in session.scalars(select(User.id).order_by(User.id)).all():
+        data_manager.refresh_recommendations(user_id)
+        users += 1
+    echo(f'Recommendations refreshed for {users} users')
+    return {'pairs': len(rows), 'users': users}
@@ -0,0 +1,168 @@
+"""
+refresh.py
+
+Incremental OMDb metadata refresh behind the `refresh-metadata` CLI command.
+
+Ratings, posters and plots change on OMDb after a movie is added. Each run
+picks the movies whose `last_fetched_at` is older than the maximum age
+(never-fetched ones count as oldest) and puts the most-listed and
+most-reviewed first. It looks them up again through the same rate-limited
+thread pool as seeding, in batches.
+
+Only movies whose OMDb fields actually changed are written through the ORM,
+so the page cache and the genre index follow as for any other edit. For the
+rest a single UPDATE per batch bumps `last_fetched_at`; it touches no other
+column and invalidates nothing.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select, update
+
+from .data_manager.models import Movie, MovieStats, user_movies
+from .omdb_api import CircuitOpen
+from .omdb_cache import normalize_title
+from .seeding import RateLimiter
+
+# Columns OMDb owns; title and year identify the movie and are never rewritten
+REFRESH_FIELDS = ('director', 'rating', 'poster', 'genre', 'plot')
+
+
+@dataclass
+class RefreshStats:
+    checked: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    mismatched: int = 0
+    failed: list = field(default_factory=list)
+    aborted: str | None = None
+    started: float = field(default_factory=time.monotonic)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (f"{self.checked} checked, {self.updated} updated, {self.unchanged} unchanged, "
+                f"{self.not_found} not found, {self.mismatched} mismatched, "
+                f"{len(self.failed)} failed ({elapsed:.1f}s)")
+
+
+def stale_movies(session, cutoff: datetime, limit: int):
+    """
+    (id, title, year) of up to `limit` movies last fetched before `cutoff`,
+    most-listed first, then most-reviewed, then longest since fetched.
+    """
+    listings = (select(user_movies.c.movie_id, func.count().label('listings'))
+                .group_by(user_movies.c.movie_id).subquery())
+    stmt = (
+        select(Movie.id, Movie.title, Movie.year)
+        .outerjoin(listings, listings.c.movie_id == Movie.id)
+        .outerjoin(MovieStats, MovieStats.movie_id == Movie.id)
+        .where(or_(Movie.last_fetched_at.is_(None), Movie.last_fetched_at < cutoff))
+        .order_by(func.coalesce(listings.c.listings, 0).desc(),
+                  func.coalesce(MovieStats.review_count, 0).desc(),
+                  Movie.last_fetched_at.asc().nulls_first(), Movie.id)
+        .limit(limit)
+    )
+    return session.execute(stmt).all()
+
+
+def changed_fields(movie, data: dict) -> dict:
+    """The OMDb fields in `data` that differ from what `movie` has stored."""
+    return {name: data.get(name) for name in REFRESH_FIELDS
+            if name in data and data.get(name) != getattr(movie, name)}
+
+
+def same_movie(movie, data: dict) -> bool:
+    """Whether OMDb's answer describes `movie` rather than e.g. a remake."""
+    if normalize_title(data.get('title') or '') != normalize_title(movie.title):
+        return False
+    return movie.year is None or data.get('year') in (None, movie.year)
+
+
+def refresh_metadata(session, fetch, max_age: timedelta, limit: int = 1000,
+                     batch_size: int = 100, workers: int = 4, rate: float | None = 5,
+                     poster_store=None, echo=print, now=datetime.utcnow) -> RefreshStats:
+    """
+    Re-fetch up to `limit` stale movies and store what changed.
+
+    Args:
+        session: SQLAlchemy session.
+        fetch: callable(title) -> dict | None, bypassing the OMDb cache
+            (e.g. fetch_movie_data with use_cache=False); also passed
+            `year=` for movies that have one. CircuitOpen stops the run,
+            other errors skip the movie until the next run.
+        max_age: movies fetched longer ago than this are refreshed.
+        limit: movies per run, so a run has a bounded cost.
+        batch_size: movies looked up and committed together.
+        workers / rate: lookup threads and max OMDb requests per second.
+        poster_store: optional PosterStore; changed posters are prefetched.
+        echo: callable used for log lines.
+        now: clock, for tests.
+
+    Returns:
+        RefreshStats: counters for the run.
+    """
+    stats = RefreshStats()
+    candidates = stale_movies(session, now() - max_age, limit)
+    if not candidates:
+        echo("Nothing to refresh.")
+        return stats
+    limiter = RateLimiter(rate, burst=workers)
+
+    def lookup(movie):
+        _, title, year = movie
+        limiter.acquire()
+        try:
+            # the year keeps OMDb from answering with a newer film of the same title
+            return (fetch(title) if year is None else fetch(title, year=year)), None
+        except Exception as exc:
+            return None, exc
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omdb-refresh") as pool:
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            results = list(pool.map(lookup, batch))
+            fetched_at = now()
+            untouched = []
+            for (movie_id, title, _), (data, error) in zip(batch, results):
+                if isinstance(error, CircuitOpen):
+                    stats.aborted = str(error)
+                    break
+                stats.checked += 1
+                if error is not None:
+                    stats.failed.append(title)
+                    echo(f"Failed: {title} ({error})")
+                    continue
+                movie = session.get(Movie, movie_id)
+                if movie is None:   # deleted meanwhile
+                    continue
+                if data is None:
+                    stats.not_found += 1
+                elif not same_movie(movie, data):
+                    stats.mismatched += 1
+                    echo(f"Skipped: OMDb's “{data.get('title')}” ({data.get('year')}) "
+                         f"doesn't match “{title}” ({movie.year})")
+                else:
+                    changes = changed_fields(movie, data)
+                    if changes:
+                        for name, value in changes.items():
+                            setattr(movie, name, value)
+                        movie.last_fetched_at = fetched_at
+                        stats.updated += 1
+                        if 'poster' in changes and poster_store is not None:
+                            poster_store.prefetch(movie.poster)
+                        continue
+                    stats.unchanged += 1
+                untouched.append(movie_id)
+            if untouched:
+                session.execute(update(Movie).where(Movie.id.in_(untouched))
+                                .values(last_fetched_at=fetched_at))
+            session.commit()
+            if stats.aborted:
+                echo(f"Stopping: {stats.aborted}")
+                break
+            echo(f"Progress: {stats.summary()}")
+    return stats
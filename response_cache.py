@@ -0,0 +1,267 @@
+"""
+response_cache.py
+
+Full-page and fragment cache for the read-heavy views (catalog, search,
+movie pages).
+
+Entries are tagged instead of being deleted one by one: every tag ("movies",
+"movie:42", ...) has a version number that is part of the cache key, and a
+write bumps the versions of the tags it touches. Stale entries simply become
+unreachable and age out of the LRU (or expire in Redis). Tags are collected
+from the SQLAlchemy session on flush and bumped once the transaction commits,
+so every write path — routes, CLI commands, seeding — invalidates precisely
+what it changed. Core statements the flush can't see (the co-occurrence
+counts behind "also listed") report their movies with models.touch_movies.
+
+Cached pages carry an ETag and Last-Modified, so revalidating browsers get
+a 304 without the page being rendered again.
+
+Backends: LRUBackend (in-process, the default) or RedisBackend around any
+client with Redis' get/set/incr/mget (redis-py, or an in-memory stand-in in
+tests). Use Redis when several worker processes must see the same
+invalidations.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context, request, session
+from sqlalchemy import event
+
+from . import db
+from .data_manager.models import Genre, Movie, MovieStats, RatingBucket, Review, User
+
+
+class LRUBackend:
+    """Thread-safe in-process store; tag versions are never evicted."""
+
+    def __init__(self, max_entries=1000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.evictions = 0
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(t, 0) for t in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for t in tags:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared store on a Redis-compatible client; values are JSON."""
+
+    def __init__(self, client, prefix='movieweb:'):
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0   # Redis evicts on its own
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL needs the redis package (pip install redis)") from None
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def versions(self, tags):
+        if not tags:
+            return []
+        raw = self.client.mget([f'{self.prefix}tag:{t}' for t in tags])
+        return [int(v) if v is not None else 0 for v in raw]
+
+    def bump(self, tags):
+        for t in tags:
+            self.client.incr(f'{self.prefix}tag:{t}')
+
+    def __len__(self):
+        return 0
+
+
+class ResponseCache:
+    """
+    Tag-versioned page/fragment cache.
+
+    Args:
+        backend: LRUBackend or RedisBackend.
+        ttl (float): upper bound on an entry's lifetime in seconds.
+        clock (callable): wall-clock source for Last-Modified.
+    """
+
+    def __init__(self, backend, ttl=300, clock=time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = self.misses = self.not_modified = 0
+
+    def key(self, name, tags):
+        """
+        Versioned key for `name`. Take it *before* computing a value, so a
+        write that lands meanwhile makes the stored value unreachable.
+        """
+        versions = self.backend.versions(tags)
+        return name + '|' + ','.join(f'{t}={v}' for t, v in zip(tags, versions))
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def fragment(self, name, tags, compute):
+        """Return the cached value for `name`, computing and storing it on a miss."""
+        key = self.key(name, tags)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.bump(sorted(set(tags)))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.backend.evictions, 'size': len(self.backend)}
+
+
+def page_key():
+    """Cache key for the current request: endpoint, view args and query args."""
+    args = sorted(request.args.items(multi=True))
+    view_args = sorted((request.view_args or {}).items())
+    return f'page:{request.endpoint}:{view_args!r}:{args!r}'
+
+
+def _finish(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True   # always revalidate, usually a 304
+    return response.make_conditional(request)
+
+
+def cached_page(*tags):
+    """
+    Cache a GET view's full response under the given tags. A tag may be a
+    callable receiving the view's keyword arguments, e.g.
+    `lambda movie_id: f'movie:{movie_id}'`.
+
+    Requests with pending flash messages are served fresh, and responses
+    that touch the session or aren't 200 are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = getattr(current_app, 'response_cache', None)
+            if cache is None or request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            resolved = [t(**kwargs) if callable(t) else t for t in tags]
+            key = cache.key(page_key(), resolved)
+            entry = cache.get(key)
+            if entry is not None:
+                response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+                response = _finish(response, entry['etag'], entry['last_modified'])
+                if response.status_code == 304:
+                    cache.not_modified += 1
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed or session.modified:
+                return response
+            body = response.get_data(as_text=True)
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.blake2b(body.encode(), digest_size=16).hexdigest(),
+                'last_modified': int(cache.clock()),
+            }
+            cache.set(key, entry)
+            return _finish(response, entry['etag'], entry['last_modified'])
+        return wrapper
+    return decorator
+
+
+def tags_for(obj):
+    """Cache tags a changed ORM object invalidates."""
+    if isinstance(obj, Movie):
+        return ('movies', f'movie:{obj.id}')
+    if isinstance(obj, (Review, MovieStats, RatingBucket)):
+        return ('ratings', f'movie:{obj.movie_id}')
+    if isinstance(obj, User):
+        return ('users',)
+    if isinstance(obj, Genre):
+        return ('movies',)
+    return ()
+
+
+def _current_cache():
+    return getattr(current_app, 'response_cache', None) if has_app_context() else None
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_cache_tags(session, flush_context):
+    """Remember which tags this transaction's writes touch."""
+    pending = session.info.setdefault('cache_tags', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        pending.update(tags_for(obj))
+
+
+@event.listens_for(db.session, 'after_commit')
+def bump_cache_tags(session):
+    """Invalidate once the writes are visible to other requests."""
+    tags = session.info.pop('cache_tags', set())
+    tags.update(f'movie:{movie_id}' for movie_id in session.info.pop('touched_movies', ()))
+    cache = _current_cache()
+    if tags and cache is not None:
+        cache.invalidate(*tags)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_cache_tags(session):
+    session.info.pop('cache_tags', None)
+    session.info.pop('touched_movies', None)
@@ -1,16 +1,20 @@
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, abort, current_app
+    url_for, flash, abort, current_app, send_file
 )
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy import or_
+from werkzeug.local import LocalProxy
 
-from . import db, data_manager
-from .data_manager.models import User, Movie
+from .importer import ImportFormatError
 from .omdb_api import fetch_movie_data
+from .posters import PosterError, is_remote_poster
+from .response_cache import cached_page
 
 main = Blueprint('main', __name__)
 
+# All storage access goes through the app's DataManagerInterface backend
+data_manager = LocalProxy(lambda: current_app.data_manager)
+
 @main.errorhandler(404)
 def page_not_found(error):
     """
@@ -24,29 +28,62 @@ def internal_error(error):
     Handle internal server errors by rolling back the session
     and rendering a 500 page.
     """
-    db.session.rollback()
+    data_manager.rollback()
     return render_template('500.html'), 500
 
+def _page_args(prefix=''):
+    """
+    Read keyset-pagination query args (`page_size`, `after`, `before`),
+    optionally namespaced with `prefix` when a page shows several lists.
+    """
+    default = current_app.config['PAGE_SIZE']
+    size = request.args.get(f'{prefix}page_size', default, type=int)
+    return {
+        'page_size': min(max(size, 1), current_app.config['MAX_PAGE_SIZE']),
+        'after': request.args.get(f'{prefix}after') or None,
+        'before': request.args.get(f'{prefix}before') or None,
+    }
+
+@main.app_template_global()
+def page_url(**params):
+    """
+    URL of the current view with some query args replaced; None drops an arg.
+    """
+    args = request.args.to_dict()
+    args.update(params)
+    args = {k: v for k, v in args.items() if v is not None}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+@main.app_template_global()
+def poster_url(movie, size='thumb'):
+    """
+    Image URL for a movie's poster: the stored copy when we have one, the
+    lazy-download route otherwise, or the original when posters aren't cached.
+    """
+    store = current_app.poster_store
+    if store is None or not is_remote_poster(movie.poster) or size not in store.sizes:
+        return movie.poster
+    found = store.lookup(movie.poster)
+    if found is None:
+        return url_for('main.movie_poster', movie_id=movie.id, size=size)
+    digest, ext = found
+    return url_for('main.poster_file', digest=digest, size=size, ext=ext)
+
 @main.route('/')
+@cached_page('movies', 'ratings')
 def index():
     """
     Home page: list all movies, with optional search and genre filter.
     """
     q = request.args.get('q', '').strip()
     sel_genre = request.args.get('genre', '').strip()
-
-    # Build base query
-    query = Movie.query
-    if q:
-        pattern = f"%{q}%"
-        query = query.filter(
-            or_(Movie.title.ilike(pattern), Movie.director.ilike(pattern))
-        )
-    if sel_genre:
-        query = query.filter(Movie.genre.ilike(f"%{sel_genre}%"))
+    sort = request.args.get('sort', 'title')
 
     try:
-        movies = query.all()
+        if q:
+            movies = data_manager.search_movies(q, genre=sel_genre, **_page_args())
+        else:
+            movies = data_manager.get_movies(genre=sel_genre, sort=sort, **_page_args())
     except SQLAlchemyError:
         current_app.logger.exception("DB error on index")
         abort(500)
@@ -63,15 +100,17 @@ def index():
         else:
             flash("No movies yet—why not seed the catalog?", "info")
 
-    # Build genre list for dropdown
-    raw_genres = Movie.query.with_entities(Movie.genre).filter(Movie.genre.isnot(None)).all()
-    genre_set = {g.strip() for (row,) in raw_genres for g in (row or '').split(',') if g.strip()}
-    genres = sorted(genre_set)
+    # Genre list for dropdown (shared by every catalog page)
+    cache = current_app.response_cache
+    if cache is not None:
+        genres = cache.fragment('genres', ['movies'], data_manager.get_genres)
+    else:
+        genres = data_manager.get_genres()
 
     return render_template(
         'index.html', movies=movies,
         query=q, selected_genre=sel_genre,
-        genres=genres
+        genres=genres, sort=sort
     )
 
 @main.route('/add_user', methods=['GET', 'POST'])
@@ -86,17 +125,13 @@ def add_user():
         elif len(name) < 3:
             flash("Name too short.", "warning")
         else:
-            user = User(name=name)
-            db.session.add(user)
             try:
-                db.session.commit()
+                user = data_manager.add_user(name)
                 flash(f"User “{user.name}” created.", "success")
                 return redirect(url_for('main.list_users'))
             except IntegrityError:
-                db.session.rollback()
                 flash(f"A user named '{name}' already exists.", "error")
             except SQLAlchemyError:
-                db.session.rollback()
                 current_app.logger.exception("DB error creating user")
                 abort(500)
     return render_template('add_user.html')
@@ -106,13 +141,11 @@ def delete_user(user_id):
     """
     Remove a user (and all their movie‐list associations & reviews) from the system.
     """
-    user = User.query.get_or_404(user_id)
+    data_manager.get_user(user_id) or abort(404)
     try:
-        db.session.delete(user)
-        db.session.commit()
-        flash(f"Deleted user “{user.name}”.", "success")
+        name = data_manager.delete_user(user_id)
+        flash(f"Deleted user “{name}”.", "success")
     except SQLAlchemyError:
-        db.session.rollback()
         current_app.logger.exception("DB error deleting user")
         flash("Could not delete user. Try again.", "error")
     return redirect(url_for('main.list_users'))
@@ -123,7 +156,7 @@ def list_users():
     List all users.
     """
     try:
-        users = User.query.all() or []
+        users = data_manager.get_users(**_page_args())
     except SQLAlchemyError:
         current_app.logger.exception("DB error listing users")
         abort(500)
@@ -136,20 +169,22 @@ def user_movies(user_id):
     """
     Display a user's movie list with optional catalog search.
     """
-    user = User.query.get_or_404(user_id)
+    user = data_manager.get_user(user_id) or abort(404)
     q = request.args.get('q', '').strip()
-    new_results, owned_results = [], []
+    movies = data_manager.get_user_movies_page(user_id, **_page_args())
+    results, new_results, owned_results = None, [], []
     if q:
-        catalog = Movie.query.filter(
-            or_(Movie.title.ilike(f'%{q}%'), Movie.director.ilike(f'%{q}%'))
-        ).all()
-        owned_ids = {m.id for m in user.movies}
-        for m in catalog:
+        results = data_manager.search_movies(q, **_page_args('results_'))
+        owned_ids = data_manager.get_listed_movie_ids(user_id, (m.id for m in results))
+        for m in results:
             (owned_results if m.id in owned_ids else new_results).append(m)
+    pending = current_app.job_queue.pending_for_user(user_id)
+    recommended = data_manager.get_recommendations(user_id)
     return render_template(
-        'user_movies.html', user=user,
-        movies=user.movies, query=q,
-        new_results=new_results, owned_results=owned_results
+        'user_movies.html', user=user, pending=pending,
+        movies=movies, query=q, results=results,
+        new_results=new_results, owned_results=owned_results,
+        recommended=recommended
     )
 
 @main.route('/users/<int:user_id>/add_existing/<int:movie_id>', methods=['POST'])
@@ -157,25 +192,21 @@ def add_existing_movie(user_id, movie_id):
     """
     Add an existing movie from catalog to user's list.
     """
-    user = User.query.get_or_404(user_id)
-    movie = Movie.query.get_or_404(movie_id)
+    data_manager.get_user(user_id) or abort(404)
+    movie = data_manager.get_movie(movie_id) or abort(404)
+    title = movie.title
     q = request.form.get('q', '').strip()
-    if movie in user.movies:
-        flash(f"“{movie.title}” is already in your list.", "warning")
-    else:
-        user.movies.append(movie)
-        try:
-            db.session.commit()
-            flash(f"Added “{movie.title}” to your list!", "success")
-        except SQLAlchemyError:
-            db.session.rollback()
-            current_app.logger.exception("DB error attaching movie")
-            flash("Could not add movie. Try again.", "error")
+    try:
+        if data_manager.add_to_list(user_id, movie_id):
+            flash(f"Added “{title}” to your list!", "success")
+        else:
+            flash(f"“{title}” is already in your list.", "warning")
+    except SQLAlchemyError:
+        current_app.logger.exception("DB error attaching movie")
+        flash("Could not add movie. Try again.", "error")
     # Redirect preserving search if matches remain
     if q:
-        remaining = [m for m in Movie.query.filter(
-            or_(Movie.title.ilike(f'%{q}%'), Movie.director.ilike(f'%{q}%'))
-        ).all() if m.id not in {mv.id for mv in user.movies}]
+        remaining = data_manager.search_movies(q, exclude_user_id=user_id, page_size=1)
         if remaining:
             return redirect(url_for('main.user_movies', user_id=user_id, q=q))
     return redirect(url_for('main.user_movies', user_id=user_id))
@@ -185,52 +216,147 @@ def add_movie(user_id):
     """
     Fetch via OMDb and add new movie to global catalog and user's list.
     """
+    data_manager.get_user(user_id) or abort(404)
     if request.method == 'POST':
         title = request.form.get('name', '').strip()
         if not title:
             flash("Enter a movie title.", "warning")
         else:
+            # The lookup runs on the job queue; fast answers still complete
+            # within this request, slow ones leave a placeholder to poll
+            queue = current_app.job_queue
             try:
-                data = fetch_movie_data(title)
-            except Exception:
-                current_app.logger.exception("OMDb error")
-                flash("OMDb unreachable.", "error")
+                job_id = queue.submit(title, user_id=user_id, fetch=fetch_movie_data)
+            except SQLAlchemyError:
+                current_app.logger.exception("DB error queueing movie lookup")
+                flash("Error saving movie.", "error")
                 return render_template('add_movie.html', user_id=user_id)
-            if not data:
+            queue.wait(job_id, current_app.config['ENRICH_INLINE_WAIT'])
+            job = queue.get(job_id)
+            if job.status == 'done':
+                flash(f"“{data_manager.get_movie(job.movie_id).title}” added.", "success")
+                return redirect(url_for('main.user_movies', user_id=user_id))
+            if job.status == 'not_found':
                 flash("Movie not found.", "warning")
+            elif job.status == 'failed':
+                current_app.logger.error("OMDb lookup failed: %s", job.last_error)
+                flash("OMDb unreachable.", "error")
             else:
-                movie = Movie(**data)
-                db.session.add(movie)
-                try:
-                    db.session.commit()
-                    flash(f"“{movie.title}” added.", "success")
-                    return redirect(url_for('main.user_movies', user_id=user_id))
-                except SQLAlchemyError:
-                    db.session.rollback()
-                    current_app.logger.exception("DB error adding movie")
-                    flash("Error saving movie.", "error")
+                if job.last_error:
+                    flash("OMDb unreachable. We'll keep trying in the background.", "warning")
+                else:
+                    flash(f"Looking up “{title}” on OMDb…", "info")
+                return redirect(url_for('main.user_movies', user_id=user_id))
     return render_template('add_movie.html', user_id=user_id)
 
+@main.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """
+    JSON status of an enrichment job, polled by pending placeholders.
+    """
+    job = current_app.job_queue.get(job_id) or abort(404)
+    return {
+        'id': job.id,
+        'title': job.title,
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.last_error,
+        'movie_url': url_for('main.movie_detail', movie_id=job.movie_id) if job.movie_id else None,
+    }
+
+@main.route('/users/<int:user_id>/import', methods=['GET', 'POST'])
+def import_list(user_id):
+    """
+    Upload a Letterboxd or IMDb CSV export to add its movies to the list.
+    """
+    user = data_manager.get_user(user_id) or abort(404)
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            flash("Choose a CSV file to import.", "warning")
+        else:
+            try:
+                import_id = current_app.list_importer.start(user_id, upload.stream, upload.filename)
+            except ImportFormatError as exc:
+                flash(str(exc), "error")
+            except SQLAlchemyError:
+                current_app.logger.exception("DB error starting import")
+                flash("Could not start the import. Try again.", "error")
+            else:
+                return redirect(url_for('main.import_progress', import_id=import_id))
+    return render_template('import_list.html', user=user)
+
+@main.route('/imports/<int:import_id>')
+def import_progress(import_id):
+    """
+    Progress page of a CSV import; polls import_status until it finishes.
+    """
+    imp = current_app.list_importer.get(import_id) or abort(404)
+    return render_template('import_progress.html', imp=imp, status=_import_status(imp))
+
+@main.route('/imports/<int:import_id>/status')
+def import_status(import_id):
+    """
+    JSON progress of a CSV import.
+    """
+    return _import_status(current_app.list_importer.get(import_id) or abort(404))
+
+def _import_status(imp):
+    return {
+        'id': imp.id,
+        'filename': imp.filename,
+        'status': imp.status,
+        'finished': imp.finished,
+        'rows': imp.rows,
+        'matched': imp.matched,
+        'added': imp.added,
+        'queued': imp.queued,
+        'skipped': imp.skipped,
+        'error': imp.error,
+    }
+
+@main.route('/api/autocomplete')
+def autocomplete():
+    """
+    JSON suggestions (movies, directors, users) for a half-typed query.
+    """
+    q = request.args.get('q', '').strip()
+    index = current_app.autocomplete or abort(404)
+    default = current_app.config['AUTOCOMPLETE_LIMIT']
+    limit = min(max(request.args.get('limit', default, type=int), 1), 50)
+    kinds = set(filter(None, request.args.get('types', '').split(','))) or None
+    urls = {
+        'movie': lambda s: url_for('main.movie_detail', movie_id=s.id),
+        'user': lambda s: url_for('main.user_movies', user_id=s.id),
+        'director': lambda s: url_for('main.index', q=s.label),
+    }
+    return {
+        'query': q,
+        'suggestions': [
+            {'type': s.kind, 'id': s.id if s.kind != 'director' else None,
+             'label': s.label, 'value': s.value, 'url': urls[s.kind](s)}
+            for s in index.suggest(q, limit=limit, kinds=kinds)
+        ],
+    }
+
 @main.route('/users/<int:user_id>/remove_movie/<int:movie_id>', methods=['POST'])
 def remove_movie(user_id, movie_id):
     """
     Remove the association between user and movie.
     """
-    user = User.query.get_or_404(user_id)
-    movie = Movie.query.get_or_404(movie_id)
-    if movie not in user.movies:
-        abort(404)
+    data_manager.get_user(user_id) or abort(404)
+    title = (data_manager.get_movie(movie_id) or abort(404)).title
     try:
-        user.movies.remove(movie)
-        db.session.commit()
-        flash(f"Removed '{movie.title}' from your list.", "success")
+        if not data_manager.remove_from_list(user_id, movie_id):
+            abort(404)
+        flash(f"Removed '{title}' from your list.", "success")
     except SQLAlchemyError:
-        db.session.rollback()
         current_app.logger.exception("DB error removing movie from user")
         flash("Could not remove movie. Try again.", "error")
     return redirect(url_for('main.user_movies', user_id=user_id))
 
 @main.route('/search')
+@cached_page('movies', 'users')
 def search():
     """
     Global search for users and movies by name or title/director.
@@ -239,22 +365,20 @@ def search():
     if not q:
         return render_template('search_results.html', query=q, users=[], movies=[])
     try:
-        users = User.query.filter(User.name.ilike(f"%{q}%")).all()
-        movies = Movie.query.filter(
-            or_(Movie.title.ilike(f"%{q}%"), Movie.director.ilike(f"%{q}%"))
-        ).all()
+        users = data_manager.search_users(q, limit=current_app.config['PAGE_SIZE'])
+        movies = data_manager.search_movies(q, **_page_args())
     except SQLAlchemyError:
         current_app.logger.exception("DB error during search")
         users = movies = []
     return render_template('search_results.html', query=q, users=users, movies=movies)
 
 @main.route('/movies/<int:movie_id>', methods=['GET', 'POST'])
+@cached_page(lambda movie_id: f'movie:{movie_id}')
 def movie_detail(movie_id):
     """
     Show details and reviews for a movie; allow posting a review.
     """
-    movie = Movie.query.get_or_404(movie_id)
-    reviews = data_manager.get_movie_reviews(movie_id)
+    movie = data_manager.get_movie(movie_id) or abort(404)
     if request.method == 'POST':
         text = request.form['review_text']
         rating = float(request.form['rating'])
@@ -265,4 +389,61 @@ def movie_detail(movie_id):
         except Exception:
             current_app.logger.exception("Failed to save review")
             flash("Could not save your review—please try again.", "error")
-    return render_template('movie_detail.html', movie=movie, reviews=reviews)
+    reviews = data_manager.get_movie_reviews_page(movie_id, **_page_args())
+    histogram = data_manager.get_rating_histogram(movie_id)
+    similar = data_manager.get_similar_movies(movie_id)
+    return render_template('movie_detail.html', movie=movie, reviews=reviews,
+                           histogram=histogram, similar=similar)
+
+@main.route('/reviews/<int:review_id>/delete', methods=['POST'])
+def delete_review(review_id):
+    """
+    Delete a review (the movie's rating aggregates follow).
+    """
+    try:
+        movie_id = data_manager.delete_review(review_id)
+    except SQLAlchemyError:
+        current_app.logger.exception("DB error deleting review")
+        abort(500)
+    if movie_id is None:
+        abort(404)
+    flash("Review deleted.", "success")
+    return redirect(url_for('main.movie_detail', movie_id=movie_id, _anchor='reviews'))
+
+@main.route('/movies/<int:movie_id>/poster/<size>')
+def movie_poster(movie_id, size):
+    """
+    Download a movie's poster on first request, then redirect to the stored
+    copy. Falls back to the original URL if the download fails.
+    """
+    store = current_app.poster_store
+    movie = data_manager.get_movie(movie_id) or abort(404)
+    if store is None or size not in store.sizes or not is_remote_poster(movie.poster):
+        abort(404)
+    if store.recently_failed(movie.poster):
+        return redirect(movie.poster)
+    try:
+        digest, ext = store.ensure(movie.poster)
+    except PosterError as exc:
+        current_app.logger.warning("Poster download failed: %s", exc)
+        return redirect(movie.poster)
+    # not 301: the movie's poster URL (and so the stored file) can change
+    return redirect(url_for('main.poster_file', digest=digest, size=size, ext=ext))
+
+@main.route('/posters/<digest>/<size>.<ext>')
+def poster_file(digest, size, ext):
+    """
+    Serve a stored poster variant. Paths are content-addressed, so the
+    response can be cached forever.
+    """
+    store = current_app.poster_store
+    path = store.variant_path(digest, size, ext) if store is not None else None
+    if path is None:
+        abort(404)
+    try:
+        response = send_file(path, max_age=365 * 24 * 3600, conditional=True)
+    except FileNotFoundError:
+        abort(404)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
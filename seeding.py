@@ -0,0 +1,237 @@
+"""
+seeding.py
+
+Bulk import pipeline behind the `seed-movies` CLI command.
+
+Titles are streamed from a newline-separated file, checked against the
+catalog (pre-loaded in one query), looked up on OMDb through a bounded,
+rate-limited thread pool (retries and timeouts are the OMDbClient's job),
+and inserted in batched transactions. After each
+committed batch a checkpoint records how far into the file we got, so an
+interrupted import resumes where it stopped instead of starting over.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .data_manager.models import Movie
+from .omdb_api import CircuitOpen
+from .omdb_cache import normalize_title
+
+_MISS = object()
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` calls per second (bursts up to
+    `burst`). A rate of 0 or None disables limiting.
+    """
+
+    def __init__(self, rate: float | None, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Remembers the number of input lines fully committed to the database."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> int:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return int(json.load(fh).get("line", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def save(self, line: int):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"line": line, "saved_at": time.time()}, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+@dataclass
+class SeedStats:
+    total: int = 0
+    processed: int = 0
+    added: int = 0
+    skipped: int = 0
+    not_found: int = 0
+    failed: list = field(default_factory=list)
+    aborted: str | None = None
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.processed}/{self.total} titles, {self.added} added, "
+                f"{self.skipped} skipped, {self.not_found} not found, "
+                f"{len(self.failed)} failed ({self.rate:.1f} titles/s)")
+
+
+def _ordered_map(executor, func, items, window):
+    """Like executor.map, but keeps at most `window` calls in flight."""
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(func, item[1])))
+        if len(pending) >= window:
+            item, future = pending.popleft()
+            yield item, future
+    while pending:
+        yield pending.popleft()
+
+
+def seed_movies(titles_file: str, session, fetch, cache=None, workers: int = 8,
+                rate: float | None = 10, batch_size: int = 200,
+                resume: bool = True, echo=print, progress_every: int = 500) -> SeedStats:
+    """
+    Import every title in `titles_file` that is not yet in the catalog.
+
+    Args:
+        titles_file: newline-separated movie titles.
+        session: SQLAlchemy session to write Movies with.
+        fetch: callable(title) -> dict | None, e.g. omdb_api.fetch_movie_data;
+            it should retry transient errors itself. CircuitOpen stops the run.
+        cache: optional OMDbCache; cached titles bypass the rate limiter.
+        workers: size of the lookup thread pool.
+        rate: max OMDb requests per second (None/0 for no limit).
+        batch_size: movies inserted per transaction.
+        resume: continue from the last checkpoint if one exists.
+        echo: callable used for log lines.
+        progress_every: emit a progress line every N titles.
+
+    Returns:
+        SeedStats: counters for the run.
+    """
+    checkpoint = Checkpoint(f"{titles_file}.checkpoint")
+    start_line = checkpoint.load() if resume else 0
+    if start_line:
+        echo(f"Resuming after line {start_line}")
+
+    with open(titles_file, encoding="utf-8") as fh:
+        stats = SeedStats(total=sum(1 for _ in fh) - start_line)
+
+    # One query for everything we already have
+    known_titles, known_pairs = set(), set()
+    for title, year in session.query(Movie.title, Movie.year):
+        known_titles.add(normalize_title(title))
+        known_pairs.add((normalize_title(title), year))
+
+    limiter = RateLimiter(rate, burst=workers)
+
+    def lookup(title):
+        if cache is not None:
+            cached = cache.get(title, default=_MISS)
+            if cached is not _MISS:
+                return cached
+        limiter.acquire()
+        return fetch(title)
+
+    def wanted_lines():
+        seen = set()
+        with open(titles_file, encoding="utf-8") as fh:
+            for lineno, line in enumerate(fh, start=1):
+                if lineno <= start_line:
+                    continue
+                title = line.strip()
+                key = normalize_title(title)
+                if not title or key in known_titles or key in seen:
+                    yield lineno, None
+                    continue
+                seen.add(key)
+                yield lineno, title
+
+    batch, last_line = [], start_line
+
+    def flush():
+        if batch:
+            session.add_all(batch)
+            session.commit()
+            batch.clear()
+        checkpoint.save(last_line)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omdb-seed") as pool:
+        def fetch_line(title):
+            return None if title is None else lookup(title)
+
+        for (lineno, title), future in _ordered_map(pool, fetch_line, wanted_lines(), workers * 4):
+            last_line = lineno
+            stats.processed += 1
+            if title is None:
+                stats.skipped += 1
+            else:
+                try:
+                    data = future.result()
+                except CircuitOpen as exc:
+                    # OMDb is down: keep what we have and stop before this line
+                    last_line = lineno - 1
+                    stats.processed -= 1
+                    stats.aborted = str(exc)
+                    echo(f"Stopping: {exc}")
+                    break
+                except Exception as exc:
+                    stats.failed.append(title)
+                    echo(f"Failed: {title} ({exc})")
+                    data = _MISS
+                if data is None:
+                    stats.not_found += 1
+                    echo(f"Not found in OMDb: {title}")
+                elif data is not _MISS:
+                    pair = (normalize_title(data["title"]), data.get("year"))
+                    if pair in known_pairs:
+                        stats.skipped += 1
+                    else:
+                        known_pairs.add(pair)
+                        batch.append(Movie(
+                            title    = data["title"],
+                            director = data.get("director"),
+                            year     = data.get("year"),
+                            rating   = data.get("rating"),
+                            poster   = data.get("poster"),
+                            genre    = data.get("genre", ""),
+                            plot     = data.get("plot", ""),
+                        ))
+                        stats.added += 1
+            if len(batch) >= batch_size:
+                flush()
+            if stats.processed % progress_every == 0:
+                flush()
+                echo(f"Progress: {stats.summary()}")
+
+    flush()
+    if not stats.aborted:
+        checkpoint.clear()
+    return stats
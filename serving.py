@@ -0,0 +1,86 @@
+"""
+serving.py
+
+Process setup for running under a pre-forking WSGI server (gunicorn with
+`preload_app`, see gunicorn.conf.py and wsgi.py).
+
+The master process creates the app once and calls warm(): every template
+is compiled and the autocomplete index is built there, so the forked
+workers inherit them (copy-on-write) instead of each paying on its first
+requests. It then closes every database and HTTP connection, so no socket
+or SQLite handle is shared across the fork. after_fork() runs in each
+worker and resets whatever might still point at the parent's resources.
+
+State kept in process memory is per worker. check_workers() turns the page
+cache off when several workers would each keep their own copy, since tag
+invalidations only reach the worker that made the write; share it through
+Redis (RESPONSE_CACHE_URL) instead. /metrics, likewise, reports the worker
+that answers the scrape.
+"""
+
+import logging
+import os
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates(app) -> int:
+    """Load (compile and cache) every HTML template; how many."""
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith('.html')]
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def warm(app) -> dict:
+    """
+    Do the per-process startup work once, before the workers fork.
+    Returns what was warmed, for the startup log.
+    """
+    warmed = {'templates': compile_templates(app)}
+    if app.autocomplete is not None:
+        warmed['suggestions'] = app.autocomplete.warm()
+    release_connections(app)
+    logger.info('Warmed %s in pid %s', warmed, os.getpid())
+    return warmed
+
+
+def check_workers(app, workers) -> bool:
+    """
+    Before forking `workers` processes: drop an in-process page cache that
+    the workers couldn't keep consistent. Whether page caching stays on.
+    """
+    if app.response_cache is None:
+        return False
+    if workers > 1 and not app.config['RESPONSE_CACHE_URL']:
+        logger.warning('Page cache disabled: %d workers would each keep a private copy '
+                       'and serve stale pages; set RESPONSE_CACHE_URL to share one in Redis',
+                       workers)
+        app.response_cache = None
+        return False
+    return True
+
+
+def release_connections(app):
+    """Close the process's database, OMDb cache and OMDb HTTP connections."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    if app.omdb_cache is not None:
+        app.omdb_cache.close()
+    app.omdb_client.close()
+
+
+def after_fork(app):
+    """
+    In a new worker: drop pooled connections inherited from the master
+    without closing them (close=False leaves the parent's sockets alone).
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if app.omdb_cache is not None:
+        app.omdb_cache.after_fork()
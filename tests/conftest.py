@@ -1,21 +1,53 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytest
 from pathlib import Path
 from Movie_Web_App import create_app, db
 
-@pytest.fixture
-def app(tmp_path):
-    test_db = tmp_path / "test.db"
+def _postgres_uri(request):
+    """
+    Database URI for the PostgreSQL run: TEST_POSTGRES_URL if set (e.g. a
+    local container), else a throwaway database from pytest-postgresql.
+    """
+    pytest.importorskip("psycopg")
+    if os.environ.get("TEST_POSTGRES_URL"):
+        return os.environ["TEST_POSTGRES_URL"]
+    try:
+        conn = request.getfixturevalue("postgresql")
+    except pytest.FixtureLookupError:
+        pytest.skip("PostgreSQL not configured (set TEST_POSTGRES_URL or install pytest-postgresql)")
+    info = conn.info
+    return (f"postgresql+psycopg://{info.user}:{info.password or ''}"
+            f"@{info.host}:{info.port}/{info.dbname}")
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def app(request, tmp_path):
+    if request.param == "postgresql":
+        database_uri = _postgres_uri(request)
+    else:
+        database_uri = f"sqlite:///{tmp_path / 'test.db'}"
     test_config = {
         "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{test_db}",
+        "SQLALCHEMY_DATABASE_URI": database_uri,
         "WTF_CSRF_ENABLED": False,
         "SECRET_KEY": "test-secret",
+        "POSTER_CACHE_DIR": str(tmp_path / "posters"),
+        "IMPORT_DIR": str(tmp_path / "imports"),
+        "OMDB_CACHE_PATH": str(tmp_path / "omdb_cache.sqlite"),
+        "ENRICH_INLINE_WAIT": 5.0,
     }
     app = create_app(test_config)
 
     with app.app_context():
         db.create_all()
     yield app
+    app.job_queue.shutdown()
     with app.app_context():
         db.drop_all()
 
@@ -26,3 +58,74 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+
+class OMDbStub:
+    """
+    Local stand-in for OMDb. `movies` maps lower-cased titles to raw OMDb
+    payloads; `status` and `delay` inject failures and latency. `files`
+    maps other paths (e.g. poster images) to (content type, bytes).
+    `max_in_flight` is the most lookups it was answering at once.
+    """
+
+    def __init__(self):
+        self.movies = {}
+        self.files = {}
+        self.calls = []
+        self.status = 200
+        self.delay = 0.0
+        self.connections = set()
+        self.url = None
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def omdb_stub(monkeypatch):
+    import Movie_Web_App.omdb_api as api
+    stub = OMDbStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path in stub.files:
+                stub.calls.append(path)
+                content_type, payload = stub.files[path]
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            title = parse_qs(urlparse(self.path).query).get("t", [""])[0]
+            stub.calls.append(title)
+            stub.connections.add(self.client_address)
+            with stub.lock:
+                stub.in_flight += 1
+                stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+            if stub.delay:
+                time.sleep(stub.delay)
+            with stub.lock:
+                stub.in_flight -= 1
+            body = stub.movies.get(title.lower(), {"Response": "False", "Error": "Movie not found!"})
+            payload = json.dumps(body).encode()
+            self.send_response(stub.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_port}/"
+    monkeypatch.setattr(api, "URL", stub.url)
+    yield stub
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,149 @@
+import gzip
+
+import pytest
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie, Review, User
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        alice = User(name="Alice")
+        movies = [Movie(title=f"Alien {i}", year=1979 + i, director="Ridley Scott",
+                        genre="Horror, Sci-Fi", plot="In space no one can hear you scream. " * 5)
+                  for i in range(30)]
+        alice.movies.extend(movies[:3])
+        db.session.add_all([alice, *movies])
+        db.session.flush()
+        db.session.add(Review(movie_id=movies[0].id, review_text="Scary", rating=8.0))
+        db.session.commit()
+        return {"user": alice.id, "movies": [m.id for m in movies]}
+
+
+def test_fields_select_columns_and_keep_id(client, catalog):
+    movie_id = catalog["movies"][0]
+    body = client.get(f"/api/v1/movies/{movie_id}?fields=title,avg_rating").get_json()
+    assert body == {"id": movie_id, "title": "Alien 0", "avg_rating": 8.0}
+    body = client.get(f"/api/v1/movies/{movie_id}?fields=histogram").get_json()
+    assert body["histogram"][8] == 1
+
+    resp = client.get("/api/v1/movies?fields=title,nope")
+    assert resp.status_code == 400
+    assert "nope" in resp.get_json()["error"]
+    missing = client.get("/api/v1/movies/999999")
+    assert missing.status_code == 404 and missing.is_json
+    assert client.get("/api/v1/users/999999").is_json
+
+
+def test_movies_paginate_with_cursors(client, catalog):
+    first = client.get("/api/v1/movies?page_size=20&fields=title").get_json()
+    assert first["total"] == 30 and len(first["items"]) == 20 and first["prev"] is None
+    second = client.get(f"/api/v1/movies?page_size=20&fields=title&after={first['next']}").get_json()
+    assert len(second["items"]) == 10 and second["next"] is None
+    seen = [m["id"] for m in first["items"] + second["items"]]
+    assert sorted(seen) == sorted(catalog["movies"])
+
+
+def test_etag_revalidates_and_changes_with_the_data(client, catalog):
+    resp = client.get("/api/v1/movies?fields=review_count")
+    etag = resp.headers["ETag"]
+    assert resp.headers["Cache-Control"] == "no-cache"
+    not_modified = client.get("/api/v1/movies?fields=review_count", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.data == b""
+
+    client.post(f"/api/v1/movies/{catalog['movies'][0]}/reviews", json={"text": "Meh", "rating": 4})
+    changed = client.get("/api/v1/movies?fields=review_count", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_large_bodies_are_compressed(client, catalog):
+    plain = client.get("/api/v1/movies")
+    assert "Content-Encoding" not in plain.headers
+
+    resp = client.get("/api/v1/movies", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] in ("gzip", "br")
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert resp.headers["ETag"] != plain.headers["ETag"]
+    if resp.headers["Content-Encoding"] == "gzip":
+        assert gzip.decompress(resp.data) == plain.data
+    assert len(resp.data) < len(plain.data)
+
+    small = client.get("/api/v1/users", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_reviews_can_be_posted_and_listed(client, catalog):
+    movie_id = catalog["movies"][1]
+    resp = client.post(f"/api/v1/movies/{movie_id}/reviews", json={"text": " Great ", "rating": 9})
+    assert resp.status_code == 201
+    assert resp.get_json()["text"] == "Great"
+    assert client.post(f"/api/v1/movies/{movie_id}/reviews", json={"text": "x", "rating": 11}).status_code == 400
+    assert client.post(f"/api/v1/movies/{movie_id}/reviews", data="nope").status_code == 400
+
+    reviews = client.get(f"/api/v1/movies/{movie_id}/reviews?fields=rating").get_json()
+    assert [r["rating"] for r in reviews["items"]] == [9.0]
+
+
+def test_list_entries_are_added_and_removed(client, catalog):
+    user_id, movie_id = catalog["user"], catalog["movies"][10]
+    url = f"/api/v1/users/{user_id}/movies/{movie_id}"
+    assert client.put(url).status_code == 201
+    assert client.put(url).status_code == 200
+    listed = client.get(f"/api/v1/users/{user_id}/movies?fields=title").get_json()
+    assert listed["total"] == 4 and listed["items"][0]["id"] == movie_id
+
+    assert client.delete(url).status_code == 204
+    gone = client.delete(url)
+    assert gone.status_code == 404 and gone.is_json
+    missing = client.put(f"/api/v1/users/{user_id}/movies/999999")
+    assert missing.status_code == 404 and missing.is_json
+
+
+def test_unhandled_errors_are_json(app, client, catalog, monkeypatch):
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    monkeypatch.setattr(app.data_manager, "get_user", lambda user_id: 1 / 0)
+    resp = client.get(f"/api/v1/users/{catalog['user']}")
+    assert resp.status_code == 500 and resp.get_json() == {"error": "Internal server error"}
+
+
+def test_search_returns_movies_and_users(client, catalog):
+    body = client.get("/api/v1/search?q=alice&fields=title").get_json()
+    assert body["users"] == [{"id": catalog["user"], "name": "Alice"}]
+    body = client.get("/api/v1/search?q=alien&page_size=5&fields=title").get_json()
+    assert len(body["movies"]["items"]) == 5 and body["movies"]["total"] == 30
+
+
+def test_list_is_edited_in_one_batch(app, client, catalog):
+    from .test_query_counts import count_queries
+
+    user_id, ids = catalog["user"], catalog["movies"]
+    with count_queries(app) as statements:
+        resp = client.patch(f"/api/v1/users/{user_id}/movies", json={
+            "add": ids[3:20] + ["Alien 25", "Nope", ids[0]],
+            "remove": [ids[1], "Alien 2", ids[29]],
+        })
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body["added"], body["removed"]) == (18, 2)
+    statuses = {r["movie"]: r["status"] for r in body["results"]}
+    assert statuses["Alien 25"] == "added" and statuses["Nope"] == "no such movie"
+    assert statuses[ids[0]] == "already listed" and statuses[ids[29]] == "not listed"
+    # user, titles, list, known ids, delete, insert, pair counts (upsert, prune), recommendations
+    assert len(statements) <= 12, "\n".join(statements)
+
+    listed = client.get(f"/api/v1/users/{user_id}/movies?page_size=100&fields=title").get_json()
+    assert listed["total"] == 19
+    assert client.patch(f"/api/v1/users/{user_id}/movies", json={"add": [True]}).status_code == 400
+    assert client.patch(f"/api/v1/users/{user_id}/movies", json={"add": 5}).status_code == 400
+    for bad in (0, -1, 2 ** 70):
+        resp = client.patch(f"/api/v1/users/{user_id}/movies", json={"add": [bad]})
+        assert resp.status_code == 400 and resp.is_json
+
+
+def test_duplicate_batch_items_are_reported_once(client, catalog):
+    user_id, movie_id = catalog["user"], catalog["movies"][25]
+    body = client.patch(f"/api/v1/users/{user_id}/movies",
+                        json={"add": [movie_id, movie_id, "Alien 25"]}).get_json()
+    assert [r["status"] for r in body["results"]] == ["added", "duplicate", "duplicate"]
+    assert body["added"] == 1
@@ -0,0 +1,137 @@
+import pytest
+
+from Movie_Web_App import autocomplete
+from Movie_Web_App.autocomplete import AutocompleteIndex
+
+MOVIES = [
+    # id, title, year, director, weight
+    (1, "Alien", 1979, "Ridley Scott", 50),
+    (2, "Aliens", 1986, "James Cameron", 40),
+    (3, "Alien Nation", 1988, "Graham Baker", 1),
+    (4, "Blade Runner", 1982, "Ridley Scott", 30),
+    (5, "Amélie", 2001, "Jean-Pierre Jeunet", 20),
+]
+USERS = [(1, "Alice", 3), (2, "Bob", 1)]
+
+
+@pytest.fixture
+def index():
+    return AutocompleteIndex.build(MOVIES, USERS)
+
+
+def labels(suggestions):
+    return [s.label for s in suggestions]
+
+
+def test_prefix_matches_heaviest_first(index):
+    assert labels(index.search("ali")) == ["Alien (1979)", "Aliens (1986)", "Alice", "Alien Nation (1988)"]
+    assert labels(index.search("alien n")) == ["Alien Nation (1988)"]
+    assert labels(index.search("ali", limit=2)) == ["Alien (1979)", "Aliens (1986)"]
+    assert labels(index.search("ali", kinds={"user"})) == ["Alice"]
+
+
+def test_accents_case_and_years_are_folded(index):
+    assert labels(index.search("AMELIE")) == ["Amélie (2001)"]
+    # fuzzy matches ("alien") fill up the rest
+    assert labels(index.search("aliens 19"))[0] == "Aliens (1986)"
+
+
+def test_directors_are_suggested_once(index):
+    [ridley] = index.search("ridley")
+    assert (ridley.kind, ridley.label, ridley.weight) == ("director", "Ridley Scott", 2)
+
+
+def test_typos_fall_back_to_fuzzy_matches(index):
+    assert labels(index.search("alein")) == ["Alien (1979)", "Aliens (1986)", "Alien Nation (1988)"]
+    assert labels(index.search("bladr runner")) == ["Blade Runner (1982)"]
+    # exact matches rank before fuzzy ones
+    assert labels(index.search("aliens")) == ["Aliens (1986)", "Alien (1979)", "Alien Nation (1988)"]
+    assert index.search("xq") == [] and index.search("") == []
+
+
+def test_short_words_match_typos_sharing_no_trigram():
+    index = AutocompleteIndex.build([(1, "Heat", 1995, "Michael Mann", 5),
+                                     (2, "War", 2007, None, 1)], [])
+    assert labels(index.search("haet")) == ["Heat (1995)"]
+    assert labels(index.search("wor")) == ["War (2007)"]
+    assert labels(index.search("hwat 1995")) == ["Heat (1995)"]
+    assert index.search("hate") == []   # two edits
+    index.drop_movie(2)
+    assert index.search("wor") == []
+
+
+def test_edit_distance_is_bounded():
+    assert autocomplete.edit_distance("alien", "alein", 2) == 1
+    assert autocomplete.edit_distance("alien", "nelia", 2) == 3
+    assert autocomplete.edit_distance("alien", "aliens", 1) == 1
+    assert autocomplete.edit_distance("alien", "blade", 1) == 2
+
+
+def test_incremental_updates(index):
+    index.put_movie(6, "Prometheus", 2012, "Ridley Scott", weight=5)
+    assert labels(index.search("prom")) == ["Prometheus (2012)"]
+    assert index.search("ridley")[0].weight == 3
+    # re-titling keeps the weight and drops the old words
+    index.put_movie(6, "Alien: Covenant", 2017, "Ridley Scott")
+    assert index.search("prom") == []
+    assert index.search("covenant")[0].weight == 5
+    index.drop_movie(1)
+    index.drop_movie(4)
+    index.drop_movie(6)
+    assert index.search("ridley") == []
+    index.drop_user(1)
+    assert index.search("alice", kinds={"user"}) == []
+
+
+def test_index_follows_committed_writes(app):
+    with app.app_context():
+        dm = app.data_manager
+        alice = dm.add_user("Alice")
+        alien = dm.add_movie("Alien", director="Ridley Scott", year=1979)
+        dm.add_to_list(alice.id, alien.id)
+        assert app.autocomplete.warm() == 3
+        heat = dm.add_movie("Heat", year=1995)
+        dm.update_movie(alien.id, title="Prometheus")
+        dm.delete_user(alice.id)
+        assert labels(app.autocomplete.suggest("he")) == ["Heat (1995)"]
+        assert labels(app.autocomplete.suggest("prom")) == ["Prometheus (1979)"]
+        assert app.autocomplete.suggest("alien") == []
+        assert app.autocomplete.suggest("alice") == []
+        dm.delete_movie(heat.id)
+        assert app.autocomplete.suggest("heat") == []
+
+
+def test_stale_index_is_rebuilt_in_the_background(app):
+    now = [0.0]
+    ac = autocomplete.Autocomplete(app, max_age=60, clock=lambda: now[0])
+    with app.app_context():
+        assert ac.suggest("heat") == []
+        app.data_manager.add_movie("Heat", year=1995)   # committed, but `ac` isn't the app's index
+    assert ac.suggest("heat") == []
+    now[0] = 61
+    ac.suggest("heat")                                  # starts the rebuild
+    ac._rebuild_thread.join(5)
+    assert labels(ac.suggest("heat")) == ["Heat (1995)"]
+
+
+def test_autocomplete_route(app, client):
+    with app.app_context():
+        dm = app.data_manager
+        alien_id = dm.add_movie("Alien", director="Ridley Scott", year=1979).id
+        dm.add_user("Alice")
+    resp = client.get("/api/autocomplete?q=ali")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["query"] == "ali"
+    assert data["suggestions"][0] == {"type": "movie", "id": alien_id, "label": "Alien (1979)",
+                                      "value": "Alien", "url": f"/movies/{alien_id}"}
+    assert {s["type"] for s in data["suggestions"]} == {"movie", "user"}
+    data = client.get("/api/autocomplete?q=ridly&types=director").get_json()
+    assert data["suggestions"] == [{"type": "director", "id": None, "label": "Ridley Scott",
+                                    "value": "Ridley Scott", "url": "/?q=Ridley+Scott"}]
+    assert client.get("/api/autocomplete?q=").get_json()["suggestions"] == []
+
+
+def test_autocomplete_can_be_disabled(app, client):
+    app.autocomplete = None
+    assert client.get("/api/autocomplete?q=ali").status_code == 404
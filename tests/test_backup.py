@@ -0,0 +1,155 @@
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from Movie_Web_App import backup, db
+from Movie_Web_App.data_manager.models import (UNKNOWN_ADDED_AT, Genre, Movie, MovieStats, Review, User,
+                                               user_movies)
+
+
+@pytest.fixture
+def dataset(app):
+    with app.app_context():
+        dm = app.data_manager
+        alice, bob = dm.add_user("Alice"), dm.add_user("Bob")
+        alien = dm.add_movie("Alien", director="Ridley Scott", year=1979, genre="Horror, Sci-Fi",
+                             plot='In space, no one can hear you "scream"')
+        heat = dm.add_movie("Heat", year=1995, genre="Crime")
+        dm.add_movie("Untitled")   # all the optional columns NULL
+        dm.add_to_list(alice.id, alien.id)
+        dm.add_to_list(alice.id, heat.id)
+        dm.add_to_list(bob.id, alien.id)
+        dm.add_review(alien.id, "Scary,\nand great", 8.6)
+        dm.add_review(alien.id, "", 6.0)
+        return snapshot_rows()
+
+
+def snapshot_rows():
+    """Everything an export covers, plus the derived tables it rebuilds."""
+    return {
+        "users": db.session.execute(db.select(User.id, User.name).order_by(User.id)).all(),
+        "movies": db.session.execute(db.select(*Movie.__table__.c).order_by(Movie.id)).all(),
+        "lists": db.session.execute(db.select(user_movies).order_by(*user_movies.primary_key)).all(),
+        "reviews": db.session.execute(db.select(*Review.__table__.c).order_by(Review.review_id)).all(),
+        "stats": db.session.execute(db.select(MovieStats.movie_id, MovieStats.review_count,
+                                              MovieStats.avg_rating).order_by(MovieStats.movie_id)).all(),
+        "genres": sorted(db.session.scalars(db.select(Genre.name))),
+    }
+
+
+def wipe():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+
+@pytest.mark.parametrize("fmt,compression", [
+    ("ndjson", None), ("ndjson", "gzip"), ("csv", None), ("csv", "gzip"),
+])
+def test_export_then_import_round_trips(app, dataset, tmp_path, fmt, compression):
+    target = str(tmp_path / ("dump.ndjson" if fmt == "ndjson" else "dump"))
+    with app.app_context():
+        counts = backup.export_dataset(db.session, target, fmt=fmt, compression=compression, batch_size=2)
+        assert counts == {"users": 2, "movies": 3, "user_movies": 3, "reviews": 2}
+        wipe()
+        assert backup.import_dataset(db.session, target, batch_size=2) == counts
+        assert snapshot_rows() == dataset
+        assert app.data_manager.repair_review_stats() == {"movie_stats": 0, "histogram": 0}
+        # ids keep counting after the imported ones
+        assert app.data_manager.add_user("Carol").id == 3
+        assert app.data_manager.search_movies("scream").total == 1
+
+
+def test_ndjson_export_is_one_record_per_line(app, dataset, tmp_path):
+    target = tmp_path / "dump.ndjson.gz"
+    with app.app_context():
+        backup.export_dataset(db.session, str(target), compression="gzip")
+    lines = gzip.decompress(target.read_bytes()).decode().splitlines()
+    header = json.loads(lines[0])
+    assert header["format"] == backup.FORMAT_NAME and header["tables"] == list(backup.TABLES)
+    records = [json.loads(line) for line in lines[1:]]
+    assert [r["table"] for r in records[:2]] == ["users", "users"]
+    assert {r["row"]["title"] for r in records if r["table"] == "movies"} == {"Alien", "Heat", "Untitled"}
+    assert all(r["row"]["added_at"] for r in records if r["table"] == "user_movies")
+
+
+def test_import_refuses_a_database_with_data(app, dataset, tmp_path):
+    target = str(tmp_path / "dump.ndjson")
+    with app.app_context():
+        backup.export_dataset(db.session, target)
+        with pytest.raises(backup.BackupError, match="not empty"):
+            backup.import_dataset(db.session, target)
+
+
+def test_malformed_import_rolls_back(app, tmp_path):
+    target = tmp_path / "dump.ndjson"
+    target.write_text(
+        json.dumps({"format": backup.FORMAT_NAME, "version": 1}) + "\n"
+        + json.dumps({"table": "users", "row": {"id": 1, "name": "Alice"}}) + "\n"
+        + json.dumps({"table": "users", "row": {"id": 2, "nickname": "B"}}) + "\n"
+    )
+    with app.app_context():
+        with pytest.raises(backup.BackupError, match="nickname"):
+            backup.import_dataset(db.session, str(target))
+        assert db.session.scalar(db.select(db.func.count(User.id))) == 0
+
+
+def test_import_dates_list_entries_without_added_at(app, tmp_path):
+    target = tmp_path / "dump.ndjson"
+    rows = [("users", {"id": 1, "name": "Alice"})]
+    rows += [("movies", {"id": n, "title": f"Movie {n}"}) for n in (1, 2, 3)]
+    rows += [("user_movies", {"user_id": 1, "movie_id": 1, "added_at": "2024-05-01T12:00:00"}),
+             ("user_movies", {"user_id": 1, "movie_id": 2, "added_at": None}),
+             ("user_movies", {"user_id": 1, "movie_id": 3})]
+    target.write_text(
+        json.dumps({"format": backup.FORMAT_NAME, "version": 1}) + "\n"
+        + "".join(json.dumps({"table": table, "row": row}) + "\n" for table, row in rows)
+    )
+    with app.app_context():
+        backup.import_dataset(db.session, str(target))
+        assert set(db.session.scalars(db.select(user_movies.c.added_at))) == {
+            UNKNOWN_ADDED_AT, datetime(2024, 5, 1, 12)}
+        # undated entries sort oldest and page like any other
+        dm = app.data_manager
+        first = dm.get_user_movies_page(1, page_size=2)
+        rest = dm.get_user_movies_page(1, page_size=2, after=first.next_cursor)
+        assert [m.id for m in first] + [m.id for m in rest] == [1, 3, 2]
+
+
+def test_zstd_needs_the_optional_package(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "zstandard", None)
+    with app.app_context():
+        with pytest.raises(backup.BackupError, match="zstandard"):
+            backup.export_dataset(db.session, str(tmp_path / "dump.zst"), compression="zstd")
+
+
+def test_zstd_round_trip(app, dataset, tmp_path):
+    pytest.importorskip("zstandard")
+    target = str(tmp_path / "dump.ndjson.zst")
+    with app.app_context():
+        backup.export_dataset(db.session, target, compression="zstd")
+        wipe()
+        backup.import_dataset(db.session, target)
+        assert snapshot_rows() == dataset
+
+
+def test_snapshot_copies_a_live_database(app, dataset, tmp_path):
+    target = tmp_path / "snap.db"
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            with pytest.raises(backup.BackupError, match="pg_dump"):
+                backup.snapshot_sqlite(db.engine, str(target))
+            return
+        steps = []
+        size = backup.snapshot_sqlite(db.engine, str(target), pages=1,
+                                      sleep=0, progress=lambda remaining, total: steps.append(remaining))
+    assert size == target.stat().st_size and steps[-1] == 0
+    conn = sqlite3.connect(target)
+    try:
+        assert conn.execute("SELECT name FROM users ORDER BY id").fetchall() == [("Alice",), ("Bob",)]
+        assert conn.execute("SELECT count(*) FROM reviews").fetchone() == (2,)
+    finally:
+        conn.close()
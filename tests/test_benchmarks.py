@@ -0,0 +1,92 @@
+import pytest
+
+from Movie_Web_App import create_app, db
+from Movie_Web_App.benchmarks import datagen, omdb_latency, report, serve, web
+from Movie_Web_App.data_manager.models import Movie, User
+
+
+@pytest.fixture
+def bench_db(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'bench.db'}"
+    counts = datagen.generate(uri, seed=7, echo=lambda *a: None, **datagen.SCALES["tiny"])
+    return uri, counts
+
+
+def test_generator_fills_a_consistent_catalog(bench_db):
+    uri, counts = bench_db
+    tiny = datagen.SCALES["tiny"]
+    assert counts["movies"] == tiny["movies"] and counts["users"] == tiny["users"]
+    assert counts["user_movies"] == tiny["list_entries"] and counts["reviews"] == tiny["reviews"]
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "OMDB_CACHE_PATH": None})
+    with app.app_context():
+        dm = app.data_manager
+        # derived tables match what the app itself would have written
+        assert dm.repair_review_stats() == {"movie_stats": 0, "histogram": 0}
+        assert dm.get_genres()
+        assert dm.search_movies(datagen.WORDS[0]).total > 0
+        assert len(dm.get_user_movies_page(1, page_size=100).items) == tiny["list_entries"] // tiny["users"]
+        assert db.session.get(User, 1).name == "user0000001"
+        db.engine.dispose()
+
+
+def test_generator_is_deterministic(bench_db, tmp_path):
+    uri, _ = bench_db
+    other = f"sqlite:///{tmp_path / 'again.db'}"
+    datagen.generate(other, seed=7, echo=lambda *a: None, **datagen.SCALES["tiny"])
+    titles = []
+    for database_uri in (uri, other):
+        app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri, "OMDB_CACHE_PATH": None})
+        with app.app_context():
+            titles.append(db.session.scalars(db.select(Movie.title).order_by(Movie.id)).all())
+            db.engine.dispose()
+    assert titles[0] == titles[1]
+
+
+def test_web_scenarios_report_percentiles(bench_db, tmp_path):
+    uri, _ = bench_db
+    results = web.run(uri, requests=5, warmup=1)
+    assert set(results) == set(web.SCENARIOS)
+    for summary in results.values():
+        assert summary["requests"] == 5
+        assert 0 < summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+
+    path = report.save_baseline(str(tmp_path / "base.json"), results)
+    baseline = report.load_baseline(path)
+    _, regressions = report.compare(results, baseline)
+    assert regressions == []
+    slower = {name: dict(r, p95_ms=r["p95_ms"] * 2) for name, r in results.items()}
+    _, regressions = report.compare(slower, baseline, tolerance=0.5)
+    assert regressions == list(results)
+
+
+def test_http_load_runs_scenarios_over_a_socket(bench_db):
+    import threading
+    from werkzeug.serving import make_server
+
+    uri, _ = bench_db
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "OMDB_CACHE_PATH": None, "POSTER_CACHE_DIR": None})
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        summary = serve.load(f"http://127.0.0.1:{server.server_port}", web.Catalog(app),
+                             web.SCENARIOS["movie_detail"], 12, concurrency=3, warmup=1)
+    finally:
+        server.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+    assert summary["requests"] == 12 and summary["rps"] > 0
+
+
+def test_async_lookups_overlap_the_stub_latency():
+    results = omdb_latency.run(latency=0.05, titles=4, rounds=2, echo=lambda *a: None)
+    assert results["sync"]["requests"] == 8
+    assert results["sync"]["p50_ms"] >= 4 * 50
+    assert results["async-threads"]["p50_ms"] < results["sync"]["p50_ms"]
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert report.percentile(values, 0.50) == 51.0
+    assert report.percentile(values, 0.99) == 100.0
+    assert report.percentile([], 0.95) == 0.0
@@ -0,0 +1,49 @@
+import inspect
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from Movie_Web_App.data_manager import backend_class
+from Movie_Web_App.data_manager.data_manager_interface import DataManagerInterface
+from Movie_Web_App.data_manager.postgres_data_manager import PostgresDataManager, tsquery_expression
+from Movie_Web_App.data_manager.sqlite_data_manager import SQLiteDataManager
+
+
+def test_backend_selection_follows_uri_or_setting():
+    assert backend_class("auto", "sqlite:///x.db") is SQLiteDataManager
+    assert backend_class("auto", "postgresql+psycopg://u@h/db") is PostgresDataManager
+    assert backend_class("sqlite", "postgresql://u@h/db") is SQLiteDataManager
+    with pytest.raises(ValueError):
+        backend_class("mysql", "sqlite://")
+
+
+@pytest.mark.parametrize("cls", [SQLiteDataManager, PostgresDataManager])
+def test_backends_implement_the_whole_interface(cls):
+    assert not inspect.isabstract(cls)
+    assert issubclass(cls, DataManagerInterface)
+
+
+def test_tsquery_expression_prefix_matches_every_word():
+    assert tsquery_expression("Star wa") == "Star:* & wa:*"
+    assert tsquery_expression("  !? ") == ""
+
+
+def test_user_and_movie_crud_through_manager(app):
+    dm = app.data_manager
+    with app.app_context():
+        user = dm.add_user("Alice")
+        with pytest.raises(IntegrityError):
+            dm.add_user("Alice")
+        assert [u.name for u in dm.search_users("lic")] == ["Alice"]
+
+        movie = dm.add_movie("Heat", director="Mann", year=1995, genre="Crime")
+        dm.update_movie(movie.id, rating=8.3)
+        assert dm.get_movie(movie.id).rating == 8.3
+        with pytest.raises(TypeError):
+            dm.update_movie(movie.id, name="nope")
+
+        assert dm.add_to_list(user.id, movie.id)
+        assert [m.title for m in dm.search_movies("hea")] == ["Heat"]
+        assert dm.delete_user(user.id) == "Alice"
+        assert dm.delete_user(user.id) is None
+        assert dm.get_movie(movie.id) is not None
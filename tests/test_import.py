@@ -0,0 +1,122 @@
+import io
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import EnrichmentJob, ListImport
+from Movie_Web_App.importer import TitleIndex, read_rows
+
+LETTERBOXD = """Date,Name,Year,Letterboxd URI
+2024-01-02,Alien,1979,https://boxd.it/2b0k
+2024-01-03,Aliens,1986,https://boxd.it/2b0m
+2024-01-04,amelie,2001,https://boxd.it/1Y3w
+2024-01-05,Heat,1995,https://boxd.it/2b1a
+2024-01-06,Solaris,1972,https://boxd.it/1Z2a
+2024-01-07,Solaris,1972,https://boxd.it/1Z2a
+"""
+
+IMDB = """Const,Your Rating,Date Rated,Title,URL,Title Type,IMDb Rating,Runtime (mins),Year,Genres
+tt0078748,9,2024-01-02,Alien,https://www.imdb.com/title/tt0078748/,movie,8.5,117,1979,Horror
+tt0095327,8,2024-01-02,Grave of the Fireflies,https://www.imdb.com/title/tt0095327/,movie,8.5,89,1988,Drama
+"""
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        dm = app.data_manager
+        movies = {
+            "alien": dm.add_movie("Alien", year=1979).id,
+            "aliens": dm.add_movie("Aliens", year=1986).id,
+            "amelie": dm.add_movie("Amélie", year=2001).id,
+            "heat": dm.add_movie("Heat", year=1995).id,
+            "heat_1986": dm.add_movie("Heat", year=1986).id,
+        }
+        user_id = dm.add_user("Quinn").id
+        dm.add_to_list(user_id, movies["alien"])
+        return movies, user_id
+
+
+def test_title_index_matches_by_title_and_year(app, catalog):
+    movies, _ = catalog
+    with app.app_context():
+        index = TitleIndex.load(db.session)
+    assert index.resolve("Alien", 1979) == movies["alien"]
+    assert index.resolve("AMELIE", 2001) == movies["amelie"]
+    assert index.resolve("Amélie", 2002) == movies["amelie"]     # a year off is close enough
+    assert index.resolve("Heat", 1995) == movies["heat"]
+    assert index.resolve("Heat") is None                          # two Heats, no year
+    assert index.resolve("Aliens") == movies["aliens"]
+    assert index.resolve("Alien", 1990) is None
+
+
+def test_read_rows_understands_both_exports():
+    assert list(read_rows(io.StringIO(LETTERBOXD)))[:2] == [("Alien", 1979), ("Aliens", 1986)]
+    assert list(read_rows(io.StringIO(IMDB))) == [("Alien", 1979), ("Grave of the Fireflies", 1988)]
+
+
+def _import(client, user_id, text, name="watchlist.csv"):
+    return client.post(f"/users/{user_id}/import",
+                       data={"file": (io.BytesIO(text.encode("utf-8-sig")), name)},
+                       content_type="multipart/form-data")
+
+
+def _finished(client, location, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(location + "/status").get_json()
+        if status["finished"]:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"import still {status}")
+
+
+def test_import_attaches_matches_and_queues_misses(app, client, catalog, monkeypatch):
+    movies, user_id = catalog
+    looked_up = []
+    monkeypatch.setattr(app.job_queue, "fetch", lambda title, year=None: looked_up.append(title))
+    app.list_importer.batch_size = 2
+
+    resp = _import(client, user_id, LETTERBOXD)
+    assert resp.status_code == 302
+    status = _finished(client, resp.location)
+    assert status == {**status, "status": "done", "rows": 6, "matched": 4, "added": 3,
+                      "queued": 1, "skipped": 1, "error": None}
+    assert "Importing “watchlist.csv”" in client.get(resp.location).data.decode()
+
+    with app.app_context():
+        listed = {m.id for m in app.data_manager.get_user_movies(user_id)}
+        assert listed == {movies["alien"], movies["aliens"], movies["amelie"], movies["heat"]}
+        jobs = EnrichmentJob.query.filter_by(user_id=user_id).all()
+        assert [(j.title, j.year) for j in jobs] == [("Solaris", 1972)]
+
+
+def test_lookups_are_capped_per_import(app, client, catalog, monkeypatch):
+    _, user_id = catalog
+    monkeypatch.setattr(app.job_queue, "fetch", lambda title, year=None: None)
+    app.list_importer.max_lookups = 0
+    status = _finished(client, _import(client, user_id, IMDB).location)
+    assert (status["matched"], status["queued"], status["skipped"]) == (1, 0, 1)
+
+
+def test_orphaned_imports_are_failed(app, client, catalog):
+    _, user_id = catalog
+    with app.app_context():
+        stuck = ListImport(user_id=user_id, filename="old.csv", status="running",
+                           updated_at=datetime.utcnow() - timedelta(hours=1))
+        db.session.add(stuck)
+        db.session.commit()
+        stuck_id = stuck.id
+    status = client.get(f"/imports/{stuck_id}/status").get_json()
+    assert status["status"] == "failed" and "interrupted" in status["error"]
+
+
+def test_unknown_files_are_rejected(app, client, catalog):
+    _, user_id = catalog
+    resp = _import(client, user_id, "foo,bar\n1,2\n", name="other.csv")
+    assert resp.status_code == 200
+    assert "Not a Letterboxd or IMDb export" in resp.data.decode()
+    assert client.post(f"/users/{user_id}/import", data={}).status_code == 200
+    assert client.get("/imports/999").status_code == 404
@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+
+import Movie_Web_App.routes as routes
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import EnrichmentJob
+from Movie_Web_App.omdb_api import OMDbUnavailable
+
+
+def _movie(title):
+    return {"title": title, "director": "D", "year": 2000, "rating": 7.0,
+            "poster": "", "genre": "Drama", "plot": ""}
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        return app.data_manager.add_user("Quinn").id
+
+
+def _wait_for(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").get_json()
+        if status["status"] not in ("pending", "running"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {status}")
+
+
+def test_fast_lookup_completes_inside_the_request(app, client, user_id, monkeypatch):
+    monkeypatch.setattr(routes, "fetch_movie_data", _movie)
+    resp = client.post(f"/users/{user_id}/add_movie", data={"name": "Heat"}, follow_redirects=True)
+    assert "“Heat” added." in resp.data.decode()
+    with app.app_context():
+        assert [m.title for m in app.data_manager.get_user_movies(user_id)] == ["Heat"]
+
+
+def test_slow_lookup_returns_a_pending_placeholder(app, client, user_id, monkeypatch):
+    release = threading.Event()
+
+    def slow_fetch(title):
+        release.wait(5)
+        return _movie(title)
+
+    monkeypatch.setattr(routes, "fetch_movie_data", slow_fetch)
+    app.config["ENRICH_INLINE_WAIT"] = 0.05
+    resp = client.post(f"/users/{user_id}/add_movie", data={"name": "Ronin"}, follow_redirects=True)
+    page = resp.data.decode()
+    assert "Looking up “Ronin” on OMDb…" in page and "pending-job" in page
+
+    with app.app_context():
+        job_id = EnrichmentJob.query.one().id
+    release.set()
+    status = _wait_for(client, job_id)
+    assert status["status"] == "done" and status["movie_url"]
+    assert "pending-job" not in client.get(f"/users/{user_id}").data.decode()
+
+
+def test_outages_are_retried_with_backoff(app, client, user_id, monkeypatch):
+    calls = []
+
+    def flaky(title):
+        calls.append(title)
+        if len(calls) == 1:
+            raise OMDbUnavailable("timeout")
+        return _movie(title)
+
+    monkeypatch.setattr(routes, "fetch_movie_data", flaky)
+    app.job_queue.backoff = 0.01
+    resp = client.post(f"/users/{user_id}/add_movie", data={"name": "Thief"}, follow_redirects=True)
+    assert b"OMDb unreachable." in resp.data and b"keep trying in the background" in resp.data
+
+    with app.app_context():
+        job_id = EnrichmentJob.query.one().id
+    status = _wait_for(client, job_id)
+    assert status["status"] == "done" and status["attempts"] == 2
+    assert calls == ["Thief", "Thief"]
+
+
+def test_jobs_fail_after_max_attempts(app, user_id):
+    def down(title):
+        raise OMDbUnavailable("down")
+
+    queue = app.job_queue
+    queue.backoff = 0.001
+    with app.app_context():
+        job_id = queue.submit("Collateral", user_id=user_id, fetch=down)
+    deadline = time.monotonic() + 5
+    with app.app_context():
+        while queue.get(job_id).status != "failed" and time.monotonic() < deadline:
+            time.sleep(0.02)
+        job = queue.get(job_id)
+        assert job.status == "failed" and job.attempts == queue.max_attempts
+
+
+def test_wait_sees_attempts_it_was_not_woken_for(app):
+    queue = app.job_queue
+    queue.poll_interval = 0.05
+    with app.app_context():
+        # finished before anyone waited
+        fast = queue.submit("Heat", fetch=lambda title: None)
+        deadline = time.monotonic() + 5
+        while not queue.get(fast).finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        started = time.monotonic()
+        assert queue.wait(fast, 5)
+
+        # claimed by another process, which finishes it a moment later
+        job = EnrichmentJob(title="Ronin", status="running", attempts=1)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        def finish_elsewhere():
+            time.sleep(0.1)
+            with app.app_context():
+                db.session.execute(db.update(EnrichmentJob).where(EnrichmentJob.id == job_id)
+                                   .values(status="done"))
+                db.session.commit()
+
+        threading.Thread(target=finish_elsewhere).start()
+        assert queue.wait(job_id, 5)
+        assert time.monotonic() - started < 2
+    assert queue._events == {} and queue._fetch_overrides == {}
+
+
+def test_year_is_looked_up_and_checked(app, user_id):
+    asked = []
+
+    def fetch(title, year=None):
+        asked.append((title, year))
+        return {**_movie(title), "year": 2021 if title == "Dune" else year}
+
+    queue = app.job_queue
+    with app.app_context():
+        ids = [queue.submit("Dune", user_id=user_id, year=1984, fetch=fetch),
+               queue.submit("Solaris", user_id=user_id, year=1972, fetch=fetch)]
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(not queue.get(i).finished for i in ids):
+            time.sleep(0.02)
+        assert [queue.get(i).status for i in ids] == ["not_found", "done"]
+        assert [m.title for m in app.data_manager.get_user_movies(user_id)] == ["Solaris"]
+    assert sorted(asked) == [("Dune", 1984), ("Solaris", 1972)]
+
+
+def test_deleting_the_movie_or_user_clears_a_finished_job(app, user_id):
+    with app.app_context():
+        dm = app.data_manager
+        movie = dm.add_movie("Heat", year=1995)
+        job = EnrichmentJob(title="Heat", user_id=user_id, movie_id=movie.id, status="done")
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        dm.delete_movie(movie.id)
+        dm.delete_user(user_id)
+        db.session.expire_all()
+        job = db.session.get(EnrichmentJob, job_id)
+        assert (job.movie_id, job.user_id) == (None, None)   # ON DELETE SET NULL
+
+
+def test_workers_bound_concurrency_and_run_each_job_once(app):
+    lock, running, peak, seen = threading.Lock(), [0], [0], []
+
+    def fetch(title):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            seen.append(title)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return None
+
+    queue = app.job_queue
+    with app.app_context():
+        ids = [queue.submit(f"T{i}", fetch=fetch) for i in range(12)]
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(not queue.get(i).finished for i in ids):
+            time.sleep(0.02)
+        assert {queue.get(i).status for i in ids} == {"not_found"}
+    assert sorted(seen) == sorted(f"T{i}" for i in range(12))
+    assert peak[0] <= queue.workers
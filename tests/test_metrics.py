@@ -0,0 +1,37 @@
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie
+
+
+def test_metrics_endpoint_reports_latency_and_sql(app, client):
+    with app.app_context():
+        db.session.add(Movie(title="Heat", year=1995))
+        db.session.commit()
+    client.get("/")
+    client.get("/movies/1")
+
+    body = client.get("/metrics").data.decode()
+    assert 'http_request_duration_seconds_count{endpoint="main.index",method="GET",status="200"} 1' in body
+    assert 'http_request_duration_seconds_count{endpoint="main.movie_detail",method="GET",status="200"} 1' in body
+    assert 'http_request_sql_statements_count{endpoint="main.index"} 1' in body
+    assert 'template_render_duration_seconds_count{template="index.html"} 1' in body
+    assert "# TYPE sql_statements_total counter" in body
+    assert 'endpoint="metrics"' not in body
+
+
+def test_server_timing_header_is_opt_in(app, client):
+    assert "Server-Timing" not in client.get("/").headers
+    app.config["METRICS_SERVER_TIMING"] = True
+    timing = client.get("/").headers["Server-Timing"]
+    assert timing.startswith("db;dur=") and "render;dur=" in timing and "omdb;dur=" in timing
+
+
+def test_failed_statements_dont_leak_timers(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for _ in range(3):
+                try:
+                    conn.exec_driver_sql("SELECT * FROM no_such_table")
+                except db.exc.DBAPIError:
+                    conn.rollback()
+            conn.exec_driver_sql("SELECT 1")
+            assert conn.info["query_start"] == []
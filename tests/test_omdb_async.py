@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Movie_Web_App import omdb_api, omdb_async
+from Movie_Web_App.omdb_api import CircuitBreaker, OMDbClient, OMDbUnavailable
+from Movie_Web_App.omdb_async import AsyncOMDbClient
+
+
+def _payload(title, year="1995"):
+    return {"Response": "True", "Title": title, "Year": year, "imdbRating": "8.0",
+            "Director": "D", "Genre": "Drama", "Poster": "N/A", "Plot": "P"}
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    monkeypatch.setattr(omdb_api, "_cache", None)
+
+
+def _client(**kwargs):
+    kwargs.setdefault("backoff", 0)
+    return AsyncOMDbClient(OMDbClient(api_key="test", **kwargs), concurrency=8)
+
+
+@pytest.mark.parametrize("transport", ["httpx", "threads"])
+def test_lookups_run_concurrently(omdb_stub, no_cache, monkeypatch, transport):
+    if transport == "httpx":
+        pytest.importorskip("httpx")
+    else:
+        monkeypatch.setattr(omdb_async, "httpx", None)
+    titles = [f"Movie {i}" for i in range(6)]
+    for title in titles[:5]:
+        omdb_stub.movies[title.lower()] = _payload(title)
+    omdb_stub.delay = 0.2
+
+    found = asyncio.run(_client().fetch_many(titles))
+    assert omdb_stub.max_in_flight > 1    # serially it would stay at 1
+    assert [found[t]["title"] if found[t] else None for t in titles] == titles[:5] + [None]
+
+
+def test_slow_lookups_are_cancelled_at_the_deadline(omdb_stub, no_cache):
+    pytest.importorskip("httpx")
+    omdb_stub.movies["heat"] = _payload("Heat")
+    omdb_stub.delay = 2.0
+    client = _client()
+    started = time.perf_counter()
+    found = asyncio.run(client.fetch_many(["Heat"], timeout=0.1))
+    assert time.perf_counter() - started < 1.0
+    assert isinstance(found["Heat"], TimeoutError)
+    # a cancelled lookup doesn't count against OMDb
+    assert client.client.breaker.state == "closed" and client.client.stats()["errors"] == 0
+
+
+def test_outages_share_the_sync_breaker(omdb_stub, no_cache):
+    pytest.importorskip("httpx")
+    omdb_stub.status = 503
+    client = _client(retries=0, breaker=CircuitBreaker(failure_threshold=2))
+    found = asyncio.run(client.fetch_many(["A", "B", "C"]))
+    assert all(isinstance(found[t], OMDbUnavailable) for t in "ABC")
+    assert client.client.breaker.state == "open"
+    # the sync client now fails fast too, without a request
+    with pytest.raises(omdb_api.CircuitOpen):
+        client.client.fetch("D")
+    assert len(omdb_stub.calls) == 3
+
+
+def test_cancelled_half_open_trial_frees_the_breaker(omdb_stub, no_cache):
+    pytest.importorskip("httpx")
+    clock = {"now": 0.0}
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: clock["now"])
+    client = _client(retries=0, breaker=breaker)
+    breaker.record_failure()
+    clock["now"] = 31
+    assert breaker.state == "half-open"
+
+    omdb_stub.delay = 2.0
+    found = asyncio.run(client.fetch_many(["Heat"], timeout=0.1))
+    assert isinstance(found["Heat"], TimeoutError)
+    # the next call is the trial the cancelled one never finished
+    omdb_stub.delay = 0
+    omdb_stub.movies["heat"] = _payload("Heat")
+    assert client.client.fetch("Heat")["title"] == "Heat"
+    assert breaker.state == "closed"
+
+
+def test_client_errors_count_against_the_breaker(omdb_stub, no_cache):
+    pytest.importorskip("httpx")
+    omdb_stub.status = 403
+    client = _client(retries=0, breaker=CircuitBreaker(failure_threshold=2))
+    found = asyncio.run(client.fetch_many(["A", "B"]))
+    assert all(isinstance(found[t], OMDbUnavailable) for t in "AB")
+    assert client.client.breaker.state == "open"
+
+
+def test_answers_go_through_the_cache(omdb_stub, monkeypatch):
+    class Cache(dict):
+        def get(self, key, default=None):
+            return super().get(key, default)
+
+        def set(self, key, value):
+            self[key] = value
+
+    cache = Cache({"Heat": {"title": "Heat (cached)"}})
+    monkeypatch.setattr(omdb_api, "_cache", cache)
+    omdb_stub.movies["ran"] = _payload("Ran", "1985")
+    found = asyncio.run(_client().fetch_many(["Heat", "Ran"]))
+    assert found["Heat"]["title"] == "Heat (cached)" and omdb_stub.calls == ["Ran"]
+    assert cache["Ran"]["year"] == 1985
+
+
+def test_lookup_endpoint(app, client, omdb_stub, no_cache):
+    pytest.importorskip("asgiref")
+    omdb_stub.movies["heat"] = _payload("Heat")
+    resp = client.get("/api/v1/lookup?title=Heat&title=Nope&title=Heat")
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [(r["title"], r["status"]) for r in results] == [("Heat", "found"), ("Nope", "not_found")]
+    assert results[0]["movie"]["year"] == 1995
+    assert client.get("/api/v1/lookup").status_code == 400
+
+    # all slots taken: refuse at once instead of waiting
+    app.omdb_async._slots = threading.BoundedSemaphore(1)
+    with app.omdb_async.admit() as admitted:
+        assert admitted
+        busy = client.get("/api/v1/lookup?title=Heat")
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "1"
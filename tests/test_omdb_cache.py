@@ -0,0 +1,71 @@
+import pytest
+
+import Movie_Web_App.omdb_api as api
+from Movie_Web_App.omdb_cache import OMDbCache
+
+MOVIES = {
+    "snatch": {"Response": "True", "Title": "Snatch", "Year": "2000", "imdbRating": "8.2",
+               "Director": "Guy Ritchie", "Genre": "Comedy, Crime", "Poster": "N/A",
+               "Plot": "Diamonds."},
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    clock = {"now": 1000.0}
+    cache = OMDbCache(":memory:", ttl=100, negative_ttl=10, max_entries=2,
+                      clock=lambda: clock["now"])
+    monkeypatch.setattr(api, "_cache", cache)
+    cache.clock_state = clock
+    yield cache
+    cache.close()
+
+
+def test_repeated_lookups_hit_the_cache(omdb_stub, cache):
+    omdb_stub.movies.update(MOVIES)
+    first = api.fetch_movie_data("Snatch")
+    again = api.fetch_movie_data("  SNATCH ")
+    assert first == again and first["director"] == "Guy Ritchie"
+    assert omdb_stub.calls == ["Snatch"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_not_found_is_negatively_cached_until_ttl(omdb_stub, cache):
+    assert api.fetch_movie_data("Nope") is None
+    assert api.fetch_movie_data("nope") is None
+    assert omdb_stub.calls == ["Nope"]
+    assert cache.stats()["negative_hits"] == 1
+
+    cache.clock_state["now"] += 11
+    assert api.fetch_movie_data("nope") is None
+    assert omdb_stub.calls == ["Nope", "nope"]
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    clock = {"now": 0.0}
+    cache = OMDbCache(":memory:", max_entries=2, clock=lambda: clock["now"])
+    for i, title in enumerate(["a", "b"]):
+        clock["now"] = i
+        cache.set(title, {"title": title})
+    clock["now"] = 5
+    cache.get("a")
+    clock["now"] = 6
+    cache.set("c", {"title": "c"})
+
+    assert cache.get("a", None) == {"title": "a"}
+    assert cache.get("b", None) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+
+
+def test_size_follows_other_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / "omdb.sqlite")
+    cache, other = OMDbCache(path, max_entries=3), OMDbCache(path)
+    for title in "abc":
+        cache.set(title, {"title": title})
+    other.clear()   # e.g. another worker process
+    cache.max_entries = 1
+    cache.set("d", {"title": "d"})
+    assert cache.stats()["evictions"] == 0 and cache.stats()["size"] == 1
+    assert cache.get("d", None) == {"title": "d"}
+    cache.close()
+    other.close()
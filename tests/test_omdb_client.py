@@ -0,0 +1,74 @@
+import pytest
+
+from Movie_Web_App.omdb_api import CircuitBreaker, CircuitOpen, OMDbClient, OMDbUnavailable
+
+HEAT = {"Response": "True", "Title": "Heat", "Year": "1995", "imdbRating": "8.3",
+        "Director": "Michael Mann", "Genre": "Crime, Drama", "Poster": "N/A", "Plot": "Heist."}
+
+
+def _client(**kwargs):
+    kwargs.setdefault("backoff", 0)
+    return OMDbClient(api_key="test", **kwargs)
+
+
+def test_fetch_reuses_pooled_connection(omdb_stub):
+    omdb_stub.movies["heat"] = HEAT
+    client = _client()
+    assert client.fetch("Heat")["director"] == "Michael Mann"
+    assert client.fetch("Nothing") is None
+    assert client.fetch("heat")["year"] == 1995
+    assert len(omdb_stub.connections) == 1
+    assert client.stats()["calls"] == 3 and client.stats()["errors"] == 0
+
+
+def test_5xx_is_retried_then_raises(omdb_stub):
+    omdb_stub.status = 503
+    client = _client(retries=2, breaker=CircuitBreaker(failure_threshold=10))
+    with pytest.raises(OMDbUnavailable):
+        client.fetch("Heat")
+    assert len(omdb_stub.calls) == 3
+
+
+def test_read_timeout_is_enforced(omdb_stub):
+    omdb_stub.delay = 0.5
+    client = _client(read_timeout=0.1, retries=0)
+    with pytest.raises(OMDbUnavailable):
+        client.fetch("Heat")
+
+
+def test_circuit_breaker_fails_fast_then_recovers(omdb_stub):
+    clock = {"now": 0.0}
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: clock["now"])
+    client = _client(retries=0, breaker=breaker)
+    omdb_stub.status = 500
+    for _ in range(2):
+        with pytest.raises(OMDbUnavailable):
+            client.fetch("Heat")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpen):
+        client.fetch("Heat")
+    assert len(omdb_stub.calls) == 2
+
+    clock["now"] = 31
+    omdb_stub.status = 200
+    omdb_stub.movies["heat"] = HEAT
+    assert client.fetch("Heat")["title"] == "Heat"
+    assert breaker.state == "closed"
+
+
+def test_client_errors_count_against_the_breaker(omdb_stub):
+    breaker = CircuitBreaker(failure_threshold=2)
+    client = _client(retries=2, breaker=breaker)
+    omdb_stub.status = 401
+    for _ in range(2):
+        with pytest.raises(OMDbUnavailable, match="HTTP 401"):
+            client.fetch("Heat")
+    assert len(omdb_stub.calls) == 2   # not retried
+    assert breaker.state == "open" and client.stats()["errors"] == 2
+
+
+def test_html_error_page_is_unavailable(omdb_stub):
+    omdb_stub.files["/"] = ("text/html", b"<html><body>Bad gateway</body></html>")
+    with pytest.raises(OMDbUnavailable, match="non-JSON"):
+        _client(retries=0).fetch("Heat")
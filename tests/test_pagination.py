@@ -0,0 +1,98 @@
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie, User
+from Movie_Web_App.data_manager.pagination import decode_cursor, encode_cursor
+
+
+def _walk(fetch):
+    """Follow next cursors to the end, then prev cursors back to the start."""
+    pages = [fetch()]
+    while pages[-1].has_next:
+        pages.append(fetch(after=pages[-1].next_cursor))
+    back = [pages[-1]]
+    while back[-1].has_prev:
+        back.append(fetch(before=back[-1].prev_cursor))
+    return pages, back[::-1]
+
+
+def test_catalog_keyset_pages_are_stable_and_complete(app):
+    with app.app_context():
+        # Duplicate titles exercise the id tie-breaker
+        db.session.add_all(Movie(title=f"Movie {i % 7}", year=1900 + i) for i in range(30))
+        db.session.commit()
+        dm = app.data_manager
+
+        forward, backward = _walk(lambda **kw: dm.get_movies(page_size=4, **kw))
+        seen = [m.id for page in forward for m in page]
+        assert len(seen) == len(set(seen)) == 30
+        assert [m.id for p in backward for m in p] == seen
+        assert all(p.total == 30 for p in forward)
+        assert not forward[0].has_prev and not forward[-1].has_next
+
+        titles = [m.title for page in forward for m in page]
+        assert titles == sorted(titles)
+
+
+def test_search_and_user_list_pagination(app):
+    with app.app_context():
+        user = User(name="Pat")
+        movies = [Movie(title=f"Alien {i}", year=2000 + i) for i in range(5)]
+        user.movies.extend(movies)
+        db.session.add(user)
+        db.session.commit()
+        dm = app.data_manager
+
+        forward, backward = _walk(lambda **kw: dm.search_movies("alien", page_size=2, **kw))
+        assert sorted(m.title for p in forward for m in p) == [f"Alien {i}" for i in range(5)]
+        assert [m.id for p in backward for m in p] == [m.id for p in forward for m in p]
+
+        forward, _ = _walk(lambda **kw: dm.get_user_movies_page(user.id, page_size=2, **kw))
+        assert len(forward) == 3
+        assert {m.id for p in forward for m in p} == {m.id for m in movies}
+
+
+def test_index_renders_next_link_and_total(app, client):
+    app.config['PAGE_SIZE'] = 2
+    with app.app_context():
+        db.session.add_all(Movie(title=t) for t in ("Amelie", "Brazil", "Casablanca"))
+        db.session.commit()
+
+    resp = client.get("/")
+    assert b"3 movies" in resp.data
+    assert b"Brazil" in resp.data and b"Casablanca" not in resp.data
+    assert b"Next" in resp.data and b"Prev" not in resp.data
+
+    with app.app_context():
+        page = app.data_manager.get_movies(page_size=2)
+    resp = client.get(f"/?after={page.next_cursor}")
+    assert b"Casablanca" in resp.data and b"Amelie" not in resp.data
+    assert b"Prev" in resp.data
+
+    # A garbage cursor falls back to the first page
+    assert b"Amelie" in client.get("/?after=not-a-cursor").data
+
+
+def test_bad_cursors_give_the_first_page(app, client):
+    app.config['PAGE_SIZE'] = 2
+    with app.app_context():
+        user = User(name="Pat")
+        user.movies.extend(Movie(title=t) for t in ("Amelie", "Brazil", "Casablanca"))
+        db.session.add(user)
+        db.session.commit()
+        dm = app.data_manager
+        first = [m.id for m in dm.get_movies(page_size=2)]
+
+        well_formed_but_wrong = [
+            encode_cursor([]) + "x", "not-base64!", encode_cursor(["Brazil", "2"]),
+            encode_cursor([["Brazil"], 2]), encode_cursor(["Brazil", 2**70]),
+            encode_cursor([{"dt": "nope"}, 1]), encode_cursor([{"dt": 5}, 1]),
+        ]
+        for cursor in well_formed_but_wrong:
+            for direction in ("after", "before"):
+                page = dm.get_movies(page_size=2, **{direction: cursor})
+                assert [m.id for m in page] == first and not page.has_prev
+        assert decode_cursor(encode_cursor([{"dt": "nope"}])) is None
+
+    bad = encode_cursor([{"dt": "nope"}, 1])
+    for url in (f"/?after={bad}", f"/?before={bad}", f"/users/1?after={bad}",
+                f"/api/v1/movies?after={bad}", f"/api/v1/users/1/movies?before={bad}"):
+        assert client.get(url).status_code == 200, url
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from Movie_Web_App.posters import PosterError, PosterStore, backfill
+
+PNG = (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00"
+       b"\x1f\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc````\x00\x00\x00\x05\x00\x01\xa5\xf6E@\x00"
+       b"\x00\x00\x00IEND\xaeB`\x82")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PosterStore(str(tmp_path / "posters"), timeout=2)
+    yield store
+    store.close()
+
+
+def test_ensure_stores_content_addressed_variants_once(store, omdb_stub):
+    omdb_stub.files["/a.png"] = ("image/png", PNG)
+    omdb_stub.files["/same.png"] = ("image/png", PNG)
+
+    digest, ext = store.ensure(omdb_stub.url + "a.png")
+    assert store.ensure(omdb_stub.url + "same.png") == (digest, ext)
+    assert store.ensure(omdb_stub.url + "a.png") == (digest, ext)
+    assert omdb_stub.calls == ["/a.png", "/same.png"]
+    for size in store.sizes:
+        with open(store.variant_path(digest, size, ext), "rb") as fh:
+            assert fh.read()
+
+
+def test_variants_are_resized_webp(store, omdb_stub):
+    Image = pytest.importorskip("PIL.Image")
+    out = io.BytesIO()
+    Image.new("RGB", (1000, 1500), "red").save(out, "PNG")
+    omdb_stub.files["/big.png"] = ("image/png", out.getvalue())
+
+    digest, ext = store.ensure(omdb_stub.url + "big.png")
+    assert ext == "webp"
+    with Image.open(store.variant_path(digest, "thumb", ext)) as thumb:
+        assert thumb.size == (300, 450)
+
+
+def test_non_images_are_rejected_and_remembered(store, omdb_stub):
+    omdb_stub.files["/evil.svg"] = ("image/svg+xml", b"<svg onload='x'/>")
+    with pytest.raises(PosterError):
+        store.ensure(omdb_stub.url + "evil.svg")
+    assert store.recently_failed(omdb_stub.url + "evil.svg")
+    assert store.variant_path("../../etc", "thumb", "png") is None
+
+
+def test_poster_routes_download_lazily_then_serve_immutable(app, client, omdb_stub):
+    omdb_stub.files["/p.png"] = ("image/png", PNG)
+    with app.app_context():
+        movie = app.data_manager.add_movie("Heat", year=1995, poster=omdb_stub.url + "p.png")
+        movie_id = movie.id
+
+    page = client.get("/").data.decode()
+    assert f"/movies/{movie_id}/poster/thumb" in page and "p.png" not in page
+
+    lazy = client.get(f"/movies/{movie_id}/poster/thumb")
+    assert lazy.status_code == 302 and "/posters/" in lazy.headers["Location"]
+    served = client.get(lazy.headers["Location"])
+    assert served.status_code == 200 and served.data
+    assert "immutable" in served.headers["Cache-Control"]
+    assert client.get("/posters/not-a-digest/thumb.png").status_code == 404
+
+
+def test_failed_download_falls_back_to_original(app, client, omdb_stub):
+    with app.app_context():
+        movie_id = app.data_manager.add_movie("Gone", poster=omdb_stub.url + "missing.jpg").id
+    resp = client.get(f"/movies/{movie_id}/poster/thumb")
+    assert resp.status_code == 302 and resp.headers["Location"].endswith("missing.jpg")
+
+
+def test_backfill_uses_worker_pool_and_skips_cached(store, omdb_stub):
+    for i in range(5):
+        omdb_stub.files[f"/{i}.png"] = ("image/png", PNG + bytes([i]))
+    urls = [omdb_stub.url + f"{i}.png" for i in range(5)]
+    store.ensure(urls[0])
+
+    counts = backfill(store, urls + ["N/A", None, urls[1]], workers=3, echo=lambda msg: None)
+    assert counts == {"stored": 4, "skipped": 1, "failed": 0}
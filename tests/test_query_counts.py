@@ -0,0 +1,75 @@
+"""
+Query budgets per route: each view must stay within a fixed number of SQL
+statements no matter how much data is behind it, so N+1 regressions fail.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie, Review, User
+
+
+@contextmanager
+def count_queries(app):
+    """Collect every SQL statement the app's engine executes."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def populated(app):
+    """Enough rows that a per-row lazy load would blow every budget."""
+    with app.app_context():
+        users = [User(name=f"user{i}") for i in range(8)]
+        movies = [Movie(title=f"Alien {i}", year=1979 + i, genre="Horror, Sci-Fi")
+                  for i in range(12)]
+        for user in users:
+            user.movies.extend(movies)
+        db.session.add_all(users + movies)
+        db.session.flush()
+        db.session.add_all(
+            Review(movie_id=movies[0].id, user_id=u.id, review_text="Scary", rating=8.0)
+            for u in users
+        )
+        db.session.commit()
+        return {"user": users[0].id, "movie": movies[0].id, "other": movies[1].id}
+
+
+BUDGETS = [
+    ("GET", "/", 3),
+    ("GET", "/?q=alien", 3),
+    ("GET", "/?genre=Horror", 3),
+    ("GET", "/users", 2),
+    ("GET", "/users/{user}", 5),  # + pending enrichment jobs, recommendations
+    ("GET", "/users/{user}?q=alien", 8),
+    ("GET", "/search?q=alien", 3),
+    ("GET", "/movies/{movie}", 5),  # + rating histogram, "also listed"
+    # + co-occurrence counts (list, upsert, prune) and recommendations (score, delete, insert)
+    ("POST", "/users/{user}/remove_movie/{other}", 8),
+    ("POST", "/users/{user}/add_existing/{other}", 4),
+    ("GET", "/api/v1/movies", 2),
+    ("GET", "/api/v1/movies/{movie}?fields=title,histogram", 2),
+    ("GET", "/api/v1/users/{user}/movies", 3),
+    ("GET", "/api/v1/search?q=alien", 3),
+]
+
+
+@pytest.mark.parametrize("method,url,budget", BUDGETS)
+def test_route_query_budget(app, client, populated, method, url, budget):
+    url = url.format(**populated)
+    with count_queries(app) as statements:
+        resp = client.open(url, method=method)
+    assert resp.status_code in (200, 302)
+    assert len(statements) <= budget, "\n".join(statements)
@@ -0,0 +1,130 @@
+"""
+Query plans per data-manager method: every statement a method runs is fed to
+SQLite's EXPLAIN QUERY PLAN, and the test fails if any of them reads a table
+front to back instead of through an index. Paginated reads must also come
+out of an index presorted, so a page costs the same on row 10 and row 10,000.
+"""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie, Review, User
+
+# "SCAN users" / "SCAN TABLE users" (older SQLite) without an index behind it
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+SORTS = ("USE TEMP B-TREE FOR ORDER BY", "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY")
+
+
+@pytest.fixture
+def dm(app):
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        pytest.skip("EXPLAIN QUERY PLAN is SQLite's")
+    with app.app_context():
+        users = [User(name=f"user{i}") for i in range(6)]
+        movies = [Movie(title=f"Alien {i}", year=1979 + i, genre="Horror, Sci-Fi",
+                        director="Ridley Scott", plot="In space no one can hear you scream")
+                  for i in range(10)]
+        for user in users:
+            user.movies.extend(movies[:5])
+        db.session.add_all(users + movies)
+        db.session.flush()
+        db.session.add_all(
+            Review(movie_id=movies[0].id, user_id=u.id, review_text="Scary", rating=8.0)
+            for u in users
+        )
+        db.session.commit()
+        yield app.data_manager
+
+
+def plans(app, call):
+    """Run `call` and return [(sql, [plan detail, ...])] for each statement it issued."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    with engine.connect() as conn:
+        return [(sql, [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)])
+                for sql, params in statements]
+
+
+def full_scans(details):
+    """Tables (not indexes, virtual tables or subqueries) read front to back."""
+    tables = set(db.metadata.tables)
+    scanned = set()
+    for detail in details:
+        match = FULL_SCAN.match(detail)
+        if match:
+            name = re.sub(r"_\d+$", "", match.group(1))   # ORM aliases: users_1
+            if name in tables:
+                scanned.add(name)
+    return scanned
+
+
+# (id, call, tables it may scan whole, must be presorted)
+CALLS = [
+    # listing/counting a whole table is a full scan by definition
+    ("get_all_users", lambda dm: dm.get_all_users(), {"users"}, False),
+    ("get_users", lambda dm: dm.get_users(page_size=2), {"users"}, True),
+    ("get_users_next", lambda dm: dm.get_users(page_size=2, after=dm.get_users(page_size=2).next_cursor),
+     {"users"}, True),
+    # substring match: a b-tree can't help (PostgreSQL uses a trigram index)
+    ("search_users", lambda dm: dm.search_users("user"), {"users"}, False),
+    ("get_user", lambda dm: dm.get_user(1), set(), False),
+    ("get_user_movies", lambda dm: dm.get_user_movies(1), set(), False),
+    ("get_user_movies_page", lambda dm: dm.get_user_movies_page(1, page_size=2), set(), True),
+    ("get_user_movies_page_next",
+     lambda dm: dm.get_user_movies_page(1, page_size=2, after=dm.get_user_movies_page(1, page_size=2).next_cursor),
+     set(), True),
+    ("get_listed_movie_ids", lambda dm: dm.get_listed_movie_ids(1, [1, 2, 9]), set(), False),
+    ("is_listed", lambda dm: dm.is_listed(1, 1), set(), False),
+    ("get_movie", lambda dm: dm.get_movie(1), set(), False),
+    ("get_movies", lambda dm: dm.get_movies(page_size=3), {"movies"}, True),
+    ("get_movies_next", lambda dm: dm.get_movies(page_size=3, after=dm.get_movies(page_size=3).next_cursor),
+     {"movies"}, True),
+    ("get_movies_by_rating", lambda dm: dm.get_movies(sort="rating", page_size=3), {"movies"}, True),
+    ("get_movies_by_popularity", lambda dm: dm.get_movies(sort="popular", page_size=3), {"movies"}, True),
+    ("get_movies_in_genre", lambda dm: dm.get_movies(genre="Horror", page_size=3), set(), False),
+    ("get_genres", lambda dm: dm.get_genres(), set(), False),
+    ("search_movies", lambda dm: dm.search_movies("alien", exclude_user_id=2, page_size=3), set(), False),
+    ("get_rating_histogram", lambda dm: dm.get_rating_histogram(1), set(), False),
+    ("get_movie_reviews", lambda dm: dm.get_movie_reviews(1), set(), True),
+    ("get_movie_reviews_page", lambda dm: dm.get_movie_reviews_page(1, page_size=2), set(), True),
+    ("get_user_reviews", lambda dm: dm.get_user_reviews(1), set(), True),
+    ("get_similar_movies", lambda dm: dm.get_similar_movies(1), set(), True),
+    ("get_recommendations", lambda dm: dm.get_recommendations(1), set(), True),
+    ("refresh_recommendations", lambda dm: dm.refresh_recommendations(2), set(), False),
+    ("update_movie", lambda dm: dm.update_movie(2, rating=7.5), set(), False),
+    ("add_to_list", lambda dm: dm.add_to_list(2, 9), set(), False),
+    ("remove_from_list", lambda dm: dm.remove_from_list(1, 1), set(), False),
+    ("edit_list", lambda dm: dm.edit_list(1, add=[6, 7, 99], remove=[1, 2, 8]), set(), False),
+    ("find_movie_ids_by_title", lambda dm: dm.find_movie_ids_by_title(["Alien 1", "Nope"]), set(), False),
+    ("delete_review", lambda dm: dm.delete_review(1), set(), False),
+    ("delete_movie", lambda dm: dm.delete_movie(1), set(), False),
+    ("delete_user", lambda dm: dm.delete_user(1), set(), False),
+]
+
+
+@pytest.mark.parametrize("call,allowed,presorted", [c[1:] for c in CALLS], ids=[c[0] for c in CALLS])
+def test_data_manager_queries_use_indexes(app, dm, call, allowed, presorted):
+    with app.app_context():
+        for sql, details in plans(app, lambda: call(dm)):
+            scanned = full_scans(details)
+            assert scanned <= allowed, f"full scan of {scanned - allowed}:\n{sql}\n{details}"
+            if presorted and "ORDER BY" in sql and "count(" not in sql:
+                assert not any(d in SORTS for d in details), f"sorts instead of using an index:\n{sql}\n{details}"
+
+
+def test_enrichment_jobs_of_a_user_are_found_by_index(app, dm):
+    with app.app_context():
+        [(sql, details)] = plans(app, lambda: app.job_queue.pending_for_user(1))
+    assert any("ix_enrichment_jobs_user_id_status" in d for d in details), details
@@ -0,0 +1,139 @@
+import pytest
+
+from Movie_Web_App import db, recommendations
+from Movie_Web_App.data_manager.models import MovieCooccurrence
+
+LISTS = {
+    "Alice": ["Alien", "Aliens", "Heat"],
+    "Bob": ["Alien", "Aliens", "Ran"],
+    "Carol": ["Alien", "Heat"],
+    "Dave": ["Aliens"],
+}
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        dm = app.data_manager
+        movies = {t: dm.add_movie(t).id for t in ("Alien", "Aliens", "Heat", "Ran", "Solaris")}
+        users = {}
+        for name, titles in LISTS.items():
+            users[name] = dm.add_user(name).id
+            for title in titles:
+                dm.add_to_list(users[name], movies[title])
+        return movies, users
+
+
+def cooccurrence():
+    rows = db.session.execute(db.select(MovieCooccurrence.movie_id, MovieCooccurrence.other_id,
+                                        MovieCooccurrence.count)).all()
+    return {(a, b): n for a, b, n in rows}
+
+
+def titles(movies):
+    return [m.title for m in movies]
+
+
+def test_counts_follow_list_edits(app, catalog):
+    movies, users = catalog
+    alien, aliens, heat = movies["Alien"], movies["Aliens"], movies["Heat"]
+    with app.app_context():
+        counts = cooccurrence()
+        assert counts[alien, aliens] == counts[aliens, alien] == 2
+        assert counts[alien, heat] == 2 and counts[aliens, heat] == 1
+
+        app.data_manager.remove_from_list(users["Alice"], heat)
+        counts = cooccurrence()
+        assert counts[alien, heat] == 1
+        # no list has Aliens and Heat together any more
+        assert (aliens, heat) not in counts and (heat, aliens) not in counts
+
+
+def test_similar_movies_strongest_first(app, catalog):
+    movies, _ = catalog
+    with app.app_context():
+        dm = app.data_manager
+        # Aliens and Heat share two lists with Alien (ties: newest first), Ran one
+        assert titles(dm.get_similar_movies(movies["Alien"])) == ["Heat", "Aliens", "Ran"]
+        assert titles(dm.get_similar_movies(movies["Ran"], limit=1)) == ["Aliens"]
+        assert dm.get_similar_movies(movies["Solaris"]) == []
+
+
+def test_recommendations_skip_listed_movies(app, catalog):
+    movies, users = catalog
+    with app.app_context():
+        dm = app.data_manager
+        # Carol: Aliens goes with Alien twice and Heat once, Ran with Alien once
+        assert titles(dm.get_recommendations(users["Carol"])) == ["Aliens", "Ran"]
+        dm.add_to_list(users["Carol"], movies["Aliens"])
+        assert titles(dm.get_recommendations(users["Carol"])) == ["Ran"]
+
+
+def test_deleting_a_movie_or_user_updates_counts(app, catalog):
+    movies, users = catalog
+    with app.app_context():
+        dm = app.data_manager
+        dm.delete_movie(movies["Ran"])
+        assert all(movies["Ran"] not in pair for pair in cooccurrence())
+        dm.delete_user(users["Alice"])
+        counts = cooccurrence()
+        assert counts[movies["Alien"], movies["Aliens"]] == 1
+        assert counts[movies["Alien"], movies["Heat"]] == 1
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_rebuild_matches_incremental_counts(app, catalog, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    _, users = catalog
+    with app.app_context():
+        dm = app.data_manager
+        before = cooccurrence()
+        recommended = titles(dm.get_recommendations(users["Carol"]))
+        db.session.execute(db.delete(MovieCooccurrence))
+        db.session.commit()
+        result = recommendations.rebuild(db.session, dm, batch_size=2, use_numpy=use_numpy,
+                                         echo=lambda *a: None)
+        assert result == {"pairs": len(before), "users": len(LISTS)}
+        assert cooccurrence() == before
+        assert titles(dm.get_recommendations(users["Carol"])) == recommended
+
+
+def test_numpy_is_optional(app, catalog, monkeypatch):
+    monkeypatch.setattr(recommendations, "np", None)
+    with app.app_context():
+        with pytest.raises(RuntimeError, match="NumPy"):
+            recommendations.rebuild(db.session, app.data_manager, use_numpy=True)
+        assert recommendations.rebuild(db.session, app.data_manager, echo=lambda *a: None)["pairs"] == 10
+
+
+def test_top_k_keeps_strongest_neighbours():
+    pairs = {(1, 2): 3, (1, 3): 1, (1, 4): 2, (2, 3): 1}
+    rows = recommendations.neighbour_rows(pairs, top_k=1)
+    assert {(r["movie_id"], r["other_id"], r["count"]) for r in rows} == {
+        (1, 2, 3), (2, 1, 3), (3, 2, 1), (4, 1, 2)}
+    assert len(recommendations.neighbour_rows(pairs, min_count=2)) == 4
+
+
+def test_count_pairs_paths_agree():
+    np = pytest.importorskip("numpy")
+    lists = [[1, 2, 3], [2, 3], [1, 3, 5, 7], [4]]
+    assert recommendations.count_pairs_numpy(lists, chunk_pairs=2) == recommendations.count_pairs_python(lists)
+
+
+def test_batch_list_edits_match_single_edits(app, catalog):
+    movies, users = catalog
+    with app.app_context():
+        dm = app.data_manager
+        outcome = dm.edit_list(users["Alice"], add=[movies["Ran"], movies["Solaris"], movies["Alien"], 999999],
+                               remove=[movies["Heat"], movies["Aliens"], movies["Solaris"]])
+        assert outcome == {movies["Ran"]: "added", movies["Solaris"]: "conflict",
+                           movies["Alien"]: "already listed", 999999: "no such movie",
+                           movies["Heat"]: "removed", movies["Aliens"]: "removed"}
+        assert sorted(dm._listed_ids(users["Alice"])) == sorted([movies["Alien"], movies["Ran"]])
+        batched = cooccurrence()
+        recommended = titles(dm.get_recommendations(users["Alice"]))
+
+        recommendations.rebuild(db.session, dm, echo=lambda _: None)
+        assert cooccurrence() == batched
+        assert titles(dm.get_recommendations(users["Alice"])) == recommended
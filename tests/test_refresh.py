@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from Movie_Web_App import db, refresh
+from Movie_Web_App.data_manager.models import Movie
+from Movie_Web_App.omdb_api import CircuitOpen, OMDbUnavailable
+
+NOW = datetime(2025, 7, 1, 12, 0)
+OLD = NOW - timedelta(days=90)
+
+
+def omdb(title, year, **fields):
+    return {"title": title, "year": year, "director": "", "rating": 7.0,
+            "poster": "", "genre": "Drama", "plot": "", **fields}
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        dm = app.data_manager
+        ids = {}
+        for title, year in [("Alien", 1979), ("Heat", 1995), ("Ran", 1985), ("Fresh", 2024)]:
+            movie = dm.add_movie(title, year=year, rating=7.0, genre="Drama", director="", poster="", plot="")
+            ids[title] = movie.id
+        db.session.execute(db.update(Movie).values(last_fetched_at=OLD))
+        db.session.execute(db.update(Movie).where(Movie.title == "Ran").values(last_fetched_at=None))
+        db.session.execute(db.update(Movie).where(Movie.title == "Fresh").values(last_fetched_at=NOW))
+        db.session.commit()
+        alice, bob = dm.add_user("Alice"), dm.add_user("Bob")
+        dm.add_to_list(alice.id, ids["Heat"])
+        dm.add_to_list(bob.id, ids["Heat"])
+        dm.add_to_list(alice.id, ids["Alien"])
+    return ids
+
+
+def run(app, answers, **kwargs):
+    calls = []
+
+    def fetch(title, year=None):
+        calls.append(title)
+        answer = answers[title]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    with app.app_context():
+        stats = refresh.refresh_metadata(db.session, fetch, max_age=timedelta(days=30), workers=1,
+                                         rate=None, echo=lambda *a: None, now=lambda: NOW, **kwargs)
+    return stats, calls
+
+
+def test_stale_movies_most_listed_first(app, catalog):
+    with app.app_context():
+        rows = refresh.stale_movies(db.session, NOW - timedelta(days=30), limit=10)
+    # Heat: 2 lists, Alien: 1, then the never-fetched Ran; Fresh isn't stale
+    assert [title for _, title, _ in rows] == ["Heat", "Alien", "Ran"]
+
+
+def test_only_changed_movies_are_written_and_invalidated(app, catalog):
+    cache = app.response_cache
+    tags = [f"movie:{catalog[t]}" for t in ("Alien", "Heat")]
+    before = cache.backend.versions(tags)
+    stats, calls = run(app, {
+        "Heat": omdb("Heat", 1995, rating=8.3, plot="A cop hunts a thief"),
+        "Alien": omdb("Alien", 1979),   # same as stored
+        "Ran": None,                    # OMDb no longer knows it
+    })
+    assert calls == ["Heat", "Alien", "Ran"]
+    assert (stats.checked, stats.updated, stats.unchanged, stats.not_found) == (3, 1, 1, 1)
+
+    after = cache.backend.versions(tags)
+    assert after[0] == before[0]        # Alien: untouched, still cached
+    assert after[1] > before[1]         # Heat: its pages are stale now
+    with app.app_context():
+        heat = db.session.get(Movie, catalog["Heat"])
+        assert (heat.rating, heat.plot) == (8.3, "A cop hunts a thief")
+        assert all(m.last_fetched_at == NOW for m in Movie.query if m.title != "Fresh")
+        # the full-text index follows the new plot
+        assert app.data_manager.search_movies("thief").total == 1
+
+    # everything is fresh now: a second run looks nothing up
+    _, calls = run(app, {})
+    assert calls == []
+
+
+def test_remakes_and_failures_are_not_written(app, catalog):
+    stats, _ = run(app, {
+        "Heat": omdb("Heat", 1986, rating=5.0),      # a different "Heat"
+        "Alien": OMDbUnavailable("HTTP 503"),
+        "Ran": omdb("Ran", 1985, rating=8.2),
+    })
+    assert (stats.updated, stats.mismatched, stats.failed) == (1, 1, ["Alien"])
+    with app.app_context():
+        assert db.session.get(Movie, catalog["Heat"]).rating == 7.0
+        # a failed lookup stays stale and is retried next run
+        assert db.session.get(Movie, catalog["Alien"]).last_fetched_at == OLD
+        assert db.session.get(Movie, catalog["Ran"]).rating == 8.2
+
+
+def test_lookups_ask_for_the_stored_year(app, catalog):
+    asked = []
+
+    def fetch(title, year=None):
+        asked.append((title, year))
+        # like OMDb's "t=Heat" without a year: the newest film of that title
+        return omdb(title, year or 2024, rating=8.0)
+
+    with app.app_context():
+        stats = refresh.refresh_metadata(db.session, fetch, max_age=timedelta(days=30), workers=1,
+                                         rate=None, echo=lambda *a: None, now=lambda: NOW)
+        assert sorted(asked) == [("Alien", 1979), ("Heat", 1995), ("Ran", 1985)]
+        assert (stats.updated, stats.mismatched) == (3, 0)
+        assert db.session.get(Movie, catalog["Heat"]).rating == 8.0
+
+
+def test_open_circuit_stops_the_run(app, catalog):
+    stats, calls = run(app, {"Heat": CircuitOpen("open"), "Alien": omdb("Alien", 1979),
+                             "Ran": omdb("Ran", 1985)}, batch_size=1)
+    assert stats.aborted == "open" and calls == ["Heat"]
+    with app.app_context():
+        assert db.session.get(Movie, catalog["Heat"]).last_fetched_at == OLD
+
+
+def test_new_movies_start_fresh(app):
+    with app.app_context():
+        movie = app.data_manager.add_movie("Brand New", year=2025)
+        assert movie.last_fetched_at is not None
@@ -0,0 +1,138 @@
+import pytest
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie
+from Movie_Web_App.response_cache import LRUBackend, RedisBackend, ResponseCache
+
+from .test_query_counts import count_queries
+
+
+@pytest.fixture
+def movies(app):
+    with app.app_context():
+        heat = app.data_manager.add_movie("Heat", year=1995, genre="Crime")
+        alien = app.data_manager.add_movie("Alien", year=1979, genre="Horror")
+        return {"heat": heat.id, "alien": alien.id}
+
+
+def test_catalog_is_served_from_cache_until_a_movie_changes(app, client, movies):
+    client.get("/")
+    with count_queries(app) as statements:
+        assert b"Heat" in client.get("/").data
+    assert statements == []
+
+    with app.app_context():
+        app.data_manager.add_movie("Ronin", year=1998)
+    assert b"Ronin" in client.get("/").data
+    assert app.response_cache.stats()["hits"] >= 1
+
+
+def test_query_args_are_part_of_the_key(client, movies):
+    assert b"Alien" in client.get("/?genre=Horror").data
+    assert b"Heat" not in client.get("/?genre=Horror").data
+    assert b"Heat" in client.get("/?genre=Crime").data
+
+
+def test_etag_and_last_modified_give_304(client, movies):
+    first = client.get(f"/movies/{movies['heat']}")
+    assert first.headers["ETag"] and first.headers["Last-Modified"]
+    again = client.get(f"/movies/{movies['heat']}",
+                       headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    since = client.get(f"/movies/{movies['heat']}",
+                       headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+
+def test_review_invalidates_only_its_movie(app, client, movies):
+    heat, alien = f"/movies/{movies['heat']}", f"/movies/{movies['alien']}"
+    etag = client.get(heat).headers["ETag"]
+    client.get(alien)
+
+    resp = client.post(heat, data={"review_text": "Great heist", "rating": "9"},
+                       follow_redirects=True)
+    assert b"Review added!" in resp.data and b"Great heist" in resp.data
+    # the flash-carrying page was not cached, the next one is fresh
+    fresh = client.get(heat, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and b"Great heist" in fresh.data
+    assert b"Review added!" not in fresh.data
+
+    with count_queries(app) as statements:
+        assert client.get(alien).status_code == 200
+    assert statements == []
+
+
+def test_list_changes_invalidate_also_listed(app, client, movies):
+    heat = f"/movies/{movies['heat']}"
+    with app.app_context():
+        user = app.data_manager.add_user("Ann")
+        app.data_manager.add_to_list(user.id, movies["heat"])
+        user_id = user.id
+    assert b"also listed" not in client.get(heat).data
+
+    client.post(f"/users/{user_id}/add_existing/{movies['alien']}", follow_redirects=True)
+    resp = client.get(heat)
+    assert b"also listed" in resp.data and b"Alien" in resp.data
+
+    with app.app_context():
+        app.data_manager.delete_movie(movies["alien"])
+    assert b"Alien" not in client.get(heat).data
+
+
+def test_rolled_back_writes_do_not_invalidate(app, client, movies):
+    client.get("/")
+    with app.app_context():
+        db.session.add(Movie(title="Ghost", year=2000))
+        db.session.flush()
+        db.session.rollback()
+    with count_queries(app) as statements:
+        client.get("/")
+    assert statements == []
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+
+@pytest.mark.parametrize("backend", [lambda: LRUBackend(max_entries=2),
+                                     lambda: RedisBackend(FakeRedis())])
+def test_backends_version_tags(backend):
+    cache = ResponseCache(backend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.fragment("genres", ["movies"], compute) == {"n": 1}
+    assert cache.fragment("genres", ["movies"], compute) == {"n": 1}
+    cache.invalidate("users")
+    assert cache.fragment("genres", ["movies"], compute) == {"n": 1}
+    cache.invalidate("movies")
+    assert cache.fragment("genres", ["movies"], compute) == {"n": 2}
+
+
+def test_lru_backend_evicts_least_recently_used():
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+    assert backend.get("b") is None and backend.get("a") == 1
+    assert backend.evictions == 1
@@ -0,0 +1,97 @@
+import pytest
+
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import MovieStats, RatingBucket, Review
+
+
+@pytest.fixture
+def movies(app):
+    with app.app_context():
+        dm = app.data_manager
+        ids = {title: dm.add_movie(title, year=2000 + i).id
+               for i, title in enumerate(["Alpha", "Bravo", "Charlie"])}
+    return ids
+
+
+def _stats(movie_id):
+    s = db.session.get(MovieStats, movie_id)
+    return s.review_count, round(s.avg_rating, 6)
+
+
+def test_new_movies_get_empty_stats(app, movies):
+    with app.app_context():
+        assert _stats(movies["Alpha"]) == (0, 0.0)
+        assert app.data_manager.get_rating_histogram(movies["Alpha"]) == [0] * 11
+
+
+def test_add_and_delete_review_update_aggregates(app, movies):
+    dm = app.data_manager
+    mid = movies["Bravo"]
+    with app.app_context():
+        first = dm.add_review(mid, "great", 8.0).review_id
+        dm.add_review(mid, "fine", 6.6)
+        assert _stats(mid) == (2, 7.3)
+        assert dm.get_rating_histogram(mid)[7] == 1 and dm.get_rating_histogram(mid)[8] == 1
+
+        assert dm.delete_review(first) == mid
+        assert dm.delete_review(first) is None
+        assert _stats(mid) == (1, 6.6)
+        assert dm.get_rating_histogram(mid)[8] == 0
+
+
+def test_deleting_a_user_removes_their_reviews_from_stats(app, movies):
+    dm = app.data_manager
+    mid = movies["Alpha"]
+    with app.app_context():
+        user = dm.add_user("Reviewer")
+        db.session.add(Review(movie_id=mid, user_id=user.id, review_text="meh", rating=4))
+        db.session.commit()
+        dm.add_review(mid, "anon", 10)
+        assert _stats(mid) == (2, 7.0)
+
+        dm.delete_user(user.id)
+        assert _stats(mid) == (1, 10.0)
+
+
+def test_catalog_sorts_by_rating_and_popularity(app, client, movies):
+    dm = app.data_manager
+    with app.app_context():
+        dm.add_review(movies["Alpha"], "ok", 5)
+        dm.add_review(movies["Alpha"], "ok", 6)
+        dm.add_review(movies["Charlie"], "wow", 9)
+
+        by_rating = dm.get_movies(sort="rating", page_size=2)
+        assert [m.title for m in by_rating] == ["Charlie", "Alpha"]
+        rest = dm.get_movies(sort="rating", page_size=2, after=by_rating.next_cursor)
+        assert [m.title for m in rest] == ["Bravo"]
+        assert [m.title for m in dm.get_movies(sort="popular")] == ["Alpha", "Charlie", "Bravo"]
+        assert [m.title for m in dm.get_movies(sort="bogus")] == ["Alpha", "Bravo", "Charlie"]
+
+    resp = client.get("/?sort=rating")
+    assert resp.status_code == 200
+    assert resp.data.index(b"Charlie") < resp.data.index(b"Bravo")
+
+
+def test_repair_fixes_drifted_rows(app, movies):
+    dm = app.data_manager
+    mid = movies["Charlie"]
+    with app.app_context():
+        dm.add_review(mid, "good", 7)
+        db.session.execute(db.update(MovieStats).values(review_count=99, avg_rating=1.0))
+        db.session.execute(db.delete(RatingBucket))
+        db.session.execute(db.delete(MovieStats).where(MovieStats.movie_id == movies["Alpha"]))
+        db.session.commit()
+
+        fixed = dm.repair_review_stats()
+        assert fixed == {"movie_stats": 3, "histogram": 1}
+        assert _stats(mid) == (1, 7.0) and _stats(movies["Alpha"]) == (0, 0.0)
+        assert dm.get_rating_histogram(mid)[7] == 1
+        assert dm.repair_review_stats() == {"movie_stats": 0, "histogram": 0}
+
+
+def test_delete_review_route(app, client, movies):
+    with app.app_context():
+        rid = app.data_manager.add_review(movies["Alpha"], "bye", 3).review_id
+    resp = client.post(f"/reviews/{rid}/delete")
+    assert resp.status_code == 302 and f"/movies/{movies['Alpha']}" in resp.headers["Location"]
+    assert client.post(f"/reviews/{rid}/delete").status_code == 404
@@ -0,0 +1,71 @@
+from Movie_Web_App import db
+from Movie_Web_App.data_manager.models import Movie
+
+
+def _seed(app):
+    with app.app_context():
+        db.session.add_all([
+            Movie(title="Snatch", director="Guy Ritchie", year=2000, genre="Comedy, Crime",
+                  plot="Unscrupulous boxing promoters and a stolen diamond."),
+            Movie(title="Heat", director="Michael Mann", year=1995, genre="Crime, Drama",
+                  plot="A group of high-end professional thieves."),
+            Movie(title="Snowpiercer", director="Bong Joon Ho", year=2013, genre="Action, Sci-Fi",
+                  plot="The last survivors ride a train around a frozen world."),
+        ])
+        db.session.commit()
+
+
+def test_search_movies_prefix_and_fields(app):
+    _seed(app)
+    dm = app.data_manager
+    with app.app_context():
+        assert {m.title for m in dm.search_movies("sn")} == {"Snatch", "Snowpiercer"}
+        assert [m.title for m in dm.search_movies("ritch")] == ["Snatch"]
+        assert [m.title for m in dm.search_movies("diamond")] == ["Snatch"]
+        assert [m.title for m in dm.search_movies("crime mann")] == ["Heat"]
+        assert not dm.search_movies("!!!")
+
+
+def test_search_index_follows_updates_and_deletes(app):
+    _seed(app)
+    dm = app.data_manager
+    with app.app_context():
+        heat = Movie.query.filter_by(title="Heat").first()
+        heat.director = "Kathryn Bigelow"
+        db.session.commit()
+        assert not dm.search_movies("mann")
+        assert [m.title for m in dm.search_movies("bigelow")] == ["Heat"]
+
+        db.session.delete(heat)
+        db.session.commit()
+        assert not dm.search_movies("bigelow")
+
+
+def test_index_route_uses_full_text_search(client, app):
+    _seed(app)
+    resp = client.get("/?q=snow")
+    assert resp.status_code == 200
+    assert b"Snowpiercer" in resp.data
+    assert b"Heat" not in resp.data
+
+
+def test_genre_filter_is_exact_and_dropdown_is_distinct(app, client):
+    _seed(app)
+    with app.app_context():
+        db.session.add(Movie(title="Hoop Dreams", year=1994, genre="Documentary, Docudrama"))
+        db.session.commit()
+        dm = app.data_manager
+        assert dm.get_genres() == ["Action", "Comedy", "Crime", "Docudrama",
+                                   "Documentary", "Drama", "Sci-Fi"]
+        assert [m.title for m in dm.get_movies(genre="Drama")] == ["Heat"]
+        assert [m.title for m in dm.search_movies("h", genre="Crime")] == ["Heat"]
+
+        heat = Movie.query.filter_by(title="Heat").first()
+        heat.genre = "Thriller"
+        db.session.commit()
+        assert not dm.get_movies(genre="Drama")
+        assert "Drama" not in dm.get_genres()
+
+    resp = client.get("/?genre=Thriller")
+    assert b"Heat" in resp.data
+    assert b"Snatch" not in resp.data
@@ -0,0 +1,57 @@
+import pytest
+
+from Movie_Web_App import db, seeding
+from Movie_Web_App.data_manager.models import Movie
+
+
+class Crash(BaseException):
+    """Simulates the process dying mid-import."""
+
+
+def _titles(tmp_path, titles):
+    path = tmp_path / "titles.txt"
+    path.write_text("\n".join(titles) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _fake_omdb(calls, crash_on=None):
+    def fetch(title):
+        calls.append(title)
+        if title == crash_on:
+            raise Crash()
+        if title.startswith("Missing"):
+            return None
+        return {"title": title, "year": 2000, "director": "D", "genre": "Drama"}
+    return fetch
+
+
+def test_seed_skips_existing_and_duplicates(app, tmp_path):
+    path = _titles(tmp_path, ["Heat", "heat", "", "Alien", "Missing One", "Brazil"])
+    calls = []
+    with app.app_context():
+        db.session.add(Movie(title="Brazil", year=1985))
+        db.session.commit()
+        stats = seeding.seed_movies(path, db.session, _fake_omdb(calls), workers=4,
+                                    rate=None, batch_size=2, echo=lambda msg: None)
+        assert sorted(calls) == ["Alien", "Heat", "Missing One"]
+        assert stats.added == 2 and stats.not_found == 1 and stats.skipped == 3
+        assert {m.title for m in Movie.query} == {"Heat", "Alien", "Brazil"}
+
+
+def test_seed_resumes_from_last_committed_batch(app, tmp_path):
+    titles = [f"Film {i}" for i in range(10)]
+    path = _titles(tmp_path, titles)
+    with app.app_context():
+        with pytest.raises(Crash):
+            seeding.seed_movies(path, db.session, _fake_omdb([], crash_on="Film 7"),
+                                workers=1, rate=None, batch_size=3, echo=lambda msg: None)
+        db.session.rollback()
+        committed = {m.title for m in Movie.query}
+        assert committed == {f"Film {i}" for i in range(6)}
+
+        calls = []
+        stats = seeding.seed_movies(path, db.session, _fake_omdb(calls), workers=2,
+                                    rate=None, batch_size=3, echo=lambda msg: None)
+        assert calls == ["Film 6", "Film 7", "Film 8", "Film 9"]
+        assert stats.added == 4
+        assert Movie.query.count() == 10
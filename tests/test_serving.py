@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from Movie_Web_App import db, serving
+
+
+@pytest.fixture
+def movie_id(app):
+    with app.app_context():
+        return app.data_manager.add_movie("Alien", year=1979).id
+
+
+def test_warm_compiles_templates_and_releases_connections(app, movie_id):
+    warmed = serving.warm(app)
+    assert warmed["templates"] >= 10 and warmed["suggestions"] == 1
+    # compiled templates are cached on the environment; nothing left open
+    assert "user_movies.html" in {key[1] for key in app.jinja_env.cache.keys()}
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_gets_its_own_connections(app, movie_id):
+    with app.app_context():
+        db.session.execute(db.text("SELECT 1"))   # a pooled connection the child inherits
+        db.session.remove()
+    pid = os.fork()
+    if pid == 0:   # child: must not touch the parent's connection
+        status = 1
+        try:
+            serving.after_fork(app)
+            with app.app_context():
+                status = 0 if app.data_manager.get_movie(movie_id).title == "Alien" else 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    with app.app_context():
+        assert app.data_manager.get_movie(movie_id).title == "Alien"
+
+
+def test_page_cache_needs_redis_with_several_workers(app, client, movie_id):
+    assert serving.check_workers(app, 1)
+    app.config["RESPONSE_CACHE_URL"] = "redis://cache:6379/0"
+    assert serving.check_workers(app, 5)
+    app.config["RESPONSE_CACHE_URL"] = None
+    assert not serving.check_workers(app, 5)
+    assert app.response_cache is None
+    assert b"Alien" in client.get("/").data
+    metrics = client.get("/metrics").data
+    assert b"response_cache_events{" not in metrics
+    assert f"process_id {os.getpid()}".encode() in metrics
@@ -0,0 +1,12 @@
+"""
+wsgi.py
+
+Production entry point: `Movie_Web_App.wsgi:app` for gunicorn (see
+gunicorn.conf.py) or any other WSGI server. The app is created and warmed
+at import, i.e. once in the master process when preloading.
+"""
+
+from . import create_app, serving
+
+app = create_app()
+serving.warm(app)